@@ -20,5 +20,82 @@ WAVE_ANALYSIS_CONFIG = {
     # This is the minimum size a phase needs to be (in days) not be flagged as micro
     # and merged.
     # TODO: reset to 14 after Holiday 2022 numbers settle.
-    'min_phase_size': 13
+    'min_phase_size': 13,
+
+    # Phase smoothing engine: 'heap' (HeapPhaseSmoother) or 'scan' (merge_jagged_phases).
+    # Both produce the same phases. Heap only updates neighbors of each merge.
+    'smoothing_engine': 'heap',
+
+    # Incremental updates (see Epidemic.freeze): only waves closed before this many days
+    # before the latest date are frozen. Revisions to older data trigger a full rebuild.
+    'revision_days': 28,
+
+    # Values this many standard deviations from the mean of the window ending the day before
+    # are flagged as anomalies (see Epidemic.anomalies).
+    'anomaly_z_score': 3.0,
+
+    # Values in that window needed before a z-score is computed. None requires a full window.
+    'anomaly_min_count': None,
+
+    # Peaks of other timelines this many days or less from a wave's peak are matched to it
+    # (see EpidemicBatch.peak_offsets).
+    'max_peak_lag': 28,
+
+    # Timelines compared to positive rate peaks in peak-offsets.csv, with their flat slope
+    # thresholds. Timelines have different scales, so each needs its own threshold.
+    'peak_offset_thresholds': {
+        'avg_new_cases': 5,
+        'hospitalizations': 2,
+        'icu_cases': 1,
+        'deaths': 1
+    }
+}
+
+# Process pool workers used by oc wave-sweep. None uses one per CPU.
+WAVE_SWEEP_CONFIG = {
+    'workers': None
+}
+
+# Assumption grid swept by oc immunity-scenarios: every combination is a scenario. See
+# SCENARIO_KEYS in covid_app/models/oc/immunity_scenarios.py.
+IMMUNITY_SCENARIOS_CONFIG = {
+    'partial_vax_eff': (.6, .75, .85),
+    'full_vax_eff': (.8, .9, .95),
+    'vax_fade_days': (180, 270, 365),
+    'inf_fade_days': (120, 180, 270),
+    'undertest_factor': (2.5, 3.0, 4.0, 5.5, 7.0),
+    'infection_window': (10, 14)
+}
+
+# Daily Archive Snapshots
+# Limits on parsed snapshots from data/oc/daily held in memory at once. Size is measured by
+# snapshot file size.
+SNAPSHOT_REGISTRY_CONFIG = {
+    'max_snapshots': 60,
+    'max_bytes': 8 * 1024 * 1024
+}
+
+# Process pool workers used to parse archive snapshots. None uses one per CPU.
+ARCHIVE_LOADER_CONFIG = {
+    'workers': None
+}
+
+# Delta-encoded snapshot cache (data/oc/cache/delta). A full keyframe is stored after this many
+# snapshots so rebuilding a snapshot never applies more deltas than that.
+DELTA_ARCHIVE_CONFIG = {
+    'keyframe_interval': 30
+}
+
+# On-disk HTTP cache for remote extracts (see covid_app/extracts/http_cache.py). Offline mode
+# (app.py --cached) serves responses from cache only and never touches the network.
+HTTP_CACHE_CONFIG = {
+    'path': path_join(DATA_ROOT, 'cache', 'http'),
+    'offline': False,
+    'chunk_size': 64 * 1024
+}
+
+# Thread pool for fetching remote source documents concurrently (see
+# covid_app/extracts/source_prefetch.py). Bounds requests in flight at once.
+SOURCE_PREFETCH_CONFIG = {
+    'max_workers': 4
 }
@@ -0,0 +1,18 @@
+"""
+Secrets File (Dist Version)
+
+To set up, copy this file:
+
+$ cp config/secrets.py{-dist,}
+
+Then obtain your keys and update values.
+
+Remember: DO NOT COMMIT secrets.py TO YOUR PUBLIC REPO.
+"""
+
+# Obtain key here: https://apidocs.covidactnow.org/access
+COVID_ACT_NOW_API_KEY = "TBA"
+
+# Obtain token here: https://healthdata.gov/profile/edit/developer_settings
+# Token not required but will increase rate limits.
+SODA_APP_TOKEN = None
@@ -0,0 +1,166 @@
+"""
+OC Wave Parameter Sweep
+
+Runs the epidemic wave analysis for every combination in a grid of WAVE_ANALYSIS_CONFIG
+parameters (window_size, flat_slope_threshold, min_phase_size) and summarizes the results.
+
+Combinations run in a process pool. The positive rate timeline is copied once into shared
+memory. Each worker rebuilds it from there when it starts, so tasks only pass parameters,
+which go to Epidemic as opts.
+"""
+#
+# Imports
+#
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from itertools import product
+from functools import cached_property
+from os import cpu_count
+from datetime import date
+import time
+
+import numpy as np
+
+from config.app import WAVE_ANALYSIS_CONFIG, WAVE_SWEEP_CONFIG
+from covid_app.analytics.oc.waves import OcWaveAnalysis
+from covid_app.models.oc.epidemic import Epidemic
+
+
+#
+# Constants
+#
+GRID_KEYS = ('window_size', 'flat_slope_threshold', 'min_phase_size')
+
+# Timeline rebuilt from shared memory in each worker (see init_sweep_worker).
+worker_timeline = None
+
+
+#
+# Helpers
+#
+def parse_grid_values(value, cast=float):
+    """Parses comma-separated list like '3,5,7' into tuple of values.
+    """
+    return tuple(cast(v.strip()) for v in value.split(',') if v.strip())
+
+
+def init_sweep_worker(shm_name, start_ordinal, num_days):
+    """Rebuilds timeline from dense values array in shared memory. NaN is a missing value.
+    """
+    global worker_timeline
+    shm = SharedMemory(name=shm_name)
+
+    try:
+        values = np.ndarray((num_days,), dtype=np.float64, buffer=shm.buf)
+        worker_timeline = {}
+        for n, value in enumerate(values.tolist()):
+            worker_timeline[date.fromordinal(start_ordinal + n)] = (None if np.isnan(value)
+                                                                    else value)
+    finally:
+        shm.close()
+
+
+def run_sweep_task(params):
+    """Runs epidemic for params (dict with GRID_KEYS) and returns summary row.
+    """
+    started_at = time.time()
+    epidemic = Epidemic(worker_timeline, params)
+    row = dict(params, waves=None, phases=None, smoothed_phases=None, iterations=None,
+               error=None)
+
+    try:
+        row['phases'] = len(epidemic.phases)
+        row['waves'] = len(epidemic.waves)
+        row['smoothed_phases'] = len(epidemic.smoothed_phases)
+        row['iterations'] = epidemic.smoothing_iterations
+    # Other combinations still run. E.g. a hardcoded phase may not match any phase.
+    except Exception as e:
+        row['iterations'] = epidemic.smoothing_iterations
+        row['error'] = type(e).__name__
+
+    row['run_time'] = time.time() - started_at
+    return row
+
+
+#
+# Classes
+#
+class OcWaveSweep:
+    #
+    # Properties
+    #
+    @cached_property
+    def timeline(self):
+        return OcWaveAnalysis(self.test).avg_positive_rates
+
+    @property
+    def combinations(self):
+        values = [self.grid[key] for key in GRID_KEYS]
+        return [dict(zip(GRID_KEYS, combo)) for combo in product(*values)]
+
+    @property
+    def run_time(self):
+        if not self.run_time_end:
+            self.run_time_end = time.time()
+
+        return self.run_time_end - self.run_time_start
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, grid=None, workers=None, test=False):
+        """Grid maps GRID_KEYS to lists of values. Missing keys use WAVE_ANALYSIS_CONFIG value.
+        """
+        self.run_time_start = time.time()
+        self.run_time_end = None
+        self.test = test
+
+        grid = grid if grid else {}
+        self.grid = {key: grid.get(key) or (WAVE_ANALYSIS_CONFIG[key],) for key in GRID_KEYS}
+
+        default_workers = WAVE_SWEEP_CONFIG['workers'] or cpu_count() or 1
+        self.workers = workers if workers is not None else default_workers
+
+    def run(self):
+        """Returns a summary row for each combination, in grid order.
+        """
+        dates = sorted(self.timeline.keys())
+        start_ordinal = dates[0].toordinal()
+        num_days = dates[-1].toordinal() - start_ordinal + 1
+
+        values = np.full(num_days, np.nan)
+        for dated in dates:
+            value = self.timeline[dated]
+            if value is not None:
+                values[dated.toordinal() - start_ordinal] = value
+
+        shm = SharedMemory(create=True, size=values.nbytes)
+        try:
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+            init_args = (shm.name, start_ordinal, num_days)
+            rows = self.run_combinations(init_args)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        self.run_time_end = time.time()
+        return rows
+
+    def run_combinations(self, init_args):
+        combinations = self.combinations
+
+        if self.workers <= 1 or len(combinations) < 2:
+            init_sweep_worker(*init_args)
+            return [run_sweep_task(params) for params in combinations]
+
+        workers = min(self.workers, len(combinations))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_sweep_worker,
+                                 initargs=init_args) as pool:
+            return list(pool.map(run_sweep_task, combinations))
+
+    #
+    # Magic Methods
+    #
+    def __repr__(self):
+        return '<OcWaveSweep combinations={} workers={}>'.format(len(self.combinations),
+                                                                 self.workers)
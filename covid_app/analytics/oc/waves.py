@@ -4,9 +4,10 @@ from datetime import datetime, timedelta
 import time
 import csv
 
-from config.app import DATA_ROOT
+from config.app import DATA_ROOT, WAVE_ANALYSIS_CONFIG
 from covid_app.extracts.local.oc.daily_hca import OcDailyHcaExtract
 from covid_app.models.oc.epidemic import Epidemic
+from covid_app.models.oc.epidemic_batch import EpidemicBatch
 
 
 #
@@ -15,6 +16,11 @@ from covid_app.models.oc.epidemic import Epidemic
 DATE_F = '%Y-%m-%d'
 START_DATE = '2020-03-05'
 SAMPLE_DATA_CSV = path_join(DATA_ROOT, 'samples', 'oc-rates.csv')
+EPIDEMIC_STATE_PATH = path_join(DATA_ROOT, 'oc', 'cache', 'epidemic-state.json')
+
+# Epidemic modes: incremental updates saved state, rebuild ignores it, verify checks
+# incremental update against full rebuild. All modes save state.
+EPIDEMIC_MODES = ('incremental', 'rebuild', 'verify')
 
 # Export column names
 # This should match column names in datasource file
@@ -34,10 +40,10 @@ class OcWaveAnalysis:
     #
     @cached_property
     def epidemic(self):
+        # Thresholds come from WAVE_ANALYSIS_CONFIG. (Values of 5 and 14 here used to be
+        # ignored, since phases only read config.)
         opts = {
-            'window_size': 5,
-            'flat_slope_threshold': 5,
-            'min_phase_size': 14
+            'window_size': 5
         }
 
         datasets = {
@@ -50,9 +56,32 @@ class OcWaveAnalysis:
             'deaths': self.deaths
         }
 
-        epidemic = Epidemic(self.avg_positive_rates, opts, datasets)
+        if self.test:
+            return Epidemic(self.avg_positive_rates, opts, datasets)
+
+        epidemic = None
+        if self.epidemic_mode != 'rebuild':
+            epidemic = Epidemic.from_state_file(EPIDEMIC_STATE_PATH, opts)
+
+        if epidemic:
+            epidemic.update(self.avg_positive_rates)
+            for key, dataset in datasets.items():
+                epidemic.add_timeline(key, dataset)
+        else:
+            epidemic = Epidemic(self.avg_positive_rates, opts, datasets)
+
+        if self.epidemic_mode == 'verify':
+            epidemic.verify_state()
+
+        epidemic.save_state(EPIDEMIC_STATE_PATH)
         return epidemic
 
+    @cached_property
+    def epidemic_batch(self):
+        thresholds = WAVE_ANALYSIS_CONFIG['peak_offset_thresholds']
+        keys = ['primary'] + list(thresholds.keys())
+        return EpidemicBatch(self.epidemic, thresholds, keys)
+
     @cached_property
     def hca_extract(self):
         return OcDailyHcaExtract()
@@ -157,34 +186,76 @@ class OcWaveAnalysis:
     #
     # Instance Method
     #
-    def __init__(self, test=False):
+    def __init__(self, test=False, epidemic_mode='incremental'):
         self.run_time_start = time.time()
         self.run_time_end = None
         self.test = test
 
+        if epidemic_mode not in EPIDEMIC_MODES:
+            raise ValueError('Invalid epidemic mode: {}'.format(epidemic_mode))
+        self.epidemic_mode = epidemic_mode
+
     def windows_to_csv(self):
+        """Writes rolling stats, window slope and trend, and anomaly flag for each date of
+        positive rate timeline.
+        """
         csv_path = path_join(DATA_ROOT, 'oc', 'analytics', 'windows.csv')
-        headers = ['date', 'rate', 'stdev', 'rsd', 'slope', 'mean', 'change', 'trend']
+        headers = ['date', 'rate', 'stdev', 'rsd', 'slope', 'mean', 'change', 'trend',
+                   'zscore', 'anomaly']
+
+        epidemic = self.epidemic
+        stats = epidemic.rolling_stats['primary']
+        stdevs = stats.stdevs
+        windows = epidemic.windows
+        window_indexes = {dated: n for n, dated in enumerate(windows.dates)}
+
         with open(csv_path, 'w', newline='') as f:
             writer = csv.writer(f)
             writer.writerow(headers)
+            prev_rate = None
+
+            for dated in epidemic.dates:
+                rate = epidemic.timeline[dated]
+                mean = stats.means[dated]
+                stdev = stdevs[dated]
+                n = window_indexes.get(dated)
 
-            for dated, row in sorted(self.wave.windows.items()):
                 writer.writerow([
                     dated,
-                    row['rate'],
-                    row['stdev'],
-                    row['rsd'],
-                    row['slope'],
-                    row['mean'],
-                    row['change'],
-                    row['trend']
+                    rate,
+                    stdev,
+                    stdev / mean if stdev is not None and mean else None,
+                    windows.slopes[n] if n is not None else None,
+                    mean,
+                    rate - prev_rate if rate is not None and prev_rate is not None else None,
+                    windows.trends[n] if n is not None else None,
+                    stats.zscores[dated],
+                    epidemic.is_anomaly(dated)
                 ])
+                prev_rate = rate
 
         self.run_time_end = time.time()
         print(self.run_time, csv_path)
         return csv_path
 
+    def peak_offsets_to_csv(self):
+        """Writes a row for each positive rate wave peak with days to nearest peak of each
+        other timeline (positive means timeline lags). Blank if no peak within max_peak_lag.
+        """
+        csv_path = path_join(DATA_ROOT, 'oc', 'analytics', 'peak-offsets.csv')
+        batch = self.epidemic_batch
+        keys = [key for key in batch.keys if key != 'primary']
+
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['peaked_on'] + keys)
+
+            for peak in batch.peak_offsets():
+                writer.writerow([peak['peaked_on']] + [peak['offsets'].get(k) for k in keys])
+
+        self.run_time_end = time.time()
+        return csv_path
+
     def export_sample_data_to_csv(self):
         start_date = datetime.strptime('2020-10-01', DATE_F).date()
         end_date = datetime.strptime('2021-11-01', DATE_F).date()
@@ -11,7 +11,9 @@ from datetime import date, timedelta
 from calendar import monthrange, month_name
 
 from config.app import DATA_ROOT
-from covid_app.extracts.oc_hca.daily_archive_extract import OcDailyArchiveExtract
+from covid_app.extracts.oc_hca.daily_archive_extract import (OcDailyArchiveExtract,
+                                                             snapshot_registry)
+from covid_app.extracts.oc_hca.archive_loader import OcArchiveLoader
 
 
 OC_DATA_PATH = path_join(DATA_ROOT, 'oc')
@@ -54,15 +56,9 @@ class OcDailyTestingAnalysis:
 
         return month_dates
 
-    @cached_property
-    def daily_extracts(self):
-        dated_extracts = {}
-
-        for extract_date in self.dates:
-            extract = OcDailyArchiveExtract(extract_date)
-            dated_extracts[extract_date] = extract
-
-        return dated_extracts
+    @property
+    def snapshot_stats(self):
+        return snapshot_registry.stats
 
     @property
     def days_in_month(self):
@@ -80,11 +76,14 @@ class OcDailyTestingAnalysis:
     #
     # Instance Method
     #
-    def __init__(self, year, month):
+    def __init__(self, year, month, workers=None):
         self.year = year
         self.month = month
+        self.loader = OcArchiveLoader(workers)
 
     def to_csv(self):
+        self.preload_extracts()
+
         year_month = '{}{:02}'.format(self.year, self.month)
         file_name = ANALYTICS_FILE_NAME_F.format(year_month)
         csv_path = path_join(OC_ANALYTICS_DATA_PATH, file_name)
@@ -101,8 +100,15 @@ class OcDailyTestingAnalysis:
     #
     # Private
     #
+    def preload_extracts(self):
+        """Parses month's snapshots, plus the day before for changes, in parallel and adds
+        them to the shared registry.
+        """
+        extract_dates = [self.start_date - timedelta(days=1)] + self.dates
+        self.loader.load_extracts(extract_dates, registry=snapshot_registry)
+
     def extract_data_to_csv_row(self, dated):
-        extract = self.daily_extracts[dated]
+        extract = OcDailyArchiveExtract.for_date(dated)
         return [
             dated,
             extract.reported_new_tests,
@@ -7,10 +7,11 @@ https://services2.arcgis.com/LORzk2hk9xzHouw9/ArcGIS/rest/services/occovid_pcr_c
 from os.path import join as path_join
 from functools import cached_property
 import csv
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 from calendar import monthrange, month_name
 
 from config.app import DATA_ROOT
+from covid_app.extracts.oc_hca.archive_loader import OcArchiveLoader
 
 
 OC_DATA_PATH = path_join(DATA_ROOT, 'oc')
@@ -21,61 +22,6 @@ CSV_HEADER = ['Date', '+1d', '+2d', '+3d', '+4d', '+5d', '+6d', '+7d', '+8-14d',
               '+15d+', 'TOTAL (as of {})']
 
 
-class OcDailyDataExtract:
-    @cached_property
-    def csv_rows(self):
-        with open(self.file_path, newline='') as f:
-            reader = csv.reader(f)
-            rows = list(reader)
-        return rows
-
-    @cached_property
-    def header(self):
-        return self.csv_rows[0]
-
-    @cached_property
-    def data_rows(self):
-        return self.csv_rows[1:]
-
-    @cached_property
-    def dated_rows(self):
-        dated_rows = {}
-        for row in self.data_rows:
-            dated = datetime.strptime(row[0], '%Y-%m-%d').date()
-            dated_rows[dated] = row
-        return dated_rows
-
-    @cached_property
-    def dates(self):
-        return self.dated_rows.keys()
-
-    @cached_property
-    def admin_tests(self):
-        CSV_COL = 1
-        dated_tests = {}
-        for dated in self.dates:
-            row = self.dated_rows.get(dated)
-            dated_tests[dated] = row[CSV_COL]
-        return dated_tests
-
-    @cached_property
-    def positive_tests(self):
-        CSV_COL = 2
-        dated_tests = {}
-        for dated in self.dates:
-            row = self.dated_rows.get(dated)
-            dated_tests[dated] = row[CSV_COL]
-        return dated_tests
-
-    def __init__(self, dated):
-        self.date = dated
-        self.file_name = 'oc-hca-{}.csv'.format(dated.strftime('%Y%m%d'))
-        self.file_path = path_join(OC_DATA_PATH, 'daily', self.file_name)
-
-    def __repr__(self):
-        return '<OcDailyDataExtract date={} rows={}>'.format(self.date, len(self.csv_rows))
-
-
 class OcMonthlyTestAnalysis:
     #
     # Properties
@@ -117,13 +63,8 @@ class OcMonthlyTestAnalysis:
 
     @cached_property
     def daily_extracts(self):
-        dated_extracts = {}
-
-        for extract_date in self.extract_dates:
-            extract = OcDailyDataExtract(extract_date)
-            dated_extracts[extract_date] = extract
-
-        return dated_extracts
+        # Snapshots are parsed in parallel by loader.
+        return self.loader.load_extracts(self.extract_dates)
 
     @cached_property
     def total_tests_time_series(self):
@@ -219,9 +160,10 @@ class OcMonthlyTestAnalysis:
     #
     # Instance Method
     #
-    def __init__(self, year, month):
+    def __init__(self, year, month, workers=None):
         self.year = year
         self.month = month
+        self.loader = OcArchiveLoader(workers)
 
     def to_csv(self):
         tests_csv = self.series_to_csv('tests', self.new_tests_time_series)
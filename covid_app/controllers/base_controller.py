@@ -12,12 +12,18 @@ from covid_app.exports.us_daily_covid import USDailyCovidExport
 class BaseController(Controller):
     class Meta:
         label = 'base'
+        arguments = [
+            (['--cached'], dict(action='store_true',
+                                help='offline: read remote data from HTTP cache only'))
+        ]
 
     # python app.py kent-daily
     @expose(help="Export Kent County data to csv file.")
     def kent_daily(self):
         export = KentDailyCovidExport()
+        prefetch = export.prefetch()
         result = export.to_csv()
+        print('\n'.join(prefetch.summary_lines))
         print(result)
 
     # python app.py us-daily
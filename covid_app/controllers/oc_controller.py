@@ -7,6 +7,7 @@ from covid_app.exports.oc_daily_data import OcDailyDataExport
 from covid_app.exports.oc_daily_testing import OcDailyTestsExport
 from covid_app.exports.oc.infections import OcInfectionsExport
 from covid_app.exports.oc_immunity import OCImmunityExport
+from covid_app.exports.oc.immunity_scenarios import OcImmunityScenariosExport
 from covid_app.exports.oc_wastewater import OCWastewaterExport
 from covid_app.exports.oc.metrics import OCMetricsExport
 from covid_app.exports.oc.waves import OCWavesExport
@@ -14,12 +15,32 @@ from covid_app.exports.oc.phases import OCPhasesExport
 from covid_app.exports.oc.trends import OcTrendsExport
 from covid_app.exports.oc.historical import OcHistoricalExport
 from covid_app.exports.oc.time_series_json import OcTimeSeriesJsonExport
+from covid_app.exports.oc.lag_distribution import parse_buckets
+from covid_app.extracts.oc_hca.delta_archive import OcDeltaArchive
+from covid_app.extracts.oc_hca.archive_loader import ARCHIVE_PATH
 
 from covid_app.analytics.oc_by_day import OcByDayAnalysis
 from covid_app.analytics.oc_testing import OcTestingAnalysis
 from covid_app.analytics.oc_august_testing import OcAugustTestAnalysis
 from covid_app.analytics.oc_monthly_testing import OcMonthlyTestAnalysis
 from covid_app.analytics.oc_daily_testing import OcDailyTestingAnalysis
+from covid_app.analytics.oc.wave_sweep import OcWaveSweep, parse_grid_values
+from covid_app.analytics.oc.waves import OcWaveAnalysis
+
+
+# Epidemic modes for wave and phase exports (see OcWaveAnalysis)
+EPIDEMIC_MODE_ARGUMENTS = [
+    (['--rebuild'], dict(action='store_true',
+                         help='rebuild waves from scratch instead of updating saved state')),
+    (['--verify'], dict(action='store_true',
+                        help='check incremental update of waves against full rebuild'))
+]
+
+
+def epidemic_mode(pargs):
+    if pargs.verify:
+        return 'verify'
+    return 'rebuild' if pargs.rebuild else 'incremental'
 
 
 class OcController(Controller):
@@ -83,10 +104,13 @@ class OcController(Controller):
         }
         self.app.render(vars, 'oc/json-export.jinja2')
 
-    # python app.py oc waves-json-file
-    @expose(help="Output JSON file to docs/data/json/oc/waves.json.")
+    # python app.py oc waves-json-file [--rebuild|--verify]
+    @expose(
+        help="Output JSON file to docs/data/json/oc/waves.json.",
+        arguments=EPIDEMIC_MODE_ARGUMENTS
+    )
     def waves_json_file(self):
-        export = OCWavesExport(test=False)
+        export = OCWavesExport(test=False, epidemic_mode=epidemic_mode(self.app.pargs))
         waves_json_path = export.waves_to_json_file()
 
         wave_count = len(export.analysis.epidemic.waves)
@@ -107,10 +131,13 @@ class OcController(Controller):
         }
         self.app.render(vars, 'oc/json-export.jinja2')
 
-    # python app.py oc phases-json-file
-    @expose(help="Output JSON file to docs/data/json/oc/phases.json.")
+    # python app.py oc phases-json-file [--rebuild|--verify]
+    @expose(
+        help="Output JSON file to docs/data/json/oc/phases.json.",
+        arguments=EPIDEMIC_MODE_ARGUMENTS
+    )
     def phases_json_file(self):
-        export = OCPhasesExport(test=False)
+        export = OCPhasesExport(test=False, epidemic_mode=epidemic_mode(self.app.pargs))
         json_path = export.to_json_file()
         phases = pformat(export.analysis.epidemic.smoothed_phases)
 
@@ -126,6 +153,59 @@ class OcController(Controller):
         }
         self.app.render(vars, 'oc/json-export.jinja2')
 
+    # python app.py oc peak-offsets [--rebuild|--verify]
+    @expose(
+        help="Export days from positive rate wave peaks to peaks of other timelines to csv.",
+        arguments=EPIDEMIC_MODE_ARGUMENTS
+    )
+    def peak_offsets(self):
+        analysis = OcWaveAnalysis(epidemic_mode=epidemic_mode(self.app.pargs))
+        csv_path = analysis.peak_offsets_to_csv()
+        batch = analysis.epidemic_batch
+
+        vars = {
+            'csv_path': csv_path,
+            'notes': [
+                'Data Source: {}'.format(analysis.data_source_path),
+                'Peaks: {}'.format(len(batch.peaks.get('primary', []))),
+                'Waves By Timeline: {}'.format(
+                    {key: len(waves) for key, waves in batch.waves.items()}),
+                'Errors: {}'.format(list(batch.errors.keys()) or 'none'),
+                'Run time: {} s'.format(round(analysis.run_time, 2))
+            ]
+        }
+        self.app.render(vars, 'oc/csv-export.jinja2')
+
+    # python app.py oc wave-sweep [--window-sizes 3,5,7] [--thresholds .05,.1] [--workers N]
+    @expose(
+        help="Run wave analysis for a grid of wave parameters and summarize results.",
+        arguments=[
+            (['--window-sizes'], dict(action='store', type=lambda v: parse_grid_values(v, int),
+                                      help='comma-separated window sizes, e.g. 3,5,7')),
+            (['--thresholds'], dict(action='store', type=parse_grid_values,
+                                    help='comma-separated flat slope thresholds, e.g. .05,.1')),
+            (['--min-phase-sizes'], dict(action='store',
+                                         type=lambda v: parse_grid_values(v, int),
+                                         help='comma-separated min phase sizes, e.g. 13,14')),
+            (['--workers'], dict(action='store', type=int,
+                                 help='process pool workers used to run combinations')),
+            (['--sample'], dict(action='store_true',
+                                help='use sample data in data/samples/oc-rates.csv'))
+        ]
+    )
+    def wave_sweep(self):
+        pargs = self.app.pargs
+        grid = {
+            'window_size': pargs.window_sizes,
+            'flat_slope_threshold': pargs.thresholds,
+            'min_phase_size': pargs.min_phase_sizes
+        }
+        sweep = OcWaveSweep(grid, workers=pargs.workers, test=pargs.sample)
+        rows = sweep.run()
+
+        vars = {'sweep': sweep, 'rows': rows}
+        self.app.render(vars, 'oc/wave-sweep.jinja2')
+
     # python app.py oc trends-json-file
     @expose(help="Output JSON file to docs/data/json/oc/trends.json.")
     def trends_json_file(self):
@@ -187,18 +267,51 @@ class OcController(Controller):
                 'End Date: {}'.format(export.extract.ends_on),
                 'Rows: {}'.format(len(export.extract.dates)),
                 'Run time: {} s'.format(round(export.run_time, 2))
-            ]
+            ] + ['Fetch {}: {} s'.format(endpoint, round(secs, 2))
+                 for endpoint, secs in export.extract.fetch_latencies.items()]
         }
         self.app.render(vars, 'oc/csv-export.jinja2')
 
-    # python app.py oc daily-tests
-    @expose(help="Export daily OC HCA testing data to csv file.")
+    # python app.py oc daily-tests [--incremental] [--workers N] [--buckets 1-2,3-4,5-7,8+]
+    @expose(
+        help="Export daily OC HCA testing data to csv file.",
+        arguments=[
+            (['--incremental'], dict(action='store_true',
+                                     help='only process snapshots added since last run')),
+            (['--buckets'], dict(action='store', type=parse_buckets,
+                                 help='custom delay bucket layout, e.g. 1-2,3-4,5-7,8+')),
+            (['--workers'], dict(action='store', type=int,
+                                 help='process pool workers used to parse archive snapshots'))
+        ]
+    )
     def daily_tests(self):
-        export = OcDailyTestsExport()
+        export = OcDailyTestsExport(incremental=self.app.pargs.incremental,
+                                    workers=self.app.pargs.workers,
+                                    buckets=self.app.pargs.buckets)
         export.to_csv()
         vars = {'export': export}
         self.app.render(vars, 'oc/daily-tests.jinja2')
 
+    # python app.py oc delta-archive [--changes YYYY-MM-DD]
+    @expose(
+        help="Add new daily snapshots to delta archive or show what changed on a date.",
+        arguments=[
+            (['--changes'], dict(action='store', help='date of snapshot to show changes for'))
+        ]
+    )
+    def delta_archive(self):
+        archive = OcDeltaArchive()
+        added = archive.import_csv_archive(ARCHIVE_PATH)
+        changes_date = self.app.pargs.changes
+
+        vars = {
+            'archive': archive,
+            'added': added,
+            'changes_date': changes_date,
+            'changes': archive.changes(date.fromisoformat(changes_date)) if changes_date else {}
+        }
+        self.app.render(vars, 'oc/delta-archive.jinja2')
+
     # python app.py oc immunity
     @expose(help="Export immunity projections to csv file.")
     def immunity(self):
@@ -210,15 +323,55 @@ class OcController(Controller):
         }
         self.app.render(vars, 'oc/immunity.jinja2')
 
+    # python app.py oc immunity-scenarios [--undertest-factors 2.5,3,5] [--vax-fade-days 180,270]
+    @expose(
+        help="Export vulnerable population bands for a grid of immunity assumptions.",
+        arguments=[
+            (['--partial-vax-effs'], dict(action='store', type=parse_grid_values,
+                                          help='comma-separated partial vax efficacies')),
+            (['--full-vax-effs'], dict(action='store', type=parse_grid_values,
+                                       help='comma-separated full vax efficacies')),
+            (['--vax-fade-days'], dict(action='store', type=parse_grid_values,
+                                       help='comma-separated days for vax immunity to fade')),
+            (['--inf-fade-days'], dict(action='store', type=parse_grid_values,
+                                       help='comma-separated days for infection immunity to fade')),
+            (['--undertest-factors'], dict(action='store', type=parse_grid_values,
+                                           help='comma-separated case undercount factors')),
+            (['--infection-windows'], dict(action='store',
+                                           type=lambda v: parse_grid_values(v, int),
+                                           help='comma-separated infectious days, e.g. 10,14'))
+        ]
+    )
+    def immunity_scenarios(self):
+        pargs = self.app.pargs
+        grid = {
+            'partial_vax_eff': pargs.partial_vax_effs,
+            'full_vax_eff': pargs.full_vax_effs,
+            'vax_fade_days': pargs.vax_fade_days,
+            'inf_fade_days': pargs.inf_fade_days,
+            'undertest_factor': pargs.undertest_factors,
+            'infection_window': pargs.infection_windows
+        }
+        export = OcImmunityScenariosExport(grid)
+        export.to_csv()
+
+        vars = {
+            'export': export,
+            'latest': {name: round(values[-1]) for name, values in export.bands.items()}
+        }
+        self.app.render(vars, 'oc/immunity-scenarios.jinja2')
+
     #
     # Analytics
     #
-    # python app.py oc analyze-daily-tests YEAR MONTH
+    # python app.py oc analyze-daily-tests YEAR MONTH [--workers N]
     @expose(
         help="Analyze test patterns in OC for given month year.",
         arguments=[
             (['year'], dict(action='store')),
-            (['month'], dict(action='store'))
+            (['month'], dict(action='store')),
+            (['--workers'], dict(action='store', type=int,
+                                 help='process pool workers used to parse archive snapshots'))
         ]
     )
     def analyze_daily_tests(self):
@@ -226,7 +379,7 @@ class OcController(Controller):
         year = int(self.app.pargs.year)
         month = int(self.app.pargs.month)
 
-        analysis = OcDailyTestingAnalysis(year, month)
+        analysis = OcDailyTestingAnalysis(year, month, workers=self.app.pargs.workers)
         csv_path = analysis.to_csv()
 
         # Render view
@@ -280,12 +433,14 @@ class OcController(Controller):
         }
         print(vars)
 
-    # python app.py oc analyze-monthly-tests YEAR MONTH
+    # python app.py oc analyze-monthly-tests YEAR MONTH [--workers N]
     @expose(
         help="Analyze test patterns in OC for given month year.",
         arguments=[
             (['year'], dict(action='store')),
-            (['month'], dict(action='store'))
+            (['month'], dict(action='store')),
+            (['--workers'], dict(action='store', type=int,
+                                 help='process pool workers used to parse archive snapshots'))
         ]
     )
     def analyze_monthly_tests(self):
@@ -293,7 +448,7 @@ class OcController(Controller):
         year = int(self.app.pargs.year)
         month = int(self.app.pargs.month)
 
-        analysis = OcMonthlyTestAnalysis(year, month)
+        analysis = OcMonthlyTestAnalysis(year, month, workers=self.app.pargs.workers)
         csv_path = analysis.to_csv()
 
         # Render view
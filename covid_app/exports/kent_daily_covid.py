@@ -1,11 +1,13 @@
 from os.path import join as path_join
 import csv
-from functools import cached_property
+from functools import cached_property, partial
 from datetime import date
 
 from config.app import DATA_ROOT
-from covid_app.extracts.cdc.us_county_timeseries_extract import CdcCountyTimeseriesExtract
+from covid_app.extracts.cdc.us_county_timeseries_extract import (CdcCountyTimeseriesExtract,
+                                                                 KENT_FIPS)
 from covid_app.extracts.nyt.counties_extract import NyTimesCountiesExtract
+from covid_app.extracts.source_prefetch import SourcePrefetch
 
 
 #
@@ -57,7 +59,29 @@ class KentDailyCovidExport:
     # Instance Method
     #
     def __init__(self):
-        pass
+        self.prefetched = None
+
+    def prefetch(self, max_workers=None):
+        """Fetches and parses CDC county time series and NYT yearly files concurrently.
+        Returns SourcePrefetch with time for each source.
+        """
+        cdc_extract = CdcCountyTimeseriesExtract(fips=KENT_FIPS)
+        nyt_extract = NyTimesCountiesExtract.kent_mi_extract()
+        years = list(nyt_extract.pandemic_years)
+
+        prefetch = SourcePrefetch(max_workers)
+        prefetch.add('cdc-county-{}'.format(KENT_FIPS), partial(self.fetch_cdc_logs, cdc_extract))
+        for year in years:
+            prefetch.add('nyt-{}'.format(year), partial(nyt_extract.fetch_county_year, year))
+        results = prefetch.run()
+
+        # Same as first access of cached properties
+        nyt_extract.__dict__['county_years'] = {year: results['nyt-{}'.format(year)]
+                                                for year in years}
+        self.__dict__['cdc_timeseries_extract'] = cdc_extract
+        self.__dict__['ny_times_extract'] = nyt_extract
+        self.prefetched = prefetch
+        return prefetch
 
     def to_csv(self):
         with open(self.csv_path, 'w', newline='') as f:
@@ -74,6 +98,10 @@ class KentDailyCovidExport:
     #
     # Private
     #
+    def fetch_cdc_logs(self, extract):
+        extract.fetch_data_source()
+        return extract.daily_logs
+
     def extract_data_to_csv_row(self, dated):
         return [
             dated,
@@ -0,0 +1,345 @@
+"""
+OC Daily Tests Checkpoint
+
+Persists the per-date accumulators behind the daily tests export (data/oc/oc-hca-testing.csv)
+so a nightly run only has to ingest newly arrived archive snapshots.
+
+For each test date, the export follows a delay series: the new tests (or positives) for that
+date reported by each following day's snapshot. Rather than keep every series, the checkpoint
+keeps a DelaySummary of each one that can be extended a day at a time.
+"""
+#
+# Imports
+#
+from os import makedirs, replace
+from os.path import join as path_join, exists as path_exists, dirname
+from datetime import date, timedelta
+import json
+import math
+
+from config.app import DATA_ROOT
+from covid_app.extracts.oc_hca.archive_loader import (parse_snapshot_file, ARCHIVE_PATH,
+                                                      FILE_NAME_F, ADMIN_TESTS, POSITIVE_TESTS,
+                                                      REPORTED_TESTS, NEW_CASES)
+
+
+#
+# Constants
+#
+CHECKPOINT_PATH = path_join(DATA_ROOT, 'oc', 'cache', 'daily-tests-checkpoint.json')
+
+# Delay distribution buckets: (start, end) days inclusive. The final bucket (end -1) sums
+# every delay from start on except the latest report.
+# Note: the 5-7d export column has always summed days 5-6.
+DELAY_BUCKETS = ((1, 2), (3, 4), (5, 6), (8, 14), (15, -1))
+
+
+#
+# Helpers
+#
+def to_int(value):
+    if value is None or math.isnan(value):
+        return 0
+    return int(value)
+
+
+#
+# Classes
+#
+class DelaySummary:
+    """Running summary of a delay series. Matches what the export computes from the full
+    series: delay bucket counts and sums for average delay.
+    """
+    def __init__(self, length=0, buckets=None, last=0, count=0, delay_days=0):
+        self.length = length
+        self.buckets = buckets if buckets is not None else [0] * len(DELAY_BUCKETS)
+        self.last = last
+        self.count = count
+        self.delay_days = delay_days
+
+    #
+    # Static Methods
+    #
+    @staticmethod
+    def from_series(series):
+        summary = DelaySummary()
+        for value in series:
+            summary.append(value)
+        return summary
+
+    @staticmethod
+    def from_lag_index(index, dated):
+        """Builds summary from a LagDistributionIndex without replaying the series.
+        """
+        length = index.length(dated)
+        count, delay_days = index.reported_totals(dated)
+
+        return DelaySummary(
+            length=length,
+            buckets=[index.total(dated, start, end) for start, end in DELAY_BUCKETS],
+            last=index.lag_value(dated, length),
+            count=count,
+            delay_days=delay_days
+        )
+
+    @staticmethod
+    def from_dict(data):
+        return DelaySummary(**data)
+
+    #
+    # Properties
+    #
+    @property
+    def average_delay(self):
+        if self.count < 1:
+            return 0
+        return self.delay_days / self.count
+
+    @property
+    def bucket_values(self):
+        values = []
+
+        for (start, end), count in zip(DELAY_BUCKETS, self.buckets):
+            if self.length < start:
+                values.append(None)
+            elif end < 0:
+                values.append(count - self.last)
+            else:
+                values.append(count)
+
+        return values
+
+    #
+    # Instance Methods
+    #
+    def append(self, value):
+        delay = self.length + 1
+
+        for n, (start, end) in enumerate(DELAY_BUCKETS):
+            if delay >= start and (end < 0 or delay <= end):
+                self.buckets[n] += value
+
+        if value > 0:
+            self.count += value
+            self.delay_days += value * delay
+
+        self.last = value
+        self.length += 1
+
+    def to_dict(self):
+        return {
+            'length': self.length,
+            'buckets': self.buckets,
+            'last': self.last,
+            'count': self.count,
+            'delay_days': self.delay_days
+        }
+
+    def __repr__(self):
+        f = '<DelaySummary length={} count={} avg_delay={:.2f}>'
+        return f.format(self.length, self.count, self.average_delay)
+
+
+class OcDailyTestsCheckpoint:
+    #
+    # Static Methods
+    #
+    @staticmethod
+    def from_lag_indexes(end_date, tests_index, positives_index, snapshot_counts,
+                         path=CHECKPOINT_PATH):
+        checkpoint = OcDailyTestsCheckpoint(path)
+        checkpoint.end_date = end_date
+        checkpoint.snapshot_counts = snapshot_counts
+
+        for dated in tests_index.dates:
+            checkpoint.tests[dated] = DelaySummary.from_lag_index(tests_index, dated)
+
+        for dated in positives_index.dates:
+            checkpoint.positives[dated] = DelaySummary.from_lag_index(positives_index, dated)
+
+        return checkpoint
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, path=CHECKPOINT_PATH, archive_path=ARCHIVE_PATH):
+        self.path = path
+        self.archive_path = archive_path
+
+        self.end_date = None
+        self.tests = {}
+        self.positives = {}
+        self.snapshot_counts = {}
+
+        # Archive manifest hashes of snapshots as of last run. See OcArchiveManifest.
+        self.snapshot_hashes = {}
+
+        # Last snapshot ingested, used to compute changes for the next one.
+        self.snapshot = None
+
+    def exists(self):
+        return path_exists(self.path)
+
+    def load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+
+        self.end_date = date.fromisoformat(data['end_date'])
+        self.tests = self.summaries_from_dict(data['tests'])
+        self.positives = self.summaries_from_dict(data['positives'])
+        self.snapshot_counts = {date.fromisoformat(d): counts
+                                for d, counts in data['snapshot_counts'].items()}
+        self.snapshot_hashes = {date.fromisoformat(d): h
+                                for d, h in data.get('snapshot_hashes', {}).items()}
+        return self
+
+    def save(self):
+        data = {
+            'end_date': self.end_date.isoformat(),
+            'tests': self.summaries_to_dict(self.tests),
+            'positives': self.summaries_to_dict(self.positives),
+            'snapshot_counts': {d.isoformat(): [self.serialize(v) for v in counts]
+                                for d, counts in self.snapshot_counts.items()},
+            'snapshot_hashes': {d.isoformat(): h for d, h in self.snapshot_hashes.items()}
+        }
+
+        makedirs(dirname(self.path), exist_ok=True)
+        temp_path = '{}.tmp'.format(self.path)
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+        replace(temp_path, self.path)
+
+        return self.path
+
+    def ingest_through(self, end_date):
+        """Ingests each day's snapshot after checkpoint end date through end_date. Returns
+        set of test dates whose delay series were touched.
+        """
+        touched_dates = set()
+        report_date = self.end_date + timedelta(days=1)
+
+        while report_date <= end_date:
+            touched_dates |= self.ingest(report_date)
+            report_date += timedelta(days=1)
+
+        return touched_dates
+
+    def ingest(self, report_date):
+        """Appends the new tests reported by snapshot for report_date to the delay series
+        of every earlier test date.
+        """
+        touched_dates = set()
+
+        if self.snapshot is None:
+            self.snapshot = self.load_snapshot(self.end_date)
+
+        # No snapshot for date: repeat previous one, i.e. nothing was updated.
+        prev_snapshot = self.snapshot
+        snapshot = self.load_snapshot(report_date) or prev_snapshot
+
+        for metric, summaries in ((ADMIN_TESTS, self.tests), (POSITIVE_TESTS, self.positives)):
+            for dated, summary in summaries.items():
+                total = self.snapshot_value(snapshot, dated, metric)
+
+                if summary.length == 0:
+                    value = total
+                else:
+                    value = total - self.snapshot_value(prev_snapshot, dated, metric)
+
+                # The latest value is left out of the 15+ day bucket. So the previous one
+                # enters it now.
+                if value != 0 or summary.last != 0 or summary.length < DELAY_BUCKETS[-1][0]:
+                    touched_dates.add(dated)
+
+                summary.append(value)
+
+            summaries[report_date] = DelaySummary()
+
+        self.snapshot_counts[report_date] = self.count_snapshot(report_date, snapshot,
+                                                                prev_snapshot)
+        self.snapshot = snapshot
+        self.end_date = report_date
+        return touched_dates
+
+    def average_7d_delay(self, summaries, reporting_date):
+        count = 0
+        delay_days = 0
+
+        for n in range(7):
+            summary = summaries.get(reporting_date - timedelta(days=n))
+
+            if not summary or summary.length < 1:
+                return None
+
+            count += summary.count
+            delay_days += summary.delay_days
+
+        # No tests reported over week (e.g. after OC HCA stopped reporting specs).
+        if count < 1:
+            return None
+
+        return delay_days / count
+
+    #
+    # Private Methods
+    #
+    def load_snapshot(self, report_date):
+        """Returns dict mapping data dates to row values in file order (newest first).
+        """
+        file_name = FILE_NAME_F.format(report_date.strftime('%Y%m%d'))
+        file_path = path_join(self.archive_path, file_name)
+
+        if not path_exists(file_path):
+            return None
+
+        ordinals, values = parse_snapshot_file(file_path)
+        return {date.fromordinal(int(o)): row for o, row in zip(ordinals, values)}
+
+    def snapshot_value(self, snapshot, dated, metric):
+        row = snapshot.get(dated)
+        return to_int(row[metric]) if row is not None else 0
+
+    def count_snapshot(self, report_date, snapshot, prev_snapshot):
+        """Counts that come from a single snapshot. These match the cube-based values in
+        OcDailyTestsExport.extract_snapshot_counts.
+        """
+        # Repo tests come a day late: skip newest row.
+        data_dates = list(snapshot.keys())
+        tests_updates = []
+        positives_updates = []
+
+        for dated in data_dates[1:]:
+            for metric, updates in ((ADMIN_TESTS, tests_updates),
+                                    (POSITIVE_TESTS, positives_updates)):
+                change = (self.snapshot_value(snapshot, dated, metric)
+                          - self.snapshot_value(prev_snapshot, dated, metric))
+                updates.append((dated, change))
+
+        increased_dates = [dated for dated, change in tests_updates if change > 0]
+        reported_row = snapshot.get(report_date - timedelta(days=1))
+        reported_tests = reported_row[REPORTED_TESTS] if reported_row is not None else None
+        new_cases = snapshot[data_dates[1]][NEW_CASES] if len(data_dates) > 1 else None
+
+        return [
+            min(increased_dates) if increased_dates else None,
+            sum(change for _, change in tests_updates),
+            sum(change for _, change in positives_updates),
+            None if reported_tests is None or math.isnan(reported_tests) else int(reported_tests),
+            to_int(new_cases)
+        ]
+
+    def summaries_from_dict(self, data):
+        return {date.fromisoformat(d): DelaySummary.from_dict(s) for d, s in data.items()}
+
+    def summaries_to_dict(self, summaries):
+        return {d.isoformat(): s.to_dict() for d, s in summaries.items()}
+
+    def serialize(self, value):
+        return value.isoformat() if isinstance(value, date) else value
+
+    #
+    # Magic Methods
+    #
+    def __repr__(self):
+        return '<OcDailyTestsCheckpoint end_date={} dates={}>'.format(self.end_date,
+                                                                      len(self.tests))
@@ -36,7 +36,11 @@ class OcHistoricalExport:
     #
     @cached_property
     def extract(self):
-        return OcHcaDailyExtract()
+        # Hospital data comes from CDPH (see hospital_extract).
+        extract = OcHcaDailyExtract()
+        extract.prefetch(['daily_case_time_series', 'daily_test_time_series',
+                          'daily_death_time_series'])
+        return extract
 
     @cached_property
     def hospital_extract(self):
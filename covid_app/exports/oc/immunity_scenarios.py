@@ -0,0 +1,137 @@
+"""
+OC Immunity Scenarios Export
+
+Estimates the vulnerable population (not infectious or immune) under every combination of
+a grid of immunity model assumptions. All scenarios are computed at once (see
+ImmunityScenarios).
+
+Output is a long-format CSV: for each date, a row per band. Bands are percentiles of the
+vulnerable population across scenarios, plus the baseline (current model assumptions).
+"""
+from os.path import join as path_join
+from functools import cached_property
+from itertools import product
+import csv
+import time
+
+import numpy as np
+
+from config.app import DATA_ROOT, OC_POPULATION, IMMUNITY_SCENARIOS_CONFIG
+from covid_app.exports.oc_immunity import OCImmunityExport
+from covid_app.models.oc.immunity_scenarios import (ImmunityScenarios, SCENARIO_KEYS,
+                                                    BASELINE_SCENARIO)
+
+
+#
+# Constants
+#
+CSV_DATA_PATH = path_join(DATA_ROOT, 'oc')
+EXPORT_FILE_NAME = 'oc-immunity-scenarios.csv'
+CSV_HEADER = ['Date', 'Band', 'Vulnerable']
+
+# Band name, percentile of scenarios
+BANDS = (
+    ('min', 0),
+    ('p10', 10),
+    ('p25', 25),
+    ('median', 50),
+    ('p75', 75),
+    ('p90', 90),
+    ('max', 100)
+)
+
+
+class OcImmunityScenariosExport:
+    def __init__(self, grid=None):
+        """Grid maps SCENARIO_KEYS to lists of values. Missing keys use
+        IMMUNITY_SCENARIOS_CONFIG values.
+        """
+        self.run_time_start = time.time()
+        self.run_time_end = None
+
+        grid = grid if grid else {}
+        self.grid = {key: grid.get(key) or IMMUNITY_SCENARIOS_CONFIG[key]
+                     for key in SCENARIO_KEYS}
+
+    #
+    # Properties
+    #
+    @property
+    def csv_path(self):
+        return path_join(CSV_DATA_PATH, EXPORT_FILE_NAME)
+
+    @cached_property
+    def immunity_export(self):
+        return OCImmunityExport()
+
+    @property
+    def combinations(self):
+        values = [self.grid[key] for key in SCENARIO_KEYS]
+        return [dict(zip(SCENARIO_KEYS, combo)) for combo in product(*values)]
+
+    @cached_property
+    def scenarios(self):
+        # Baseline is first row.
+        scenarios = [BASELINE_SCENARIO] + self.combinations
+        return ImmunityScenarios(self.immunity_export.convolution, scenarios)
+
+    @cached_property
+    def vulnerable(self):
+        return self.scenarios.vulnerable(OC_POPULATION)
+
+    @cached_property
+    def bands(self):
+        """Maps band names to arrays of vulnerable population by date.
+        """
+        combinations = self.vulnerable[1:]
+        percentiles = np.percentile(combinations, [p for _, p in BANDS], axis=0)
+        bands = {name: percentiles[n] for n, (name, _) in enumerate(BANDS)}
+        bands['baseline'] = self.baseline
+        return bands
+
+    @cached_property
+    def baseline(self):
+        """Vulnerable population by date from oc-immunity.csv estimates. Uses the same
+        per-component rounding, so it matches that file exactly.
+        """
+        estimates = self.immunity_export.estimates
+        return np.array([self.immunity_export.vulnerable_count(e) for e in estimates])
+
+    @property
+    def dates(self):
+        return self.immunity_export.dates
+
+    @property
+    def starts_on(self):
+        return self.dates[0]
+
+    @property
+    def ends_on(self):
+        return self.dates[-1]
+
+    @property
+    def run_time(self):
+        if not self.run_time_end:
+            return None
+
+        return self.run_time_end - self.run_time_start
+
+    #
+    # Instance Methods
+    #
+    def to_csv(self):
+        bands = {name: values.round().astype(int).tolist() for name, values in self.bands.items()}
+
+        with open(self.csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+
+            for n, dated in enumerate(self.dates):
+                for name, values in bands.items():
+                    writer.writerow([dated, name, values[n]])
+
+        self.run_time_end = time.time()
+        return self.csv_path
+
+    def __repr__(self):
+        return '<OcImmunityScenariosExport scenarios={}>'.format(len(self.combinations))
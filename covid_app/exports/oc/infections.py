@@ -19,6 +19,8 @@ import time
 from config.app import DATA_ROOT
 from covid_app.extracts.oc_hca.daily_extract import OcHcaDailyExtract
 from covid_app.extracts.cdph.oc_hospitalization_extract import OcHospitalDataExtract
+from covid_app.extracts.oc_hca.delta_archive import OcDeltaArchive
+from covid_app.extracts.oc_hca.archive_manifest import OcArchiveManifest
 
 
 #
@@ -99,12 +101,19 @@ class OcInfectionsExport:
         if not csv_path:
             csv_path = self.csv_path
 
+        rows = [self.csv_headers]
+        for dated in reversed(self.dates):
+            rows.append(self.csv_row_by_date(dated))
+
         with open(csv_path, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(self.csv_headers)
+            writer.writerows(rows)
 
-            for dated in reversed(self.dates):
-                writer.writerow(self.csv_row_by_date(dated))
+        # Also store snapshot in local delta archive cache (only rows changed since yesterday)
+        # and index it in archive manifest.
+        if not self.test and csv_path == self.csv_path:
+            entry = OcArchiveManifest(OC_ARCHIVE_PATH).record(datetime.now().date())
+            OcDeltaArchive().write(datetime.now().date(), rows, entry['hash'])
 
         return csv_path
 
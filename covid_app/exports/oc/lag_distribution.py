@@ -0,0 +1,200 @@
+"""
+Lag Distribution Index
+
+Indexes the reporting-lag series behind the daily tests export: for each test date, the new
+tests (or positives) for that date reported by each following day's snapshot. Value n
+(0-based) of a series was reported with a lag of n+1 days.
+
+Cumulative sums are computed once per test date, across lags. Weighted-delay totals are
+accumulated across test dates. After that, lag bucket counts and average delays (daily or
+rolling) are constant-time lookups, whatever the bucket layout.
+"""
+#
+# Imports
+#
+from datetime import timedelta
+
+import numpy as np
+
+
+#
+# Constants
+#
+ROLLING_DAYS = 7
+
+
+#
+# Helpers
+#
+def parse_buckets(value):
+    """Parses bucket layout like '1-2,3-4,5-7,8-14,15+' into (start, end) tuples. An open
+    bucket (15+) gets end -1. Like the 15+d export column, it leaves out the latest report.
+    """
+    buckets = []
+
+    for bucket in value.split(','):
+        bucket = bucket.strip()
+
+        if bucket.endswith('+'):
+            buckets.append((int(bucket[:-1]), -1))
+        elif '-' in bucket:
+            start, end = bucket.split('-')
+            buckets.append((int(start), int(end)))
+        else:
+            buckets.append((int(bucket), int(bucket)))
+
+    for start, end in buckets:
+        if start < 1 or (end > -1 and end < start):
+            raise ValueError('Invalid lag bucket: {}-{}'.format(start, end))
+
+    return tuple(buckets)
+
+
+def bucket_label(bucket):
+    start, end = bucket
+    if end < 0:
+        return '{}+d'.format(start)
+    if end == start:
+        return '{}d'.format(start)
+    return '{}-{}d'.format(start, end)
+
+
+#
+# Classes
+#
+class LagDistributionIndex:
+    #
+    # Instance Methods
+    #
+    def __init__(self, time_series):
+        """time_series maps consecutive test dates to lag series (see module docstring).
+        """
+        dates = sorted(time_series.keys())
+        self.dates = dates
+        self.start_date = dates[0] if dates else None
+        self.num_dates = len(dates)
+
+        self.lengths = np.array([len(time_series[d]) for d in dates], dtype=np.int64)
+        max_length = int(self.lengths.max()) if len(dates) else 0
+
+        values = np.zeros((len(dates), max_length), dtype=np.int64)
+        for n, dated in enumerate(dates):
+            values[n, :self.lengths[n]] = time_series[dated]
+
+        # Counts by lag: lag_sums[n, k] is sum of lags 1 through k for date n.
+        self.lag_sums = np.zeros((len(dates), max_length + 1), dtype=np.int64)
+        np.cumsum(values, axis=1, out=self.lag_sums[:, 1:])
+
+        # Delays only count reported tests (positive values).
+        reported = np.where(values > 0, values, 0)
+        lags = np.arange(1, max_length + 1, dtype=np.int64)
+        self.counts = reported.sum(axis=1)
+        self.delay_days = (reported * lags).sum(axis=1)
+
+        # Rolling accumulators across dates. A date is valid if it has any reports.
+        self.rolling_counts = self.cumulative(self.counts)
+        self.rolling_delay_days = self.cumulative(self.delay_days)
+        self.rolling_valid = self.cumulative(self.lengths > 0)
+
+    def count(self, dated, start, end):
+        """Returns sum of values reported with lag start through end days (inclusive) for
+        test date. End -1 means every lag from start on except the latest. Returns None if
+        series doesn't reach start yet.
+        """
+        n = self.index(dated)
+        length = self.length(dated)
+
+        if length < start:
+            return None
+
+        stop = length - 1 if end < 0 else min(end, length)
+        stop = max(stop, start - 1)
+        return int(self.lag_sums[n, stop] - self.lag_sums[n, start - 1])
+
+    def length(self, dated):
+        n = self.index(dated)
+        return int(self.lengths[n]) if n is not None else 0
+
+    def lag_value(self, dated, lag):
+        """Returns value reported with lag for test date (0 if none).
+        """
+        n = self.index(dated)
+        if n is None or not 1 <= lag <= self.lengths[n]:
+            return 0
+        return int(self.lag_sums[n, lag] - self.lag_sums[n, lag - 1])
+
+    def total(self, dated, start, end):
+        """Like count, but an open bucket (end -1) includes latest report and lags not
+        reached yet count as 0.
+        """
+        n = self.index(dated)
+        length = self.length(dated)
+
+        if length < start:
+            return 0
+
+        stop = length if end < 0 else min(end, length)
+        return int(self.lag_sums[n, stop] - self.lag_sums[n, start - 1])
+
+    def reported_totals(self, dated):
+        """Returns (tests reported, lag-weighted days) counting only positive values.
+        """
+        n = self.index(dated)
+        if n is None:
+            return 0, 0
+        return int(self.counts[n]), int(self.delay_days[n])
+
+    def counts_by_bucket(self, dated, buckets):
+        return [self.count(dated, start, end) for start, end in buckets]
+
+    def average_delay(self, dated):
+        n = self.index(dated)
+
+        if n is None or self.counts[n] < 1:
+            return 0
+
+        return int(self.delay_days[n]) / int(self.counts[n])
+
+    def rolling_average_delay(self, dated, days=ROLLING_DAYS):
+        """Average delay over the days ending on date. Returns None if any of those dates
+        has no reports yet or no tests were reported over them.
+        """
+        n = self.index(dated)
+        start = n - days + 1 if n is not None else -1
+
+        if start < 0:
+            return None
+
+        if self.rolling_valid[n + 1] - self.rolling_valid[start] < days:
+            return None
+
+        count = int(self.rolling_counts[n + 1] - self.rolling_counts[start])
+        delay_days = int(self.rolling_delay_days[n + 1] - self.rolling_delay_days[start])
+
+        # No tests reported over period (e.g. after OC HCA stopped reporting specs).
+        if count < 1:
+            return None
+
+        return delay_days / count
+
+    #
+    # Private Methods
+    #
+    def index(self, dated):
+        if self.start_date is None:
+            return None
+
+        n = (dated - self.start_date).days
+        return n if 0 <= n < self.num_dates else None
+
+    def cumulative(self, values):
+        sums = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(values, out=sums[1:])
+        return sums
+
+    #
+    # Magic Methods
+    #
+    def __repr__(self):
+        end_date = self.start_date + timedelta(days=self.num_dates - 1) if self.num_dates else None
+        return '<LagDistributionIndex {}-{}>'.format(self.start_date, end_date)
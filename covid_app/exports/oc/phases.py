@@ -23,10 +23,11 @@ JSON_SCHEMA = {
 
 
 class OCPhasesExport:
-    def __init__(self, test=False):
+    def __init__(self, test=False, epidemic_mode='incremental'):
         self.run_time_start = time.time()
         self.run_time_end = None
         self.test = test
+        self.epidemic_mode = epidemic_mode
 
     #
     # Properties
@@ -44,7 +45,7 @@ class OCPhasesExport:
     # Extracts
     @cached_property
     def analysis(self):
-        return OcWaveAnalysis(self.test)
+        return OcWaveAnalysis(self.test, self.epidemic_mode)
 
     @property
     def epidemic(self):
@@ -24,10 +24,11 @@ JSON_SCHEMA = {
 
 
 class OCWavesExport:
-    def __init__(self, test=False):
+    def __init__(self, test=False, epidemic_mode='incremental'):
         self.run_time_start = time.time()
         self.run_time_end = None
         self.test = test
+        self.epidemic_mode = epidemic_mode
 
         if self.test:
             print('[WARNING] In test mode: loading sample data.')
@@ -49,7 +50,7 @@ class OCWavesExport:
     # Extracts
     @cached_property
     def analysis(self):
-        return OcWaveAnalysis(self.test)
+        return OcWaveAnalysis(self.test, self.epidemic_mode)
 
     @cached_property
     def case_extract(self):
@@ -35,7 +35,9 @@ class OcDailyDataExport:
 
     @cached_property
     def oc_hca_extract(self):
-        return OcHcaDailyExtract()
+        extract = OcHcaDailyExtract()
+        extract.prefetch()
+        return extract
 
     @property
     def dates(self):
@@ -7,14 +7,23 @@ https://services2.arcgis.com/LORzk2hk9xzHouw9/ArcGIS/rest/services/occovid_pcr_c
 #
 # Imports
 #
-from os import listdir
-from os.path import join as path_join, isfile
+from os.path import join as path_join, exists as path_exists
 from functools import cached_property
 import csv
 from datetime import date, datetime, timedelta
 
+import numpy as np
+
 from config.app import DATA_ROOT
-from covid_app.extracts.oc_hca.daily_archive_extract import OcDailyArchiveExtract
+from covid_app.extracts.oc_hca.daily_archive_extract import (OcDailyArchiveExtract,
+                                                             snapshot_registry)
+from covid_app.extracts.oc_hca.archive_cube import OcArchiveCube
+from covid_app.extracts.oc_hca.archive_manifest import OcArchiveManifest
+from covid_app.extracts.oc_hca.archive_loader import (ADMIN_TESTS, POSITIVE_TESTS, REPORTED_TESTS,
+                                                      NEW_CASES)
+from covid_app.exports.oc.daily_tests_checkpoint import (OcDailyTestsCheckpoint, DelaySummary,
+                                                         DELAY_BUCKETS)
+from covid_app.exports.oc.lag_distribution import LagDistributionIndex, bucket_label
 
 
 #
@@ -22,6 +31,7 @@ from covid_app.extracts.oc_hca.daily_archive_extract import OcDailyArchiveExtrac
 #
 OC_DATA_PATH = path_join(DATA_ROOT, 'oc')
 EXPORT_FILE_NAME = 'oc-hca-testing.csv'
+CUSTOM_BUCKETS_FILE_NAME = 'oc-hca-testing-custom-buckets.csv'
 
 # First date I started archiving spec data.
 START_DATE = '2020-08-03'
@@ -83,22 +93,11 @@ class OcDailyTestsExport:
 
     @cached_property
     def end_date(self):
-        return max(self.extract_dates)
+        return self.manifest.latest_date
 
     @cached_property
     def extract_dates(self):
-        extract_dates = []
-        archive_path = path_join(OC_DATA_PATH, 'daily')
-
-        for fname in listdir(archive_path):
-            extract_path = path_join(archive_path, fname)
-
-            if isfile(extract_path):
-                yyyymmdd = ''.join(c for c in fname if c.isdigit())
-                extract_date = datetime.strptime(yyyymmdd, '%Y%m%d').date()
-                extract_dates.append(extract_date)
-
-        return extract_dates
+        return self.manifest.dates
 
     @property
     def yesterday(self):
@@ -118,102 +117,229 @@ class OcDailyTestsExport:
     # File Info
     @cached_property
     def csv_path(self):
-        return path_join(OC_DATA_PATH, EXPORT_FILE_NAME)
+        # Custom bucket layouts go to their own file so the standard export keeps its columns.
+        file_name = CUSTOM_BUCKETS_FILE_NAME if self.custom_buckets else EXPORT_FILE_NAME
+        return path_join(OC_DATA_PATH, file_name)
 
-    # Extracts
     @cached_property
-    def daily_extracts(self):
-        dated_extracts = {}
+    def csv_header(self):
+        if not self.custom_buckets:
+            return CSV_HEADER
+
+        start = CSV_HEADER.index('Tests Delayed 1-2d')
+        end = start + 2 * len(DELAY_BUCKETS)
+        labels = [bucket_label(bucket) for bucket in self.buckets]
+        distributions = (['Tests Delayed {}'.format(labels[0])] + labels[1:]
+                         + ['Pos Tests Delayed {}'.format(labels[0])] + labels[1:])
+        return CSV_HEADER[:start] + distributions + CSV_HEADER[end:]
 
-        for extract_date in self.dates:
-            extract = OcDailyArchiveExtract(extract_date)
-            dated_extracts[extract_date] = extract
+    @property
+    def custom_buckets(self):
+        return self.buckets != DELAY_BUCKETS
+
+    # Extracts
+    @cached_property
+    def manifest(self):
+        return OcArchiveManifest()
 
-        return dated_extracts
+    @cached_property
+    def cube(self):
+        # Cube is rebuilt when archive changes. Snapshots are parsed by a process pool.
+        return OcArchiveCube(workers=self.workers, manifest=self.manifest).load()
 
     @cached_property
     def most_recent_daily_extract(self):
-        return self.daily_extracts[self.end_date]
+        return OcDailyArchiveExtract.for_date(self.end_date)
+
+    @cached_property
+    def checkpoint(self):
+        return OcDailyTestsCheckpoint()
+
+    @property
+    def snapshot_stats(self):
+        return snapshot_registry.stats
 
     # Time Series
+    # Each maps a date to its values as reported by each following day's extract.
     @cached_property
     def total_tests_time_series(self):
         # Note: The extract for a given date will only report tests through the previous day.
-        time_series = {}
-        for dated in self.dates:
-
-            time_series[dated] = self.extract_total_tests_time_series_for_date(dated)
-        return time_series
+        return self.extract_vintage_time_series(ADMIN_TESTS)
 
     @cached_property
     def new_tests_time_series(self):
-        time_series = {}
-        for dated in self.dates:
-            time_series[dated] = self.extract_new_tests_time_series_for_date(dated)
-        return time_series
+        return self.extract_vintage_time_series(ADMIN_TESTS, diff=True)
 
     @cached_property
     def total_positives_time_series(self):
-        time_series = {}
-        for dated in self.dates:
-            time_series[dated] = self.extract_total_positives_time_series_for_date(dated)
-        return time_series
+        return self.extract_vintage_time_series(POSITIVE_TESTS)
 
     @cached_property
     def new_positives_time_series(self):
-        time_series = {}
+        return self.extract_vintage_time_series(POSITIVE_TESTS, diff=True)
+
+    # Lag Distributions
+    @cached_property
+    def tests_lag_index(self):
+        return LagDistributionIndex(self.new_tests_time_series)
+
+    @cached_property
+    def positives_lag_index(self):
+        return LagDistributionIndex(self.new_positives_time_series)
+
+    @cached_property
+    def snapshot_counts(self):
+        dated_counts = {}
         for dated in self.dates:
-            time_series[dated] = self.extract_new_positives_time_series_for_date(dated)
-        return time_series
+            dated_counts[dated] = self.extract_snapshot_counts(dated)
+        return dated_counts
 
     #
     # Instance Methods
     #
-    def __init__(self):
-        pass
+    def __init__(self, incremental=False, workers=None, buckets=None):
+        self.incremental = incremental
+        self.workers = workers
+        self.buckets = buckets if buckets else DELAY_BUCKETS
+        self.updated_rows = 0
 
     def to_csv(self):
+        if self.incremental and self.can_update_csv():
+            return self.update_csv()
+
         with open(self.csv_path, 'w', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow(CSV_HEADER)
+            writer.writerow(self.csv_header)
 
             for dated in reversed(self.dates):
                 writer.writerow(self.extract_data_to_csv_row(dated))
 
+        self.updated_rows = len(self.dates)
+
+        # Checkpoint only tracks the standard buckets.
+        if not self.custom_buckets:
+            self.save_checkpoint()
+
         return self.csv_path
 
+    def update_csv(self):
+        """Ingests only the archive snapshots that arrived since the last run and rewrites
+        the csv rows they touched.
+        """
+        # No new snapshots and none changed since last run.
+        if self.checkpoint.end_date == self.end_date:
+            return self.csv_path
+
+        prev_latest_extract = OcDailyArchiveExtract.for_date(self.checkpoint.end_date)
+        touched_dates = self.checkpoint.ingest_through(self.end_date)
+
+        # 7-day delay averages look back a week.
+        for dated in list(touched_dates):
+            touched_dates.update(dated + timedelta(days=n) for n in range(1, 7))
+
+        # Columns pulled from latest extract change wherever its values were revised.
+        for dated in self.dates:
+            reporting_date = dated - timedelta(days=1)
+            prev_values = self.extract_latest_values(prev_latest_extract, reporting_date)
+            latest_values = self.extract_latest_values(self.most_recent_daily_extract,
+                                                       reporting_date)
+            if prev_values != latest_values:
+                touched_dates.add(reporting_date)
+
+        with open(self.csv_path, newline='') as f:
+            reader = csv.reader(f)
+            next(reader)
+            dated_rows = {row[0]: row for row in reader}
+
+        for dated in self.dates:
+            reporting_date = dated - timedelta(days=1)
+            if reporting_date in touched_dates or str(reporting_date) not in dated_rows:
+                dated_rows[str(reporting_date)] = self.checkpoint_data_to_csv_row(dated)
+                self.updated_rows += 1
+
+        with open(self.csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.csv_header)
+
+            for key in sorted(dated_rows.keys(), reverse=True):
+                writer.writerow(dated_rows[key])
+
+        self.checkpoint.snapshot_hashes = self.manifest.hashes
+        self.checkpoint.save()
+        return self.csv_path
+
+    def can_update_csv(self):
+        """Incremental update needs last run's checkpoint and csv file. And every snapshot
+        it ingested must be unchanged, otherwise csv is rebuilt from scratch.
+        """
+        if self.custom_buckets:
+            return False
+
+        if not (self.checkpoint.exists() and path_exists(self.csv_path)):
+            return False
+
+        self.checkpoint.load()
+        changed_dates = self.manifest.changed_dates(self.checkpoint.snapshot_hashes)
+        return all(dated > self.checkpoint.end_date for dated in changed_dates)
+
+    def save_checkpoint(self):
+        checkpoint = OcDailyTestsCheckpoint.from_lag_indexes(
+            self.end_date,
+            self.tests_lag_index,
+            self.positives_lag_index,
+            self.snapshot_counts,
+            self.checkpoint.path
+        )
+        checkpoint.snapshot_hashes = self.manifest.hashes
+        return checkpoint.save()
+
     #
     # Private
     #
     def extract_data_to_csv_row(self, extract_date):
-        extract = self.daily_extracts[extract_date]
-        latest_extract = self.most_recent_daily_extract
-
         # Remember: the extract will be reporting values from the day previous.
         reporting_date = extract_date - timedelta(days=1)
 
-        # Test Series
-        tests_series = self.new_tests_time_series.get(reporting_date, [])
-        pos_series = self.new_positives_time_series.get(reporting_date, [])
+        tests_index = self.tests_lag_index
+        positives_index = self.positives_lag_index
 
         # Delays
-        daily_avg_delay = self.average_delay_for_series(tests_series)
-        effective_reporting_date = reporting_date - timedelta(days=daily_avg_delay)
-        avg_test_delay_7d = self.average_7d_test_delay_for_date(reporting_date)
-        avg_pos_delay_7d = self.average_7d_pos_test_delay_for_date(reporting_date)
+        delays = [
+            tests_index.average_delay(reporting_date),
+            tests_index.rolling_average_delay(reporting_date),
+            positives_index.rolling_average_delay(reporting_date)
+        ]
 
         # Distributions
-        tests_delayed_1_to_2d = self.get_series_value_by_day_offset_range(tests_series, 1, 2)
-        tests_delayed_3_to_4d = self.get_series_value_by_day_offset_range(tests_series, 3, 4)
-        tests_delayed_5_to_7d = self.get_series_value_by_day_offset_range(tests_series, 5, 6)
-        tests_delayed_8_to_14d = self.get_series_value_by_day_offset_range(tests_series, 8, 14)
-        tests_delayed_15d_plus = self.get_series_value_by_day_offset_range(tests_series, 15, -1)
-
-        pos_delayed_1_to_2d = self.get_series_value_by_day_offset_range(pos_series, 1, 2)
-        pos_delayed_3_to_4d = self.get_series_value_by_day_offset_range(pos_series, 3, 4)
-        pos_delayed_5_to_7d = self.get_series_value_by_day_offset_range(pos_series, 5, 6)
-        pos_delayed_8_to_14d = self.get_series_value_by_day_offset_range(pos_series, 8, 14)
-        pos_delayed_15d_plus = self.get_series_value_by_day_offset_range(pos_series, 15, -1)
+        tests_delayed = tests_index.counts_by_bucket(reporting_date, self.buckets)
+        pos_delayed = positives_index.counts_by_bucket(reporting_date, self.buckets)
+
+        snapshot_counts = self.snapshot_counts[extract_date]
+        return self.compose_csv_row(reporting_date, delays, snapshot_counts, tests_delayed,
+                                    pos_delayed)
+
+    def checkpoint_data_to_csv_row(self, extract_date):
+        reporting_date = extract_date - timedelta(days=1)
+        tests = self.checkpoint.tests.get(reporting_date, DelaySummary())
+        positives = self.checkpoint.positives.get(reporting_date, DelaySummary())
+
+        delays = [
+            tests.average_delay,
+            self.checkpoint.average_7d_delay(self.checkpoint.tests, reporting_date),
+            self.checkpoint.average_7d_delay(self.checkpoint.positives, reporting_date)
+        ]
+
+        snapshot_counts = self.checkpoint.snapshot_counts[extract_date]
+        return self.compose_csv_row(reporting_date, delays, snapshot_counts,
+                                    tests.bucket_values, positives.bucket_values)
+
+    def compose_csv_row(self, reporting_date, delays, snapshot_counts, tests_delayed,
+                        pos_delayed):
+        daily_avg_delay, avg_test_delay_7d, avg_pos_delay_7d = delays
+        oldest_test, tests_repo, pos_repo, tests_reported, new_cases = snapshot_counts
+        effective_reporting_date = reporting_date - timedelta(days=daily_avg_delay)
+        admin_tests, pos_tests, *latest_avgs = self.extract_latest_values(
+            self.most_recent_daily_extract, reporting_date)
 
         return [
             reporting_date,
@@ -221,167 +347,94 @@ class OcDailyTestsExport:
             # Delays
             daily_avg_delay,
             effective_reporting_date,
-            extract.oldest_updated_admin_test,
+            oldest_test,
 
             # Test Counts
-            extract.reported_total_admin_tests,
-            self.most_recent_daily_extract.admin_tests.get(reporting_date, 'N/A'),
+            tests_repo,
+            admin_tests,
 
             # Positive Counts
-            extract.reported_total_positive_tests,
-            latest_extract.positive_tests.get(reporting_date, 'N/A'),
+            pos_repo,
+            pos_tests,
 
             # Averages
             avg_test_delay_7d,
             avg_pos_delay_7d,
-            latest_extract.dated_7d_avg_test_specs.get(reporting_date, 'N/A'),
-            latest_extract.dated_7d_avg_positive_specs.get(reporting_date, 'N/A'),
-            latest_extract.dated_7d_avg_spec_positive_rate.get(reporting_date, 'N/A'),
-            latest_extract.dated_7d_avg_positive_case_rate.get(reporting_date, 'N/A'),
-
-            # Delay Distributions for Tests
-            tests_delayed_1_to_2d,
-            tests_delayed_3_to_4d,
-            tests_delayed_5_to_7d,
-            tests_delayed_8_to_14d,
-            tests_delayed_15d_plus,
-
-            # Delay Distributions for Positive Tests
-            pos_delayed_1_to_2d,
-            pos_delayed_3_to_4d,
-            pos_delayed_5_to_7d,
-            pos_delayed_8_to_14d,
-            pos_delayed_15d_plus,
+            *latest_avgs,
+
+            # Delay Distributions for Tests and Positive Tests
+            *tests_delayed,
+            *pos_delayed,
 
             # Reporting Columns
-            extract.reported_new_tests,
-            extract.reported_new_cases_for_yesterday
+            tests_reported,
+            new_cases
         ]
 
-    def average_delay_for_series(self, series):
-        tests = []
-        test_delay_days = []
-
-        for n, count in enumerate(series):
-            delay = n + 1
-            if count > 0:
-                tests.append(count)
-                test_delay_days.append(count * delay)
-
-        if sum(tests) < 1:
-            return 0
-
-        return sum(test_delay_days) / sum(tests)
-
-    def average_7d_test_delay_for_date(self, reporting_date):
-        tests = []
-        test_delay_days = []
-
-        for n in range(7):
-            dated = reporting_date - timedelta(days=n)
-            tests_series = self.new_tests_time_series.get(dated)
-
-            if not tests_series:
-                return None
-
-            for n, count in enumerate(tests_series):
-                delay = n + 1
-                if count > 0:
-                    tests.append(count)
-                    test_delay_days.append(count * delay)
-
-        return sum(test_delay_days) / sum(tests)
-
-    def average_7d_pos_test_delay_for_date(self, reporting_date):
-        tests = []
-        test_delay_days = []
-
-        for n in range(7):
-            dated = reporting_date - timedelta(days=n)
-            tests_series = self.new_positives_time_series.get(dated)
-
-            if not tests_series:
-                return None
-
-            for n, count in enumerate(tests_series):
-                delay = n + 1
-                if count > 0:
-                    tests.append(count)
-                    test_delay_days.append(count * delay)
+    def extract_latest_values(self, extract, reporting_date):
+        return [
+            extract.admin_tests.get(reporting_date, 'N/A'),
+            extract.positive_tests.get(reporting_date, 'N/A'),
+            extract.dated_7d_avg_test_specs.get(reporting_date, 'N/A'),
+            extract.dated_7d_avg_positive_specs.get(reporting_date, 'N/A'),
+            extract.dated_7d_avg_spec_positive_rate.get(reporting_date, 'N/A'),
+            extract.dated_7d_avg_positive_case_rate.get(reporting_date, 'N/A')
+        ]
 
-        return sum(test_delay_days) / sum(tests)
+    def extract_snapshot_counts(self, extract_date):
+        """Counts that come from the extract for a single date: oldest test updated, total
+        tests and positives updated, and the repo columns.
+        """
+        tests_updates = self.cube.snapshot_changes(extract_date, ADMIN_TESTS)
+        positives_updates = self.cube.snapshot_changes(extract_date, POSITIVE_TESTS)
+        reporting_date = extract_date - timedelta(days=1)
 
-    def get_series_value_by_day_offset_range(self, series, start, end):
-        index = start - 1
-        if len(series) >= start:
-            subset = series[index:end]
-            return sum(subset)
-        else:
-            return None
+        return [
+            self.oldest_increased_date(tests_updates),
+            sum(tests_updates.values()),
+            sum(positives_updates.values()),
+            self.cube.snapshot_value(extract_date, reporting_date, REPORTED_TESTS),
+            self.reported_new_cases_for_yesterday(extract_date)
+        ]
 
-    def extract_total_tests_time_series_for_date(self, dated):
-        """Extract all total tests values ranging from dated to last daily extract.
+    def extract_vintage_time_series(self, metric, diff=False):
+        """Slices cube to map each date to its values from every later extract through
+        end date. If diff is set, values are changes from the previous extract.
         """
-        series = []
-        num_days = (self.end_date - dated).days
+        time_series = {}
+        layer = self.cube.metric_layer(metric)
+        end_index = self.cube.report_index(self.end_date)
 
-        for n in range(num_days):
+        for dated in self.dates:
             # Remember offset since tests are reported next day
-            next_day = n + 1
-            extract_date = dated + timedelta(next_day)
-            extract = self.daily_extracts[extract_date]
-            total_tests = self.to_int(extract.admin_tests.get(dated))
-            series.append(total_tests)
+            start_index = self.cube.report_index(dated + timedelta(days=1))
+            data_index = self.cube.data_index(dated)
 
-        return series
+            # Archive may not have reported this date yet.
+            if data_index < layer.shape[1]:
+                series = layer[start_index:end_index+1, data_index]
+            else:
+                series = np.zeros(max(end_index + 1 - start_index, 0), dtype=np.int64)
 
-    def extract_new_tests_time_series_for_date(self, dated):
-        series = []
-        total_tests_series = self.total_tests_time_series.get(dated)
+            if diff:
+                series = np.diff(series, prepend=0)
 
-        for n, total_tests in enumerate(total_tests_series):
-            if n == 0:
-                series.append(total_tests)
-                continue
+            time_series[dated] = series.tolist()
 
-            prev = total_tests_series[n-1]
-            new_tests = total_tests - prev
-            series.append(int(new_tests))
+        return time_series
 
-        return series
+    def oldest_increased_date(self, dated_changes):
+        # May be none if OC HCA didn't report data for a day (i.e. no updates).
+        increased_dates = [dated for dated, change in dated_changes.items() if change > 0]
+        return min(increased_dates) if increased_dates else None
 
-    def extract_total_positives_time_series_for_date(self, dated):
-        series = []
-        num_days = (self.end_date - dated).days
+    def reported_new_cases_for_yesterday(self, extract_date):
+        # Repo tests come a day late: use extract's second row.
+        FOR_YESTERDAY = 1
+        data_dates = self.cube.snapshot_data_dates(extract_date)
 
-        for n in range(num_days):
-            # Remember offset since tests are reported next day
-            next_day = n + 1
-            extract_date = dated + timedelta(next_day)
-            extract = self.daily_extracts[extract_date]
-            total_tests = self.to_int(extract.positive_tests.get(dated))
-            series.append(total_tests)
-
-        return series
-
-    def extract_new_positives_time_series_for_date(self, dated):
-        series = []
-        totals_series = self.total_positives_time_series.get(dated)
-
-        for n, totals in enumerate(totals_series):
-            if n == 0:
-                series.append(totals)
-                continue
-
-            prev = totals_series[n-1]
-            new_positives = totals - prev
-            series.append(int(new_positives))
-
-        return series
-
-    def to_int(self, value):
-        try:
-            int_value = int(value)
-        except (TypeError, ValueError):
-            int_value = 0
-        return int_value
+        if len(data_dates) <= FOR_YESTERDAY:
+            return 0
+
+        value = self.cube.snapshot_value(extract_date, data_dates[FOR_YESTERDAY], NEW_CASES)
+        return value or 0
@@ -6,7 +6,8 @@ import time
 from config.app import DATA_ROOT, OC_POPULATION
 from covid_app.extracts.oc_hca.daily_extract import OcHcaDailyExtract
 from covid_app.extracts.cdph.oc_vaccines_daily_extract import OcVaccinesDailyExtract
-from covid_app.models.oc.immune_cohort import ImmuneCohort
+from covid_app.models.oc.immune_cohort import ImmuneCohort, CohortLedger
+from covid_app.models.oc.immunity_convolution import ImmunityConvolution
 
 #
 # Constants
@@ -29,14 +30,17 @@ INFECTIOUS_WINDOW = 14              # days
 VACCINE_IMMUNITY_WINDOW = 9 * 30    # days
 INFECTION_IMMUNITY_WINDOW = 6 * 30  # days
 
-# This is the factor by which positive cases are estimated to have been undercounted.
-# Probably conservative. There are various studies that put the number between 4 and 7.
-UNDERTEST_FACTOR = 2.5
+# UNDERTEST_FACTOR (how much positive cases are undercounted) is defined in immune_cohort
+# model (3.0). A copy here (2.5) was never used, so it was removed to avoid confusion.
 
 # Need to adjust down vaccination count since one dose does not equal full vaccination
 # for a vaccine that requires more than one shot. Also none are 100% effective.
 VAX_EFFICACY_FACTOR = 0.45
 
+# Estimate engines: convolution computes every date at once (see ImmunityConvolution). Loop
+# sums over every earlier cohort for each date. Both produce the same estimates.
+ESTIMATE_ENGINES = ('convolution', 'loop')
+
 
 class OCImmunityExport:
     #
@@ -56,11 +60,46 @@ class OCImmunityExport:
 
     @cached_property
     def estimates(self):
+        if self.engine == 'loop':
+            return self.loop_estimates
+
+        convolution = self.convolution
+        estimates = []
+        series = zip(self.dates, convolution.infectious.tolist(),
+                     convolution.recovered.tolist(), convolution.vaccinated.tolist(),
+                     convolution.partial_vax, convolution.full_vax, convolution.boosted)
+
+        for dated, infectious, recovered, vaccinated, partial_vax, full_vax, boosted in series:
+            estimates.append({
+                'date': dated,
+                'infectious': infectious,
+                'recovered': recovered,
+                'vaccinated': vaccinated,
+                'partial_vax': partial_vax,
+                'full_vax': full_vax,
+                'boosted': boosted
+            })
+
+        return estimates
+
+    @cached_property
+    def convolution(self):
+        return ImmunityConvolution(
+            [self.daily_count(self.vax_extract.partially_vaccinated, d) for d in self.dates],
+            [self.daily_count(self.vax_extract.fully_vaccinated, d) for d in self.dates],
+            [self.daily_count(self.vax_extract.boosted, d) for d in self.dates],
+            [self.daily_count(self.case_extract.new_positive_tests_administered, d)
+             for d in self.dates]
+        )
+
+    @cached_property
+    def loop_estimates(self):
         estimates = []
         cohorts = []
+        partial_ledger = CohortLedger('partial')
+        boosted_ledger = CohortLedger('boosted')
 
-        # Note here: update_boosted_cohorts requires cycling through cohorts from oldest
-        # to newest.
+        # Note here: ledgers match shots to cohorts from oldest to newest.
         for dated in self.dates:
             partial_vax = self.vax_extract.partially_vaccinated.get(dated, 0) or 0
             full_vax = self.vax_extract.fully_vaccinated.get(dated, 0) or 0
@@ -68,8 +107,10 @@ class OCImmunityExport:
             infected = self.case_extract.new_positive_tests_administered.get(dated, 0) or 0
 
             cohort = ImmuneCohort(dated, partial_vax, full_vax, boosted, infected)
-            cohort.update_partially_vaxxed_cohorts(cohorts)
-            cohort.update_boosted_cohorts(cohorts)
+            partial_ledger.allocate(cohort.full_vax_count)
+            boosted_ledger.allocate(cohort.boost_vax_count)
+            partial_ledger.append(cohort)
+            boosted_ledger.append(cohort)
             cohorts.append(cohort)
 
             estimate = {
@@ -107,8 +148,12 @@ class OCImmunityExport:
     #
     # Instance Method
     #
-    def __init__(self):
+    def __init__(self, engine='convolution'):
+        if engine not in ESTIMATE_ENGINES:
+            raise ValueError('Invalid estimate engine: {}'.format(engine))
+
         self.run_time_start = time.time()
+        self.engine = engine
 
     def to_csv(self):
         with open(self.csv_path, 'w', newline='') as f:
@@ -124,18 +169,23 @@ class OCImmunityExport:
     #
     # Private
     #
-    def extract_data_to_csv_row(self, estimate):
+    def daily_count(self, daily_counts, dated):
+        return daily_counts.get(dated, 0) or 0
+
+    def vulnerable_count(self, estimate):
+        # Components are rounded before subtracting, as in csv rows.
         infectious = round(estimate['infectious'])
         recovered = round(estimate['recovered'])
         vaccinated = round(estimate['vaccinated'])
-        vulnerable = OC_POPULATION - infectious - recovered - vaccinated
+        return OC_POPULATION - infectious - recovered - vaccinated
 
+    def extract_data_to_csv_row(self, estimate):
         return [
             estimate['date'],
-            infectious,
-            recovered,
-            vaccinated,
-            vulnerable,
+            round(estimate['infectious']),
+            round(estimate['recovered']),
+            round(estimate['vaccinated']),
+            self.vulnerable_count(estimate),
             estimate['partial_vax'],
             estimate['full_vax'],
             estimate['boosted']
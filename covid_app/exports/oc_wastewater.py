@@ -38,7 +38,14 @@ class OCWastewaterExport:
 
     @cached_property
     def extract(self):
-        return OcWastewaterExtract(self.use_mock)
+        return OcWastewaterExtract(self.use_mock, stream=True)
+
+    @cached_property
+    def oc_rows_by_date(self):
+        rows_by_date = {}
+        for row in self.extract.oc_rows:
+            rows_by_date.setdefault(row['date'], []).append(row)
+        return rows_by_date
 
     @property
     def dates(self):
@@ -88,7 +95,7 @@ class OCWastewaterExport:
     #
     def extract_oc_data_to_csv_rows(self, dated):
         csv_rows = []
-        extract_rows = [r for r in self.extract.oc_rows if r['date'] == dated]
+        extract_rows = self.oc_rows_by_date.get(dated, [])
 
         for extract_row in extract_rows:
             csv_row = [
@@ -0,0 +1,153 @@
+"""
+ArcGIS Query Client
+
+Queries ArcGIS feature service layers for the OC HCA and San Diego County extracts.
+
+Queries ask only for the listed outFields, skip geometry and use compact f=json. The first
+page is a plain query. If the server reports exceededTransferLimit, the record count and
+the layer's maxRecordCount are fetched. The rest of the records are then split into ranges
+of one page each and requested concurrently using resultOffset and resultRecordCount. Servers
+may return fewer records than requested (e.g. byte limits), so each range keeps requesting
+from where the last page stopped until it's filled.
+
+    client = ArcGisQueryClient(SERVICES_URL)
+    rows = client.query('occovid_case_csv', 'daily_cases_repo IS NOT NULL',
+                        ['Date', 'daily_cases_repo'], order_by='Date')
+
+For ArcGIS REST API query parameters, see:
+https://developers.arcgis.com/rest/services-reference/enterprise/query-feature-service-layer/
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from covid_app.extracts.http_cache import shared_cache
+
+
+# Page requests in flight at once
+MAX_PAGE_WORKERS = 4
+
+
+class ArcGisQueryError(Exception):
+    pass
+
+
+class ArcGisQueryClient:
+    def __init__(self, services_url, layer=0, cache=None, max_workers=MAX_PAGE_WORKERS):
+        """Services_url is the ArcGIS REST services root,
+        like https://services2.arcgis.com/{id}/ArcGIS/rest/services.
+        """
+        self.services_url = services_url
+        self.layer = layer
+        self.cache = cache if cache else shared_cache
+        self.max_workers = max_workers
+        self.lock = Lock()
+
+        # Stats
+        self.page_count = 0
+        self.bytes_received = 0
+
+    #
+    # Methods
+    #
+    def query(self, service, where, out_fields, order_by=None):
+        """Returns list of attribute dicts for features matching where clause. Order_by is
+        needed for stable paging if layer is larger than its maxRecordCount.
+        """
+        params = self.query_params(where, out_fields, order_by)
+        first_page = self.fetch_page(service, params)
+        rows = self.extract_attributes(first_page)
+
+        if not first_page.get('exceededTransferLimit'):
+            return rows
+
+        # Page the remaining records concurrently. First page shows server's actual cap,
+        # which may be below maxRecordCount.
+        record_count = self.fetch_record_count(service, where)
+        max_record_count = self.fetch_max_record_count(service) or len(rows)
+        page_size = min(max_record_count, len(rows)) if rows else max_record_count
+        ranges = [(start, min(start + page_size, record_count))
+                  for start in range(len(rows), record_count, page_size)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pages = executor.map(lambda r: self.fetch_range(service, params, *r), ranges)
+            for page_rows in pages:
+                rows.extend(page_rows)
+
+        if len(rows) != record_count:
+            f = 'Expected {} records from {}, got {}'
+            raise ArcGisQueryError(f.format(record_count, service, len(rows)))
+
+        return rows
+
+    def fetch_range(self, service, params, start, stop):
+        """Returns records from offset start up to stop, requesting again from where each
+        short page ends.
+        """
+        rows = []
+        offset = start
+
+        while offset < stop:
+            range_params = dict(params, resultOffset=offset, resultRecordCount=stop - offset)
+            page_rows = self.extract_attributes(self.fetch_page(service, range_params))
+
+            if not page_rows:
+                f = 'No records from {} at offset {} (expected {})'
+                raise ArcGisQueryError(f.format(service, offset, stop - offset))
+
+            rows.extend(page_rows[:stop - offset])
+            offset += len(page_rows)
+
+        return rows
+
+    def query_params(self, where, out_fields, order_by=None):
+        params = {
+            'where': where,
+            'outFields': ','.join(out_fields),
+            'returnGeometry': 'false',
+            'f': 'json'
+        }
+
+        if order_by:
+            params['orderByFields'] = order_by
+
+        return params
+
+    def fetch_page(self, service, params):
+        json_data = self.fetch_json(self.query_url(service), params)
+
+        if 'features' not in json_data:
+            f = 'Unexpected response from {}: {}'
+            raise ArcGisQueryError(f.format(service, json_data.get('error', json_data)))
+
+        with self.lock:
+            self.page_count += 1
+        return json_data
+
+    def fetch_record_count(self, service, where):
+        params = {'where': where, 'returnCountOnly': 'true', 'f': 'json'}
+        return self.fetch_json(self.query_url(service), params)['count']
+
+    def fetch_max_record_count(self, service):
+        json_data = self.fetch_json(self.layer_url(service), {'f': 'json'})
+        return json_data.get('maxRecordCount')
+
+    def fetch_json(self, url, params):
+        response = self.cache.get(url, params=params)
+        response.raise_for_status()
+
+        with self.lock:
+            self.bytes_received += response.size
+        return response.json()
+
+    def extract_attributes(self, json_data):
+        return [f['attributes'] for f in json_data['features'] if f.get('attributes')]
+
+    def layer_url(self, service):
+        return '{}/{}/FeatureServer/{}'.format(self.services_url, service, self.layer)
+
+    def query_url(self, service):
+        return '{}/query'.format(self.layer_url(service))
+
+    def __repr__(self):
+        f = '<ArcGisQueryClient services_url={} pages={} bytes={}>'
+        return f.format(self.services_url, self.page_count, self.bytes_received)
@@ -22,10 +22,11 @@ report_date_window_start	"2021-05-08"
 report_date_window_end	"2021-05-14"
 community_transmission_level	"high"
 """
-import requests
 from datetime import datetime
 from functools import cached_property
 
+from covid_app.extracts.http_cache import shared_cache
+
 
 EXTRACT_URL = 'https://covid.cdc.gov/covid-data-tracker/COVIDData/getAjaxData'
 DATASET_ID_F = 'integrated_county_timeseries_fips_{}_external'
@@ -123,7 +124,7 @@ class CdcCountyTimeseriesExtract:
     def fetch_data_source(self):
         params = {'id': self.county_id}
 
-        response = requests.get(self.url, params=params)
+        response = shared_cache.get(self.url, params=params)
         response.raise_for_status()  # will raise a requests.exceptions.HTTPError error
         self.json = response.json()
 
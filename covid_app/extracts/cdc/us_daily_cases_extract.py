@@ -1,6 +1,8 @@
 """
 United States COVID-19 Cases and Deaths by State over Time
 
+State counts are summed by submission date on the server (see SoqlQuery).
+
 https://dev.socrata.com/foundry/data.cdc.gov/9mfq-cb36
 https://github.com/xmunoz/sodapy
 """
@@ -8,11 +10,13 @@ from sodapy import Socrata
 from datetime import date, datetime
 from functools import cached_property
 from config.secrets import SODA_APP_TOKEN
+from covid_app.extracts.soql_query import SoqlQuery
 
 
 EXTRACT_URL = 'data.cdc.gov'
 DATASET_ID = '9mfq-cb36'
 START_DATE = date(2020, 3, 1)
+TOTAL_COLUMNS = ['new_case', 'new_death']
 
 
 class CdcDailyCasesExtract:
@@ -44,12 +48,15 @@ class CdcDailyCasesExtract:
     @cached_property
     def cdc_data(self):
         start_date_iso = datetime.combine(START_DATE, datetime.min.time()).isoformat()
-        parameters = {
-            '$where': "submission_date >= '{}'".format(start_date_iso),
-        }
+        query = SoqlQuery(
+            select=['submission_date'] + [SoqlQuery.sum(c) for c in TOTAL_COLUMNS],
+            where="submission_date >= '{}'".format(start_date_iso),
+            group=['submission_date'],
+            order=['submission_date']
+        )
 
         client = Socrata(EXTRACT_URL, SODA_APP_TOKEN)
-        return client.get_all(DATASET_ID, **parameters)
+        return query.fetch_all(client, DATASET_ID)
 
     @cached_property
     def daily_logs(self):
@@ -84,9 +91,9 @@ class CdcDailyCasesExtract:
         daily_national_total = 0
 
         for daily_log in self.daily_logs[dated]:
-            # On 2021-04-21, new_case column disappeared from MO's daily log
-            reported_total = daily_log.get(column, '0.0')
-            state_total = int(float(reported_total))
-            daily_national_total += state_total
+            # On 2021-04-21, new_case column disappeared from MO's daily log. Server sums
+            # skip null values.
+            reported_total = daily_log.get(SoqlQuery.sum_alias(column), '0.0')
+            daily_national_total += int(float(reported_total))
 
         return daily_national_total
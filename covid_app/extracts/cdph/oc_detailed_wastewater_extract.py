@@ -4,7 +4,6 @@ CA Department of Wastewater Extract
 For info on data source, see:
 https://www.cdph.ca.gov/Programs/CID/DCDC/Pages/COVID-19/CalSuWers-Dashboard.aspx
 """
-import requests
 import csv
 import codecs
 import math
@@ -14,6 +13,7 @@ from functools import cached_property
 from datetime import datetime, timedelta
 from contextlib import closing
 from config.app import DATA_ROOT, OC_FIPS
+from covid_app.extracts.http_cache import shared_cache
 
 
 DATASET_ID = 'b8c6ee3b-539d-4d62-8fa2-c7cd17c16656'
@@ -23,6 +23,25 @@ EXTRACT_URL_F = "{}/dataset/{}/resource/{}/download/master-covid-public.csv"
 SAMPLE_CSV = 'cdph-master-wastewater.csv'
 START_DATE = '6/28/2021'
 
+# Streaming mode filters on these while decoding and keeps only OC_COLUMNS.
+COUNTY_HEADER = 'county_names'
+VIRUS_TYPE_HEADER = 'pcr_target'
+VIRUS_TYPE_FILTER = 'sars-cov-2'
+OC_COLUMNS = (
+    'sample_collect_date',
+    'pcr_target_avg_conc',
+    'county_names',
+    'site_id',
+    'zipcode',
+    'epaid',
+    'wwtp_name',
+    'lab_id',
+    'sample_id',
+    'pcr_target',
+    'pcr_gene_target',
+    'pcr_target_units'
+)
+
 
 class DataSourceError(Exception):
     pass
@@ -71,12 +90,13 @@ class OcWastewaterExtract:
     @cached_property
     def oc_rows(self):
         rows = []
-        county_header = 'county_names'
+        county_header = COUNTY_HEADER
         county_filter = OC_FIPS
-        virus_type_header = 'pcr_target'
-        virus_type_filter = 'sars-cov-2'
+        virus_type_header = VIRUS_TYPE_HEADER
+        virus_type_filter = VIRUS_TYPE_FILTER
+        source_rows = self.stream_oc_rows() if self.stream else self.csv_rows
 
-        for row in self.csv_rows:
+        for row in source_rows:
             date = row['sample_collect_date']
             concentrate = row.get('pcr_target_avg_conc', '0.0')
             county_value = row.get(county_header)
@@ -153,9 +173,14 @@ class OcWastewaterExtract:
     #
     # Instance Methods
     #
-    def __init__(self, mock=False, csv_path=None):
+    def __init__(self, mock=False, csv_path=None, stream=False):
+        """In stream mode, oc_rows are filtered from the source as it is read and the
+        statewide csv_rows are never loaded.
+        """
         self.use_mock = mock
         self.csv_path = csv_path
+        self.stream = stream
+        self.source_row_count = 0
 
     def load_test_csv(self):
         rows = []
@@ -170,11 +195,50 @@ class OcWastewaterExtract:
 
         return rows
 
+    def stream_oc_rows(self):
+        """Yields OC_COLUMNS dicts for OC Covid rows in source file.
+        """
+        if self.use_mock:
+            print('NOTE: streaming mock data from sample csv: {}'.format(self.sample_csv_path))
+            with open(self.sample_csv_path, 'rb') as f:
+                yield from self.filter_oc_lines(line.rstrip(b'\r\n') for line in f)
+        else:
+            stream = self.fetch_source_stream()
+            with closing(stream) as r:
+                yield from self.filter_oc_lines(r.iter_lines())
+
+        if self.source_row_count < 10:
+            f = "{} rows in file.\n\nSource can be manually checked at:\n{}"
+            raise DataSourceError(f.format(self.source_row_count, self.url))
+
+    def filter_oc_lines(self, lines):
+        """Filters raw csv lines (bytes) on county and virus type. Lines without OC FIPS code
+        are skipped before they're decoded or parsed.
+        """
+        lines = iter(lines)
+        header = next(csv.reader([next(lines).decode('utf-8')]))
+        columns = [c for c in OC_COLUMNS if c in header]
+        indexes = [header.index(c) for c in columns]
+        county_index = header.index(COUNTY_HEADER)
+        virus_type_index = header.index(VIRUS_TYPE_HEADER)
+        county_bytes = OC_FIPS.encode('utf-8')
+
+        for line in lines:
+            self.source_row_count += 1
+            if county_bytes not in line:
+                continue
+
+            values = next(csv.reader([line.decode('utf-8')]))
+            if values[county_index] != OC_FIPS or values[virus_type_index] != VIRUS_TYPE_FILTER:
+                continue
+
+            yield {column: values[index] for column, index in zip(columns, indexes)}
+
     #
     # Private
     #
     def fetch_source_stream(self):
-        response = requests.get(self.url, stream=True)
+        response = shared_cache.get(self.url)
         response.raise_for_status()
         return response
 
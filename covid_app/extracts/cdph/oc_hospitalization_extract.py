@@ -9,7 +9,6 @@ To test or troubleshoot (see main block at bottom of file):
     $ python covid_app/extracts/cdph/oc_hospitalization_extract.py [--live]
 """
 import sys
-import requests
 import csv
 import codecs
 import time
@@ -18,6 +17,8 @@ from functools import cached_property
 from datetime import datetime, timedelta
 from contextlib import closing
 
+from covid_app.extracts.http_cache import shared_cache
+
 
 EXTRACT_URL = 'https://data.chhs.ca.gov'
 EXTRACT_PATH_F = 'dataset/{}/resource/{}/download/{}'
@@ -171,7 +172,7 @@ class OcHospitalDataExtract:
     # Private
     #
     def fetch_source_stream(self):
-        response = requests.get(self.url, stream=True)
+        response = shared_cache.get(self.url)
         response.raise_for_status()
         return response
 
@@ -7,10 +7,11 @@ https://data.ca.gov/dataset/covid-19-vaccine-progress-dashboard-data
 The CDPH will occasionally update the resource ID (EXTRACT_ID below). For more info, see:
 https://github.com/klenwell/covid-19/issues/82
 """
-import requests
 from functools import cached_property
 from datetime import datetime, timedelta
 
+from covid_app.extracts.http_cache import shared_cache
+
 
 EXTRACT_URL = 'https://data.ca.gov/api/3/action/datastore_search_sql'
 EXTRACT_ID = 'eef88868-0cfc-4655-8a5a-3d1af1d23498'
@@ -104,7 +105,7 @@ class OcVaccinesDailyExtract:
         return json_data
 
     def fetch_json_data(self, url):
-        response = requests.get(url)
+        response = shared_cache.get(url)
         response.raise_for_status()
         return response.json()
 
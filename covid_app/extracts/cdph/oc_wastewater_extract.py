@@ -9,7 +9,6 @@ To test or troubleshoot (see main block at bottom of file):
     $ python covid_app/extracts/cdph/oc_wastewater_extract.py [--live]
 """
 import sys
-import requests
 import csv
 import codecs
 import math
@@ -19,6 +18,8 @@ from functools import cached_property
 from datetime import datetime, timedelta
 from contextlib import closing
 
+from covid_app.extracts.http_cache import shared_cache
+
 
 EXTRACT_URL = 'https://datavisualization.cdph.ca.gov'
 EXTRACT_PATH = '/t/SARSCov2/views/CalSuWersDashboard_v5_AllDataExport/Cal-SuWers.csv'
@@ -263,7 +264,7 @@ class OcWastewaterExtract:
     # Private
     #
     def fetch_source_stream(self):
-        response = requests.get(self.url, stream=True)
+        response = shared_cache.get(self.url)
         response.raise_for_status()
         return response
 
@@ -1,6 +1,8 @@
 """
 COVID-19 Reported Patient Impact and Hospital Capacity by State Timeseries
 
+State counts are summed by date on the server (see SoqlQuery).
+
 https://dev.socrata.com/foundry/healthdata.gov/g62h-syeh
 https://github.com/xmunoz/sodapy
 """
@@ -8,11 +10,14 @@ from sodapy import Socrata
 from datetime import date, datetime
 from functools import cached_property
 from config.secrets import SODA_APP_TOKEN
+from covid_app.extracts.soql_query import SoqlQuery
 
 
 EXTRACT_URL = 'healthdata.gov'
 DATASET_ID = 'g62h-syeh'
 START_DATE = date(2020, 3, 1)
+HOSPITALIZATIONS_COLUMN = 'total_adult_patients_hospitalized_confirmed_and_suspected_covid'
+ICU_CASES_COLUMN = 'staffed_icu_adult_patients_confirmed_and_suspected_covid'
 
 
 class HHSDailyPatientsExtract:
@@ -21,13 +26,11 @@ class HHSDailyPatientsExtract:
     #
     @cached_property
     def hospitalizations(self):
-        col_name = 'total_adult_patients_hospitalized_confirmed_and_suspected_covid'
-        return self.daily_totals(col_name)
+        return self.daily_totals(HOSPITALIZATIONS_COLUMN)
 
     @cached_property
     def icu_cases(self):
-        col_name = 'staffed_icu_adult_patients_confirmed_and_suspected_covid'
-        return self.daily_totals(col_name)
+        return self.daily_totals(ICU_CASES_COLUMN)
 
     @property
     def dates(self):
@@ -53,12 +56,16 @@ class HHSDailyPatientsExtract:
     @cached_property
     def cdc_data(self):
         start_date_iso = datetime.combine(START_DATE, datetime.min.time()).isoformat()
-        parameters = {
-            '$where': "date >= '{}'".format(start_date_iso),
-        }
+        columns = [HOSPITALIZATIONS_COLUMN, ICU_CASES_COLUMN]
+        query = SoqlQuery(
+            select=['date'] + [SoqlQuery.sum(column) for column in columns],
+            where="date >= '{}'".format(start_date_iso),
+            group=['date'],
+            order=['date']
+        )
 
         client = Socrata(EXTRACT_URL, SODA_APP_TOKEN)
-        return client.get_all(DATASET_ID, **parameters)
+        return query.fetch_all(client, DATASET_ID)
 
     @cached_property
     def daily_logs(self):
@@ -84,8 +91,8 @@ class HHSDailyPatientsExtract:
         daily_national_total = 0
 
         for daily_log in self.daily_logs[dated]:
-            value = daily_log.get(column, '0')
-            state_total = int(float(value))
-            daily_national_total += state_total
+            # Sum is left out if all states' values are null.
+            value = daily_log.get(SoqlQuery.sum_alias(column), '0')
+            daily_national_total += int(float(value))
 
         return daily_national_total
@@ -1,6 +1,8 @@
 """
 COVID-19 Diagnostic Laboratory Testing (PCR Testing) Time Series
 
+State results are summed by date and outcome on the server (see SoqlQuery).
+
 https://dev.socrata.com/foundry/healthdata.gov/j8mb-icvb
 https://github.com/xmunoz/sodapy
 """
@@ -8,11 +10,13 @@ from sodapy import Socrata
 from datetime import date, datetime
 from functools import cached_property
 from config.secrets import SODA_APP_TOKEN
+from covid_app.extracts.soql_query import SoqlQuery
 
 
 EXTRACT_URL = 'healthdata.gov'
 DATASET_ID = 'j8mb-icvb'
 START_DATE = date(2020, 3, 1)
+RESULTS_COLUMN = 'new_results_reported'
 
 
 class HHSDailyTestsExtract:
@@ -62,24 +66,27 @@ class HHSDailyTestsExtract:
     @cached_property
     def cdc_data(self):
         start_date_iso = datetime.combine(START_DATE, datetime.min.time()).isoformat()
-        parameters = {
-            '$where': "date >= '{}'".format(start_date_iso),
-        }
+        query = SoqlQuery(
+            select=['date', 'overall_outcome', SoqlQuery.sum(RESULTS_COLUMN)],
+            where="date >= '{}'".format(start_date_iso),
+            group=['date', 'overall_outcome'],
+            order=['date', 'overall_outcome']
+        )
 
         client = Socrata(EXTRACT_URL, SODA_APP_TOKEN)
-        return client.get_all(DATASET_ID, **parameters)
+        return query.fetch_all(client, DATASET_ID)
 
     @cached_property
     def daily_logs(self):
         daily_logs = {}
 
-        for daily_state_data in self.cdc_data:
-            dated = datetime.fromisoformat(daily_state_data['date']).date()
+        for daily_outcome_data in self.cdc_data:
+            dated = datetime.fromisoformat(daily_outcome_data['date']).date()
 
             if daily_logs.get(dated):
-                daily_logs[dated].append(daily_state_data)
+                daily_logs[dated].append(daily_outcome_data)
             else:
-                daily_logs[dated] = [daily_state_data]
+                daily_logs[dated] = [daily_outcome_data]
 
         return daily_logs
 
@@ -96,7 +103,7 @@ class HHSDailyTestsExtract:
             if daily_log['overall_outcome'].lower() != outcome.lower():
                 continue
 
-            state_total = int(float(daily_log['new_results_reported']))
-            daily_national_total += state_total
+            outcome_total = int(float(daily_log.get(SoqlQuery.sum_alias(RESULTS_COLUMN), '0')))
+            daily_national_total += outcome_total
 
         return daily_national_total
@@ -0,0 +1,211 @@
+"""
+HTTP Cache
+
+On-disk cache for GET requests made by remote extracts. A response body is saved to disk
+with its ETag and Last-Modified headers. Later requests for the same URL revalidate with
+If-None-Match and If-Modified-Since. On 304 Not Modified, the body is read from disk.
+
+Offline mode (python app.py --cached ...) never touches the network. Responses come from
+disk, and a URL that was never cached raises HttpCacheMissError.
+
+Extracts use the shared cache:
+
+    response = shared_cache.get(url, params=params)
+    with closing(response) as r:
+        for line in r.iter_lines(): ...
+"""
+from os import makedirs, replace, remove
+from os.path import join as path_join, exists as path_exists, getsize
+from contextlib import closing
+from threading import Lock
+import hashlib
+import json
+import time
+import requests
+
+from config.app import HTTP_CACHE_CONFIG
+
+
+class HttpCacheMissError(Exception):
+    def __init__(self, url):
+        message = 'No cached response for {} (offline mode)'.format(url)
+        super().__init__(message)
+        self.url = url
+
+
+class CachedResponse:
+    """Response body read from cache file. Has the parts of requests.Response that extracts
+    use. Bodies are only cached for successful responses.
+    """
+    def __init__(self, url, body_path, from_cache=False):
+        self.url = url
+        self.body_path = body_path
+        self.from_cache = from_cache
+        self.status_code = 200
+
+    #
+    # Properties
+    #
+    @property
+    def content(self):
+        with open(self.body_path, 'rb') as f:
+            return f.read()
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    @property
+    def size(self):
+        return getsize(self.body_path)
+
+    #
+    # Methods
+    #
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_lines(self):
+        with open(self.body_path, 'rb') as f:
+            for line in f:
+                yield line.rstrip(b'\r\n')
+
+    def iter_content(self, chunk_size=HTTP_CACHE_CONFIG['chunk_size']):
+        with open(self.body_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return '<CachedResponse url={} from_cache={}>'.format(self.url, self.from_cache)
+
+
+class HttpCache:
+    def __init__(self, path=None, offline=None):
+        c = HTTP_CACHE_CONFIG
+        self.path = path if path else c['path']
+        self.offline = offline if offline is not None else c['offline']
+        self.session = requests.Session()
+        self.lock = Lock()
+
+        # Stats. Hits are responses read from disk (304 or offline).
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_fetched = 0
+
+    #
+    # Properties
+    #
+    @property
+    def request_count(self):
+        return self.hits + self.misses
+
+    @property
+    def summary(self):
+        f = 'HTTP cache: {} hit(s), {} miss(es), {:.1f} MB saved, {:.1f} MB fetched{}'
+        mb = 1024 * 1024
+        offline = ' (offline)' if self.offline else ''
+        return f.format(self.hits, self.misses, self.bytes_saved / mb, self.bytes_fetched / mb,
+                        offline)
+
+    #
+    # Methods
+    #
+    def get(self, url, params=None):
+        """Returns CachedResponse for GET request. Raises requests.exceptions.HTTPError for
+        error responses.
+        """
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        key = hashlib.sha256(full_url.encode('utf-8')).hexdigest()
+        meta = self.load_meta(key)
+
+        if self.offline:
+            if not meta:
+                raise HttpCacheMissError(full_url)
+            return self.read_cached(full_url, key, meta)
+
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self.session.get(full_url, headers=headers, stream=True)
+        with closing(response):
+            if response.status_code == 304 and meta:
+                return self.read_cached(full_url, key, meta)
+
+            response.raise_for_status()
+            return self.write_cached(full_url, key, response)
+
+    def read_cached(self, url, key, meta):
+        with self.lock:
+            self.hits += 1
+            self.bytes_saved += meta['size']
+        return CachedResponse(url, self.body_path(key), from_cache=True)
+
+    def write_cached(self, url, key, response):
+        makedirs(self.path, exist_ok=True)
+        body_path = self.body_path(key)
+        temp_path = '{}.{}.tmp'.format(body_path, id(response))
+        size = 0
+
+        try:
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(HTTP_CACHE_CONFIG['chunk_size']):
+                    f.write(chunk)
+                    size += len(chunk)
+            replace(temp_path, body_path)
+        finally:
+            if path_exists(temp_path):
+                remove(temp_path)
+
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': size,
+            'fetched_at': time.time()
+        }
+        self.save_meta(key, meta)
+
+        with self.lock:
+            self.misses += 1
+            self.bytes_fetched += size
+        return CachedResponse(url, body_path)
+
+    def load_meta(self, key):
+        meta_path = self.meta_path(key)
+        if not path_exists(meta_path) or not path_exists(self.body_path(key)):
+            return None
+
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def save_meta(self, key, meta):
+        meta_path = self.meta_path(key)
+        temp_path = '{}.{}.tmp'.format(meta_path, id(meta))
+
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+        replace(temp_path, meta_path)
+
+    def body_path(self, key):
+        return path_join(self.path, '{}.body'.format(key))
+
+    def meta_path(self, key):
+        return path_join(self.path, '{}.json'.format(key))
+
+    def __repr__(self):
+        f = '<HttpCache path={} offline={} requests={}>'
+        return f.format(self.path, self.offline, self.request_count)
+
+
+# Shared by remote extracts. See CovidApp for --cached option and stats summary.
+shared_cache = HttpCache()
@@ -7,11 +7,12 @@ The daily extract is a Jenkins job that is run nightly. So that data may be more
 than the manually run oc-hca.csv. It also has a slightly different format.
 """
 import csv
-from os.path import join as path_join, exists as path_exists
+from os.path import join as path_join
 from functools import cached_property
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from config.app import DATA_ROOT
+from covid_app.extracts.oc_hca.archive_manifest import OcArchiveManifest
 
 
 DATE_F = '%Y-%m-%d'
@@ -108,23 +109,27 @@ class OcDailyHcaExtract:
     # I'm extracting data from an export csv.
     @cached_property
     def csv_path(self):
-        fname_f = 'oc-hca-{}.csv'
+        return self.manifest.file_path(self.snapshot_date)
 
-        # Find latest file by date in directory, going backwards from today
+    @cached_property
+    def snapshot_date(self):
+        # Latest file in archive must be from the last 3 days.
+        latest_date = self.manifest.latest_date
         today = datetime.now().date()
-        for days_back in range(3):
-            dated = today - timedelta(days=days_back)
-            fname = fname_f.format(dated.strftime('%Y%m%d'))
-            fpath = path_join(self.csv_dir, fname)
-            if path_exists(fpath):
-                return fpath
 
-        raise ValueError('Could not find file.')
+        if not latest_date or (today - latest_date).days >= 3:
+            raise ValueError('Could not find file.')
+
+        return latest_date
 
     @property
     def csv_dir(self):
         return path_join(DATA_ROOT, 'oc', 'daily')
 
+    @cached_property
+    def manifest(self):
+        return OcArchiveManifest(self.csv_dir)
+
     # Dates
     @cached_property
     def dates(self):
@@ -133,13 +138,11 @@ class OcDailyHcaExtract:
 
     @property
     def end_date(self):
-        col = COL_NAMES
-        for row in self.export_rows:
-            try:
-                int(row[col['tests_admin']]) and int(row[col['tests_positive']])
-                return datetime.strptime(row['Date'], DATE_F).date()
-            except ValueError:
-                pass
+        # Newest date with both test counts in csv_path snapshot. Manifest finds it when
+        # snapshot is indexed.
+        entry = self.manifest.entry(self.snapshot_date)
+        last_complete_test_date = entry['last_complete_test_date']
+        return date.fromisoformat(last_complete_test_date) if last_complete_test_date else None
 
     @property
     def start_date(self):
@@ -1,10 +1,24 @@
-import csv
-import requests
+"""
+NYT US Counties Extract
+
+Daily logs for counties from NYT us-counties yearly files. Each yearly file is read once for
+all of the extract's FIPS codes (see NyTimesCountyYear). Years in IMMUTABLE_YEARS are no
+longer updated, so they're parsed for all counties and saved under data/cache/nyt. Later
+runs load them from disk without fetching the source file.
+
+For info on data source, see:
+https://github.com/nytimes/covid-19-data
+"""
 import codecs
+from os import makedirs
+from os.path import join as path_join, exists as path_exists
 from contextlib import closing
-from datetime import datetime
 from functools import cached_property
 
+from config.app import DATA_ROOT
+from covid_app.extracts.http_cache import shared_cache
+from covid_app.extracts.nyt.county_year import NyTimesCountyYear
+
 
 EXTRACT_URL_F = 'https://raw.githubusercontent.com/nytimes/covid-19-data/master/us-counties-{}.csv'
 DATE_F = '%Y-%m-%d'
@@ -12,6 +26,12 @@ START_YEAR = 2020
 STOP_YEAR = 2022  # Or: datetime.today().year
 KENT_MI_FIPS = '26081'
 
+# NYT stopped updating county data after 2022.
+IMMUTABLE_YEARS = (2020, 2021, 2022)
+COUNTY_YEARS_PATH = path_join(DATA_ROOT, 'cache', 'nyt')
+COUNTY_YEAR_FILE_F = 'us-counties-{}.npz'
+
+
 class NyTimesCountiesExtract:
     #
     # Static Methods
@@ -23,16 +43,26 @@ class NyTimesCountiesExtract:
         extract = NyTimesCountiesExtract(fips=KENT_MI_FIPS)
         return extract
 
+    @staticmethod
+    def county_year_path(year):
+        return path_join(COUNTY_YEARS_PATH, COUNTY_YEAR_FILE_F.format(year))
+
     #
     # Properties
     #
     @cached_property
     def daily_logs(self):
-        logs = {}
+        return self.county_daily_logs[self.fips]
+
+    @cached_property
+    def county_daily_logs(self):
+        """Maps each of extract's FIPS codes to dict of daily logs for all years.
+        """
+        logs = {fips: {} for fips in self.fips_codes}
 
         for year in self.pandemic_years:
-            for dated, data in self.yearly_logs[year].items():
-                logs[dated] = data
+            for fips in self.fips_codes:
+                logs[fips].update(self.county_years[year].daily_logs(fips))
 
         return logs
 
@@ -41,10 +71,21 @@ class NyTimesCountiesExtract:
         logs = {}
 
         for year in self.pandemic_years:
-            logs[year] = self.fetch_data_source_by_year(year)
+            logs[year] = self.county_years[year].daily_logs(self.fips)
 
         return logs
 
+    @cached_property
+    def county_years(self):
+        """Maps years to NyTimesCountyYear arrays for extract's FIPS codes.
+        """
+        county_years = {}
+
+        for year in self.pandemic_years:
+            county_years[year] = self.fetch_county_year(year)
+
+        return county_years
+
     @property
     def pandemic_years(self):
         num_years = STOP_YEAR - START_YEAR
@@ -55,46 +96,47 @@ class NyTimesCountiesExtract:
     #
     # Instance Methods
     #
-    def __init__(self, fips):
-        self.fips = fips
+    def __init__(self, fips=None, fips_codes=None):
+        """Extract logs for one county by fips or many in one pass with fips_codes. Then
+        daily_logs is for fips or first of fips_codes.
+        """
+        self.fips_codes = list(fips_codes) if fips_codes else [fips]
+        self.fips = fips if fips else self.fips_codes[0]
+
+        if self.fips not in self.fips_codes:
+            self.fips_codes.insert(0, self.fips)
+
+    def daily_logs_for(self, fips):
+        return self.county_daily_logs[fips]
 
     def fetch_data_source_by_year(self, year):
-        daily_values = {}
-        source_url = EXTRACT_URL_F.format(year)
+        return self.fetch_county_year(year).daily_logs(self.fips)
+
+    def fetch_county_year(self, year):
+        path = self.county_year_path(year)
+        immutable = year in IMMUTABLE_YEARS
+
+        if immutable and path_exists(path):
+            return NyTimesCountyYear.load(path).select(self.fips_codes)
 
         # Large stream pattern: https://stackoverflow.com/a/38677650/1093087
+        source_url = EXTRACT_URL_F.format(year)
         stream = self.fetch_source_stream(source_url)
+
         with closing(stream) as r:
             str_iterator = codecs.iterdecode(r.iter_lines(), 'utf-8')
-            reader = csv.reader(str_iterator, delimiter=',', quotechar='"')
-            last_data_row = (None, 0, 0, 0, 0)
-
-            for row in reader:
-                date_str, county, state, fips, total_cases, total_deaths = row
-
-                if fips != self.fips:
-                    continue
-
-                dated = datetime.strptime(date_str, DATE_F).date()
-                total_cases = int(total_cases)
-                total_deaths = int(total_deaths)
-                new_cases = total_cases - last_data_row[1]
-                new_deaths = total_deaths - last_data_row[2]
 
-                daily_log = {
-                    'date': dated,
-                    'new_cases': new_cases,
-                    'new_deaths': new_deaths,
-                    'total_cases': total_cases,
-                    'total_deaths': total_deaths
-                }
+            # Immutable years are parsed for all counties so any county can be loaded later.
+            if not immutable:
+                return NyTimesCountyYear.from_lines(year, str_iterator, self.fips_codes)
 
-                last_data_row = (dated, total_cases, total_deaths, new_cases, new_deaths)
-                daily_values[dated] = daily_log
+            county_year = NyTimesCountyYear.from_lines(year, str_iterator)
 
-        return daily_values
+        makedirs(COUNTY_YEARS_PATH, exist_ok=True)
+        county_year.save(path)
+        return county_year.select(self.fips_codes)
 
     def fetch_source_stream(self, url):
-        response = requests.get(url, stream=True)
+        response = shared_cache.get(url)
         response.raise_for_status()     # If error, will raise a requests.exceptions.HTTPError
         return response
@@ -0,0 +1,142 @@
+"""
+NYT County Year
+
+Compact per-county arrays for one NYT us-counties yearly file, filled in a single pass over
+the file. Counties are stored back to back in flat arrays sorted by FIPS code:
+
+    fips:     ['06059', '26081', ...]
+    starts:   offset of each county's first row (plus end offset)
+    ordinals: date.toordinal() for each row
+    cases:    total cases for each row
+    deaths:   total deaths for each row
+
+Saved as .npz file so immutable years can be loaded without fetching source file again.
+"""
+import csv
+from datetime import date
+
+import numpy as np
+
+
+# Column order in NYT us-counties files
+NYT_COLUMNS = ('date', 'county', 'state', 'fips', 'cases', 'deaths')
+
+
+class NyTimesCountyYear:
+    #
+    # Static Methods
+    #
+    @staticmethod
+    def from_lines(year, lines, fips_codes=None):
+        """Parses decoded csv lines of yearly file. Keeps all counties unless fips_codes
+        given. Blank death counts are stored as 0.
+        """
+        fips_codes = set(fips_codes) if fips_codes else None
+        county_rows = {}
+        ordinals = {}
+
+        for row in csv.reader(lines, delimiter=',', quotechar='"'):
+            date_str, _, _, fips, total_cases, total_deaths = row
+
+            if not fips or fips == 'fips':
+                continue
+            if fips_codes is not None and fips not in fips_codes:
+                continue
+
+            if date_str not in ordinals:
+                ordinals[date_str] = date.fromisoformat(date_str).toordinal()
+
+            rows = county_rows.setdefault(fips, ([], [], []))
+            rows[0].append(ordinals[date_str])
+            rows[1].append(int(total_cases))
+            rows[2].append(int(total_deaths) if total_deaths else 0)
+
+        return NyTimesCountyYear.from_county_rows(year, county_rows)
+
+    @staticmethod
+    def from_county_rows(year, county_rows):
+        fips = sorted(county_rows.keys())
+        sizes = [len(county_rows[f][0]) for f in fips]
+        starts = np.concatenate(([0], np.cumsum(sizes, dtype=np.int64)))
+
+        def column(n, dtype):
+            values = [county_rows[f][n] for f in fips]
+            return np.concatenate(values).astype(dtype) if values else np.array([], dtype)
+
+        return NyTimesCountyYear(year, fips, starts, column(0, np.int32),
+                                 column(1, np.int64), column(2, np.int64))
+
+    @staticmethod
+    def load(path):
+        with np.load(path) as data:
+            return NyTimesCountyYear(int(data['year']), list(data['fips']), data['starts'],
+                                     data['ordinals'], data['cases'], data['deaths'])
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, year, fips, starts, ordinals, cases, deaths):
+        self.year = year
+        self.fips = list(fips)
+        self.starts = starts
+        self.ordinals = ordinals
+        self.cases = cases
+        self.deaths = deaths
+        self.indexes = {f: n for n, f in enumerate(self.fips)}
+
+    def save(self, path):
+        np.savez_compressed(path, year=self.year, fips=np.array(self.fips), starts=self.starts,
+                            ordinals=self.ordinals, cases=self.cases, deaths=self.deaths)
+
+    def series(self, fips):
+        """Returns (ordinals, cases, deaths) arrays for county. Arrays are empty if county
+        not in file.
+        """
+        if fips not in self.indexes:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, empty
+
+        n = self.indexes[fips]
+        rows = slice(self.starts[n], self.starts[n + 1])
+        return self.ordinals[rows], self.cases[rows], self.deaths[rows]
+
+    def select(self, fips_codes):
+        """Returns NyTimesCountyYear with only given counties.
+        """
+        county_rows = {}
+        for fips in fips_codes:
+            if fips in self.indexes:
+                county_rows[fips] = self.series(fips)
+        return NyTimesCountyYear.from_county_rows(self.year, county_rows)
+
+    def daily_logs(self, fips):
+        """Returns dict mapping dates to daily log dicts for county. New counts are change
+        from county's previous row in this year's file.
+        """
+        logs = {}
+        last_cases = 0
+        last_deaths = 0
+
+        for ordinal, total_cases, total_deaths in zip(*self.series(fips)):
+            dated = date.fromordinal(int(ordinal))
+            total_cases = int(total_cases)
+            total_deaths = int(total_deaths)
+
+            logs[dated] = {
+                'date': dated,
+                'new_cases': total_cases - last_cases,
+                'new_deaths': total_deaths - last_deaths,
+                'total_cases': total_cases,
+                'total_deaths': total_deaths
+            }
+            last_cases = total_cases
+            last_deaths = total_deaths
+
+        return logs
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __repr__(self):
+        f = '<NyTimesCountyYear year={} counties={} rows={}>'
+        return f.format(self.year, len(self.fips), len(self))
@@ -0,0 +1,260 @@
+"""
+OC Archive Cube
+
+A columnar store for the daily snapshot archive: data/oc/daily/oc-hca-YYYYMMDD.csv
+
+Every nightly snapshot reports the full time series as it looked on that date. The cube
+stacks those snapshots into a single 3-D array:
+
+    report date (snapshot) x data date (csv row) x metric (csv column)
+
+It is built once from the archive, saved as .npy files in data/oc/cache, and memory-mapped
+on load. So the history of any value across every snapshot is an array slice rather than
+a walk over hundreds of parsed csv files.
+
+Blank cells are stored as NaN. Report dates with no snapshot in the archive repeat the
+previous snapshot, i.e. nothing was updated that day.
+"""
+#
+# Imports
+#
+from os import makedirs, replace
+from os.path import join as path_join, exists as path_exists
+from functools import cached_property
+from datetime import date, timedelta
+import json
+
+import numpy as np
+
+from config.app import DATA_ROOT
+from covid_app.extracts.oc_hca.archive_loader import (OcArchiveLoader, ARCHIVE_PATH, METRICS,
+                                                      FILE_NAME_F, snapshot_date_from_file_name)
+from covid_app.extracts.oc_hca.archive_manifest import OcArchiveManifest
+
+
+#
+# Constants
+#
+OC_DATA_PATH = path_join(DATA_ROOT, 'oc')
+CUBE_PATH = path_join(OC_DATA_PATH, 'cache', 'archive-cube')
+
+
+#
+# Classes
+#
+class OcArchiveCube:
+    #
+    # Properties
+    #
+    # Arrays
+    @cached_property
+    def values(self):
+        return np.load(self.values_path, mmap_mode='r')
+
+    @cached_property
+    def rows(self):
+        """Boolean array (report date x data date): True where snapshot includes a row for
+        data date.
+        """
+        return np.load(self.rows_path, mmap_mode='r')
+
+    @cached_property
+    def meta(self):
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    # Dates
+    @cached_property
+    def first_report_date(self):
+        return date.fromisoformat(self.meta['first_report_date'])
+
+    @cached_property
+    def last_report_date(self):
+        return self.first_report_date + timedelta(days=self.values.shape[0] - 1)
+
+    @cached_property
+    def first_data_date(self):
+        return date.fromisoformat(self.meta['first_data_date'])
+
+    @cached_property
+    def last_data_date(self):
+        return self.first_data_date + timedelta(days=self.values.shape[1] - 1)
+
+    @cached_property
+    def snapshot_dates(self):
+        return sorted(snapshot_date_from_file_name(f) for f in self.meta['snapshots'])
+
+    # Archive Files
+    @property
+    def archive_snapshots(self):
+        """Maps file names in archive to their content hash in archive manifest. Used to
+        detect when cube needs to be rebuilt.
+        """
+        snapshots = {}
+        for dated, entry in self.manifest.load().items():
+            file_name = FILE_NAME_F.format(dated.strftime('%Y%m%d'))
+            snapshots[file_name] = entry['hash']
+        return snapshots
+
+    # Paths
+    @property
+    def values_path(self):
+        return path_join(self.cube_path, 'values.npy')
+
+    @property
+    def rows_path(self):
+        return path_join(self.cube_path, 'rows.npy')
+
+    @property
+    def meta_path(self):
+        return path_join(self.cube_path, 'meta.json')
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, archive_path=ARCHIVE_PATH, cube_path=CUBE_PATH, workers=None,
+                 manifest=None):
+        self.archive_path = archive_path
+        self.cube_path = cube_path
+        self.workers = workers
+        self.manifest = manifest if manifest else OcArchiveManifest(archive_path)
+
+    def load(self):
+        """Returns cube, rebuilding it first if archive has changed since last build.
+        """
+        if not self.is_current():
+            self.build()
+        return self
+
+    def is_current(self):
+        if not path_exists(self.meta_path):
+            return False
+        return self.meta['snapshots'] == self.archive_snapshots
+
+    def build(self):
+        snapshots = self.archive_snapshots
+        loader = OcArchiveLoader(self.workers, self.archive_path)
+        report_dates = [snapshot_date_from_file_name(f) for f in snapshots]
+        parsed = loader.load(report_dates)
+
+        first_report_date = min(parsed)
+        last_report_date = max(parsed)
+        first_ordinal = min(ordinals.min() for ordinals, _ in parsed.values() if len(ordinals))
+        last_ordinal = max(ordinals.max() for ordinals, _ in parsed.values() if len(ordinals))
+
+        num_reports = (last_report_date - first_report_date).days + 1
+        num_dates = int(last_ordinal - first_ordinal) + 1
+        values = np.full((num_reports, num_dates, len(METRICS)), np.nan, dtype=np.float32)
+        rows = np.zeros((num_reports, num_dates), dtype=bool)
+
+        for n in range(num_reports):
+            report_date = first_report_date + timedelta(days=n)
+
+            # No snapshot for date: carry previous one forward.
+            if report_date not in parsed:
+                values[n] = values[n-1]
+                rows[n] = rows[n-1]
+                continue
+
+            ordinals, snapshot_values = parsed[report_date]
+            indexes = ordinals - first_ordinal
+            values[n, indexes] = snapshot_values
+            rows[n, indexes] = True
+
+        meta = {
+            'first_report_date': first_report_date.isoformat(),
+            'first_data_date': date.fromordinal(int(first_ordinal)).isoformat(),
+            'metrics': METRICS,
+            'snapshots': snapshots
+        }
+
+        makedirs(self.cube_path, exist_ok=True)
+        self.save_array(self.values_path, values)
+        self.save_array(self.rows_path, rows)
+        self.save_json(self.meta_path, meta)
+
+        self.reset()
+        return self
+
+    def reset(self):
+        for attr in ('values', 'rows', 'meta', 'first_report_date', 'last_report_date',
+                     'first_data_date', 'last_data_date', 'snapshot_dates'):
+            self.__dict__.pop(attr, None)
+
+    #
+    # Queries
+    #
+    def report_index(self, report_date):
+        return (report_date - self.first_report_date).days
+
+    def data_index(self, data_date):
+        return (data_date - self.first_data_date).days
+
+    def metric_layer(self, metric):
+        """Returns (report date x data date) integer array for metric. Blanks count as 0.
+        """
+        return np.nan_to_num(self.values[:, :, metric]).astype(np.int64)
+
+    def snapshot_data_dates(self, report_date):
+        """Returns data dates included in snapshot, newest first (i.e. in file order).
+        """
+        indexes = np.flatnonzero(self.rows[self.report_index(report_date)])[::-1]
+        return [self.first_data_date + timedelta(days=int(n)) for n in indexes]
+
+    def snapshot_value(self, report_date, data_date, metric):
+        """Returns integer value from snapshot or None if blank or not in snapshot.
+        """
+        r = self.report_index(report_date)
+        d = self.data_index(data_date)
+
+        if r < 0 or not 0 <= d < self.rows.shape[1] or not self.rows[r, d]:
+            return None
+
+        value = self.values[r, d, metric]
+        return None if np.isnan(value) else int(value)
+
+    def snapshot_changes(self, report_date, metric):
+        """Returns dict mapping data dates to change in metric from the previous day's
+        snapshot. Only nonzero changes are included.
+
+        Like OcDailyArchiveExtract.updated_admin_tests, the newest row in the snapshot is
+        skipped since tests are always reported a day late.
+        """
+        r = self.report_index(report_date)
+        present = np.array(self.rows[r])
+        newest = np.flatnonzero(present)
+        if len(newest):
+            present[newest[-1]] = False
+
+        today = np.nan_to_num(self.values[r, :, metric])
+        yesterday = np.nan_to_num(self.values[r-1, :, metric]) if r > 0 else 0
+        changes = np.where(present, today - yesterday, 0).astype(np.int64)
+
+        dated_changes = {}
+        for n in np.flatnonzero(changes):
+            dated = self.first_data_date + timedelta(days=int(n))
+            dated_changes[dated] = int(changes[n])
+        return dated_changes
+
+    #
+    # Private Methods
+    #
+    def save_array(self, path, array):
+        temp_path = '{}.tmp'.format(path)
+        with open(temp_path, 'wb') as f:
+            np.save(f, array)
+        replace(temp_path, path)
+
+    def save_json(self, path, data):
+        temp_path = '{}.tmp'.format(path)
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        replace(temp_path, path)
+
+    #
+    # Magic Methods
+    #
+    def __repr__(self):
+        f = '<OcArchiveCube reports={}-{} data={}-{}>'
+        return f.format(self.first_report_date, self.last_report_date, self.first_data_date,
+                        self.last_data_date)
@@ -0,0 +1,152 @@
+"""
+OC Archive Loader
+
+Parses daily archive snapshots (data/oc/daily/oc-hca-YYYYMMDD.csv) in parallel.
+
+Files are split across a process pool. Each worker returns compact numeric arrays for its
+snapshots rather than lists of string rows. The arrays can be consumed directly by
+OcArchiveCube and OcDailyArchiveExtract.
+"""
+#
+# Imports
+#
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from os.path import join as path_join, exists as path_exists
+from datetime import datetime
+import csv
+
+import numpy as np
+
+from config.app import DATA_ROOT, ARCHIVE_LOADER_CONFIG
+
+
+#
+# Constants
+#
+ARCHIVE_PATH = path_join(DATA_ROOT, 'oc', 'daily')
+DATE_F = '%Y-%m-%d'
+FILE_NAME_F = 'oc-hca-{}.csv'
+
+# Snapshot metrics (array columns). These should match column names in archive files.
+METRICS = (
+    'New Tests Administered',
+    'Pos Tests Administered',
+    'New Tests Reported',
+    'New Cases'
+)
+ADMIN_TESTS, POSITIVE_TESTS, REPORTED_TESTS, NEW_CASES = range(len(METRICS))
+
+
+#
+# Helpers
+#
+def snapshot_date_from_file_name(file_name):
+    yyyymmdd = ''.join(c for c in file_name if c.isdigit())
+    return datetime.strptime(yyyymmdd, '%Y%m%d').date()
+
+
+def parse_snapshot_file(file_path):
+    """Parses an archive file into compact numeric arrays:
+
+    - ordinals: data date of each row (as date ordinal), in file order (newest first)
+    - values: (rows x metrics) array of float32 with NaN for blank or missing columns
+
+    Early files end with a note rather than data rows. Those lines are skipped.
+    """
+    ordinals = []
+    values = []
+
+    with open(file_path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        cols = [header.index(m) if m in header else None for m in METRICS]
+
+        for row in reader:
+            try:
+                dated = datetime.strptime(row[0], DATE_F).date()
+            except (IndexError, ValueError):
+                continue
+
+            ordinals.append(dated.toordinal())
+            values.append([to_float(row[col]) if col is not None else np.nan for col in cols])
+
+    ordinals = np.array(ordinals, dtype=np.int32)
+    values = np.array(values, dtype=np.float32).reshape(len(ordinals), len(METRICS))
+    return ordinals, values
+
+
+def parse_snapshot_files(file_paths):
+    """Process pool task: parses a chunk of archive files.
+    """
+    return [parse_snapshot_file(file_path) for file_path in file_paths]
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+#
+# Classes
+#
+class OcArchiveLoader:
+    #
+    # Instance Methods
+    #
+    def __init__(self, workers=None, archive_path=ARCHIVE_PATH):
+        default_workers = ARCHIVE_LOADER_CONFIG['workers'] or cpu_count() or 1
+        self.workers = workers if workers is not None else default_workers
+        self.archive_path = archive_path
+
+    def file_path(self, dated):
+        file_name = FILE_NAME_F.format(dated.strftime('%Y%m%d'))
+        return path_join(self.archive_path, file_name)
+
+    def load(self, dates):
+        """Returns dict mapping each date with a snapshot in archive to its (ordinals, values)
+        arrays. Dates with no snapshot are left out.
+        """
+        dated_paths = {}
+        for dated in dates:
+            file_path = self.file_path(dated)
+            if path_exists(file_path):
+                dated_paths[dated] = file_path
+
+        parsed = self.load_files(list(dated_paths.values()))
+        return dict(zip(dated_paths.keys(), parsed))
+
+    def load_files(self, file_paths):
+        """Parses files, preserving order. Files are split into one contiguous chunk per
+        worker.
+        """
+        if self.workers <= 1 or len(file_paths) < 2:
+            return parse_snapshot_files(file_paths)
+
+        chunk_size = -(-len(file_paths) // self.workers)
+        chunks = [file_paths[n:n+chunk_size] for n in range(0, len(file_paths), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            parsed_chunks = pool.map(parse_snapshot_files, chunks)
+            return [parsed for chunk in parsed_chunks for parsed in chunk]
+
+    def load_extracts(self, dates, registry=None):
+        """Returns dict mapping dates to OcDailyArchiveExtracts built from parsed arrays. If a
+        registry is given, extracts are added to it.
+        """
+        from covid_app.extracts.oc_hca.daily_archive_extract import OcDailyArchiveExtract
+
+        extracts = {}
+        for dated, (ordinals, values) in self.load(dates).items():
+            extract = OcDailyArchiveExtract.from_snapshot_arrays(dated, ordinals, values,
+                                                                 registry)
+            if registry is not None:
+                registry.add(dated, extract)
+            extracts[dated] = extract
+
+        return extracts
+
+    def __repr__(self):
+        return '<OcArchiveLoader workers={}>'.format(self.workers)
@@ -0,0 +1,240 @@
+"""
+OC Archive Manifest
+
+Index of the daily snapshot archive (data/oc/daily/oc-hca-YYYYMMDD.csv). For each snapshot it
+records:
+
+- date: snapshot (report) date
+- bytes: file size
+- hash: sha256 of file contents
+- rows: number of data rows
+- first_data_date, last_data_date: range of data dates in snapshot
+- last_complete_test_date: newest data date with both test counts reported
+
+Commands look up snapshots here rather than listing the archive and parsing file names. The
+manifest is saved to the cache folder beside the archive. It is updated when a snapshot is
+written (see record). On every load, each indexed file's size and modified time are checked,
+so snapshots rewritten in place are read again. The folder is listed again only if its own
+modified time has changed (i.e. files added or removed). Only new or modified files are read.
+"""
+#
+# Imports
+#
+from os import listdir, makedirs, replace, stat
+from os.path import join as path_join, exists as path_exists, dirname
+from functools import cached_property
+from datetime import date, datetime
+import csv
+import hashlib
+import json
+
+from covid_app.extracts.oc_hca.archive_loader import (ARCHIVE_PATH, DATE_F, FILE_NAME_F,
+                                                      snapshot_date_from_file_name)
+
+
+#
+# Constants
+#
+MANIFEST_FILE_NAME = 'daily-manifest.json'
+
+# Test columns that must be filled for a data date to count as complete.
+TEST_COLS = ('New Tests Administered', 'Pos Tests Administered')
+
+
+#
+# Helpers
+#
+def file_hash(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+#
+# Classes
+#
+class OcArchiveManifest:
+    #
+    # Properties
+    #
+    @cached_property
+    def entries(self):
+        """Maps snapshot dates to manifest entries, in date order.
+        """
+        return self.load()
+
+    @property
+    def dates(self):
+        return list(self.entries.keys())
+
+    @property
+    def latest_date(self):
+        return self.dates[-1] if self.entries else None
+
+    @property
+    def hashes(self):
+        return {dated: entry['hash'] for dated, entry in self.entries.items()}
+
+    @property
+    def archive_mtime(self):
+        return stat(self.archive_path).st_mtime_ns
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, archive_path=ARCHIVE_PATH, path=None):
+        self.archive_path = archive_path
+
+        # Default: cache folder beside archive, e.g. data/oc/cache for data/oc/daily.
+        default_path = path_join(dirname(archive_path), 'cache', MANIFEST_FILE_NAME)
+        self.path = path if path else default_path
+
+    def entry(self, dated):
+        return self.entries.get(dated)
+
+    def file_path(self, dated):
+        file_name = FILE_NAME_F.format(dated.strftime('%Y%m%d'))
+        return path_join(self.archive_path, file_name)
+
+    def load(self):
+        """Loads entries from manifest file and refreshes them. Archive folder is only
+        listed again if it has changed since manifest was saved.
+        """
+        data = {'archive_mtime': None, 'entries': []}
+
+        if path_exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+
+        entries = {date.fromisoformat(e['date']): e for e in data['entries']}
+        rescan = data['archive_mtime'] != self.archive_mtime
+        refreshed = self.refresh(entries, rescan)
+
+        if rescan or refreshed != entries:
+            self.save(refreshed)
+
+        return refreshed
+
+    def refresh(self, entries, rescan=True):
+        """Returns entries synced with archive files. Files with the same size and modified
+        time as their entry are not read again. Without rescan, only files already in entries
+        are checked.
+        """
+        refreshed = {}
+        dates = self.archive_dates() if rescan else list(entries.keys())
+
+        for dated in dates:
+            entry = entries.get(dated)
+
+            try:
+                file_stat = stat(self.file_path(dated))
+            except FileNotFoundError:
+                continue
+
+            unchanged = entry and (entry['bytes'] == file_stat.st_size
+                                   and entry['mtime'] == file_stat.st_mtime_ns)
+
+            if unchanged:
+                refreshed[dated] = entry
+            else:
+                refreshed[dated] = self.build_entry(dated)
+
+        return refreshed
+
+    def archive_dates(self):
+        dates = []
+
+        for file_name in sorted(listdir(self.archive_path)):
+            if file_name.startswith('oc-hca-') and file_name.endswith('.csv'):
+                dates.append(snapshot_date_from_file_name(file_name))
+
+        return dates
+
+    def record(self, dated):
+        """Adds or updates entry for snapshot just written to archive.
+        """
+        entries = dict(self.entries)
+        entries[dated] = self.build_entry(dated)
+        entries = dict(sorted(entries.items()))
+
+        self.save(entries)
+        self.entries = entries
+        return entries[dated]
+
+    def changed_dates(self, hashes):
+        """Returns dates whose snapshot hash differs from hashes (e.g. from the last run)
+        including snapshots that have been added or removed since.
+        """
+        current = self.hashes
+        dates = set(current.keys()) | set(hashes.keys())
+        return sorted(d for d in dates if current.get(d) != hashes.get(d))
+
+    #
+    # Private Methods
+    #
+    def build_entry(self, dated):
+        file_path = self.file_path(dated)
+        file_stat = stat(file_path)
+        data_dates = []
+        last_complete_test_date = None
+
+        with open(file_path, newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    data_date = datetime.strptime(row['Date'], DATE_F).date()
+                except (TypeError, ValueError):
+                    continue
+
+                data_dates.append(data_date)
+
+                # Same test as OcDailyHcaExtract used: newest row with both counts filled.
+                if last_complete_test_date is None and self.has_test_counts(row):
+                    last_complete_test_date = data_date
+
+        return {
+            'date': dated.isoformat(),
+            'bytes': file_stat.st_size,
+            'mtime': file_stat.st_mtime_ns,
+            'hash': file_hash(file_path),
+            'rows': len(data_dates),
+            'first_data_date': min(data_dates).isoformat() if data_dates else None,
+            'last_data_date': max(data_dates).isoformat() if data_dates else None,
+            'last_complete_test_date': (last_complete_test_date.isoformat()
+                                        if last_complete_test_date else None)
+        }
+
+    def has_test_counts(self, row):
+        """True if every test column has a non-blank integer value.
+        """
+        for col in TEST_COLS:
+            value = (row.get(col) or '').strip()
+
+            if not value:
+                return False
+
+            try:
+                int(value)
+            except ValueError:
+                return False
+
+        return True
+
+    def save(self, entries):
+        data = {
+            'archive_mtime': self.archive_mtime,
+            'entries': list(entries.values())
+        }
+
+        makedirs(dirname(self.path), exist_ok=True)
+        temp_path = '{}.tmp'.format(self.path)
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        replace(temp_path, self.path)
+
+        return self.path
+
+    #
+    # Magic Methods
+    #
+    def __repr__(self):
+        f = '<OcArchiveManifest snapshots={} latest={}>'
+        return f.format(len(self.entries), self.latest_date)
@@ -7,12 +7,17 @@ Extract data from daily archive files.
 # Imports
 #
 from os.path import join as path_join
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from functools import cached_property
 import csv
 from statistics import stdev
+import math
 
 from config.app import DATA_ROOT
+from covid_app.extracts.oc_hca.snapshot_registry import OcSnapshotRegistry
+from covid_app.extracts.oc_hca.archive_loader import METRICS
+from covid_app.extracts.oc_hca.delta_archive import OcDeltaArchive
+from covid_app.extracts.oc_hca.archive_manifest import OcArchiveManifest
 
 
 #
@@ -32,6 +37,12 @@ def to_int(value):
     return int_value
 
 
+def format_value(value):
+    if math.isnan(value):
+        return ''
+    return str(int(value)) if float(value).is_integer() else str(float(value))
+
+
 #
 # Classes
 #
@@ -41,9 +52,21 @@ class OcDailyArchiveExtract:
     #
     @cached_property
     def csv_rows(self):
+        # Prefer delta archive: rebuilding from previous snapshot is cheaper than parsing file.
+        # But only if it was recorded from file as it is now. Files can be rewritten in place.
+        entry = archive_manifest.entry(self.date)
+        source_hash = entry['hash'] if entry else None
+
+        if source_hash and delta_archive.source_hash(self.date) == source_hash:
+            return delta_archive.read(self.date)
+
         with open(self.file_path, newline='') as f:
             reader = csv.reader(f)
             rows = list(reader)
+
+        if source_hash and delta_archive.has(self.date):
+            delta_archive.replace(self.date, rows, source_hash)
+
         return rows
 
     @cached_property
@@ -146,11 +169,12 @@ class OcDailyArchiveExtract:
     @cached_property
     def new_admin_tests(self):
         new_admin_tests = {}
+        previous_extract = self.previous_date_extract
 
         # Start with yesterday since tests are always reported a day late
         for dated in list(self.dates)[1:]:
             today = self.admin_tests.get(dated, 0) or 0
-            yesterday = self.previous_date_extract.admin_tests.get(dated, 0) or 0
+            yesterday = previous_extract.admin_tests.get(dated, 0) or 0
             change = int(today) - int(yesterday)
             new_admin_tests[dated] = change
 
@@ -219,11 +243,12 @@ class OcDailyArchiveExtract:
     @cached_property
     def new_positive_tests(self):
         new_positive_tests = {}
+        previous_extract = self.previous_date_extract
 
         # Start with yesterday since tests are always reported a day late
         for dated in list(self.dates)[1:]:
             today = self.positive_tests.get(dated, 0) or 0
-            yesterday = self.previous_date_extract.positive_tests.get(dated, 0) or 0
+            yesterday = previous_extract.positive_tests.get(dated, 0) or 0
             change = int(today) - int(yesterday)
             new_positive_tests[dated] = change
 
@@ -349,15 +374,41 @@ class OcDailyArchiveExtract:
     #
     # Etc.
     #
-    @cached_property
+    @property
     def previous_date_extract(self):
-        return OcDailyArchiveExtract(self.previous_date)
+        # Not cached: holding a reference here would chain every previous extract in memory.
+        return self.registry.get(self.previous_date)
+
+    #
+    # Static Methods
+    #
+    @staticmethod
+    def for_date(dated):
+        """Returns shared extract for date from snapshot registry.
+        """
+        return snapshot_registry.get(dated)
+
+    @staticmethod
+    def from_snapshot_arrays(dated, ordinals, values, registry=None):
+        """Builds extract from arrays parsed by OcArchiveLoader rather than reading its file.
+        Rows are laid out like the current archive format: date column then METRICS.
+        """
+        extract = OcDailyArchiveExtract(dated, registry)
+        rows = [['Date'] + list(METRICS)]
+
+        for ordinal, row_values in zip(ordinals, values):
+            row_date = date.fromordinal(int(ordinal)).strftime('%Y-%m-%d')
+            rows.append([row_date] + [format_value(value) for value in row_values])
+
+        extract.csv_rows = rows
+        return extract
 
     #
     # Instance Methods
     #
-    def __init__(self, dated):
+    def __init__(self, dated, registry=None):
         self.date = dated
+        self.registry = registry if registry is not None else snapshot_registry
 
     #
     # Private Methods
@@ -381,3 +432,11 @@ class OcDailyArchiveExtract:
     #
     def __repr__(self):
         return '<OcDailyDataExtract date={} rows={}>'.format(self.date, len(self.csv_rows))
+
+
+# Shared by all archive extracts. Use OcDailyArchiveExtract.for_date to reuse parsed snapshots.
+# Delta archive keeps last snapshot it rebuilt, so walking dates in order applies one delta each.
+# Manifest hashes tell if a delta was recorded from the current snapshot file.
+snapshot_registry = OcSnapshotRegistry(OcDailyArchiveExtract)
+delta_archive = OcDeltaArchive()
+archive_manifest = OcArchiveManifest(path_join(OC_DATA_PATH, 'daily'))
@@ -4,20 +4,33 @@ OC Health Care Agency Data
 For info on data source, see:
 https://services2.arcgis.com/LORzk2hk9xzHouw9/ArcGIS/rest/services
 """
-import requests
-import urllib.parse
 import json
+import time
 from os.path import join as path_join
 from functools import cached_property
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 from config.app import DATA_ROOT
+from covid_app.extracts.arcgis_query import ArcGisQueryClient
 
 
 # URL parts for HCA data API
 API_ID = 'LORzk2hk9xzHouw9'
 API_DOMAIN = 'https://services2.arcgis.com'
-API_URL_F = '{}/{}/ArcGIS/rest/services/{}/FeatureServer/0/query'
+API_SERVICES_URL = '{}/{}/ArcGIS/rest/services'.format(API_DOMAIN, API_ID)
+
+# Time series properties mapped to (endpoint, where_not_null_field, fields). Fields are the
+# ones data series below use. Timestamp field comes first.
+TIME_SERIES_ENDPOINTS = {
+    'daily_case_time_series': ('occovid_case_csv', 'daily_cases_repo',
+                               ['Date', 'daily_cases_repo', 'snf_cases']),
+    'daily_test_time_series': ('occovid_pcr_csv', 'daily_test_repo',
+                               ['date', 'daily_test_repo', 'daily_spec', 'daily_pos_spec']),
+    'daily_hospitalization_time_series': ('occovid_hospicu_csv', 'hospital',
+                                          ['date', 'hospital', 'icu']),
+    'daily_death_time_series': ('occovid_death_csv', 'daily_dth', ['date', 'daily_dth'])
+}
 
 
 class DataSourceError(Exception):
@@ -28,59 +41,22 @@ class OcHcaDailyExtract:
     #
     # Properties
     #
-    # Data Source Info
-    @property
-    def query_params(self):
-        return {
-            'where': '{}+IS+NOT+NULL',
-            'orderByFields': 'date',
-            'f': 'pjson',
-            'objectIds': '',
-            'outFields': '*',
-            'time': '',
-            'resultType': 'none',
-            'returnIdsOnly': 'false',
-            'returnUniqueIdsOnly': 'false',
-            'returnCountOnly': 'false',
-            'returnDistinctValues': 'false',
-            'cacheHint': 'false',
-            'groupByFieldsForStatistics': '',
-            'outStatistics': '',
-            'having': '',
-            'resultOffset': '',
-            'resultRecordCount': '',
-            'sqlFormat': 'none',
-            'token': '',
-        }
-
     # Data Extracts
     @cached_property
     def daily_case_time_series(self):
-        endpoint = 'occovid_case_csv'
-        where_not_null_field = 'daily_cases_repo'
-        json_data = self.fetch_json_data(endpoint, where_not_null_field)
-        return self.extract_from_json_data(json_data)
+        return self.fetch_time_series('daily_case_time_series')
 
     @cached_property
     def daily_test_time_series(self):
-        endpoint = 'occovid_pcr_csv'
-        where_not_null_field = 'daily_test_repo'
-        json_data = self.fetch_json_data(endpoint, where_not_null_field)
-        return self.extract_from_json_data(json_data)
+        return self.fetch_time_series('daily_test_time_series')
 
     @cached_property
     def daily_hospitalization_time_series(self):
-        endpoint = 'occovid_hospicu_csv'
-        where_not_null_field = 'hospital'
-        json_data = self.fetch_json_data(endpoint, where_not_null_field)
-        return self.extract_from_json_data(json_data)
+        return self.fetch_time_series('daily_hospitalization_time_series')
 
     @cached_property
     def daily_death_time_series(self):
-        endpoint = 'occovid_death_csv'
-        where_not_null_field = 'daily_dth'
-        json_data = self.fetch_json_data(endpoint, where_not_null_field)
-        return self.extract_from_json_data(json_data)
+        return self.fetch_time_series('daily_death_time_series')
 
     # Data Series (mapped to dates)
     @cached_property
@@ -179,37 +155,53 @@ class OcHcaDailyExtract:
     #
     def __init__(self, mock=False):
         self.fetch_samples = mock
+        self.fetch_latencies = {}
+        self.arcgis = ArcGisQueryClient(API_SERVICES_URL)
 
     def mock_api_calls(self):
         self.fetch_samples = True
 
+    def prefetch(self, properties=None):
+        """Fetches time series for all endpoints concurrently and stores them in their cached
+        properties. Properties is list of TIME_SERIES_ENDPOINTS keys (default: all). Returns
+        dict mapping endpoints to fetch time in seconds.
+        """
+        properties = properties if properties else list(TIME_SERIES_ENDPOINTS.keys())
+        properties = [p for p in properties if p not in self.__dict__]
+
+        if properties:
+            with ThreadPoolExecutor(max_workers=len(properties)) as executor:
+                time_series = executor.map(self.fetch_time_series, properties)
+
+                # Same as first access of each cached_property
+                for name, series in zip(properties, time_series):
+                    self.__dict__[name] = series
+
+        return self.fetch_latencies
+
     #
     # Private
     #
-    def build_endpoint_url(self, endpoint):
-        return API_URL_F.format(API_DOMAIN, API_ID, endpoint)
+    def fetch_time_series(self, name):
+        endpoint, where_not_null_field, fields = TIME_SERIES_ENDPOINTS[name]
+        started_at = time.time()
 
-    def build_query_params(self, where_not_null_field):
-        # Source: https://stackoverflow.com/a/23497912/1093087
-        query_params = self.query_params.copy()
-        query_params['where'] = query_params['where'].format(where_not_null_field)
-        return urllib.parse.urlencode(query_params, safe=':+*')
+        if self.fetch_samples:
+            time_series = self.load_sample_time_series(endpoint)
+        else:
+            where = '{} IS NOT NULL'.format(where_not_null_field)
+            time_series = self.arcgis.query(endpoint, where, fields, order_by=fields[0])
 
-    def fetch_json_data(self, endpoint, where_not_null_field):
-        url = self.build_endpoint_url(endpoint)
-        query_params = self.build_query_params(where_not_null_field)
+        self.fetch_latencies[endpoint] = time.time() - started_at
+        return time_series
 
-        if self.fetch_samples:
-            sample_file_name = 'oc-hca-{}.json'.format(endpoint)
-            json_path = path_join(DATA_ROOT, 'samples', sample_file_name)
-            print('fetching mock data from {}'.format(json_path))
+    def load_sample_time_series(self, endpoint):
+        sample_file_name = 'oc-hca-{}.json'.format(endpoint)
+        json_path = path_join(DATA_ROOT, 'samples', sample_file_name)
+        print('fetching mock data from {}'.format(json_path))
 
-            with open(json_path) as f:
-                return json.load(f)
-        else:
-            response = requests.get(url, params=query_params)
-            response.raise_for_status()
-            return response.json()
+        with open(json_path) as f:
+            return self.extract_from_json_data(json.load(f))
 
     def extract_from_json_data(self, json_data):
         features = json_data['features']
@@ -0,0 +1,316 @@
+"""
+OC Delta Archive
+
+Delta-encoded store for the daily snapshot archive (data/oc/daily/oc-hca-YYYYMMDD.csv).
+
+Consecutive snapshots differ only in the few recent rows OC HCA backfilled. So each snapshot
+is stored as a delta against the previous snapshot in the archive: the rows that were added
+or changed and the keys (data dates) of rows that were removed. Every so often a keyframe
+with all rows is stored instead, which bounds how many deltas have to be applied to rebuild
+a snapshot. See DELTA_ARCHIVE_CONFIG.
+
+Records are saved as data/oc/cache/delta/oc-hca-YYYYMMDD.json. Rows are stored as strings
+exactly as they appear in the csv file, so a rebuilt snapshot matches its csv file row for row.
+
+The csv files stay the published archive of record. The delta archive is a local read cache
+beside the manifest and is not committed. It can be rebuilt from the csv files at any time
+(oc delta-archive). Each record keeps the sha256 of the csv file it came from, so readers can
+tell when a file has been rewritten since (see OcDailyArchiveExtract.csv_rows).
+"""
+#
+# Imports
+#
+from os import listdir, makedirs, replace
+from os.path import join as path_join, exists as path_exists, getsize
+from datetime import date, datetime
+import csv
+import json
+
+from config.app import DATA_ROOT, DELTA_ARCHIVE_CONFIG
+from covid_app.extracts.oc_hca.archive_manifest import file_hash
+
+
+#
+# Constants
+#
+DELTA_ARCHIVE_PATH = path_join(DATA_ROOT, 'oc', 'cache', 'delta')
+FILE_NAME_F = 'oc-hca-{}.json'
+
+
+#
+# Helpers
+#
+def date_from_file_name(file_name):
+    yyyymmdd = ''.join(c for c in file_name if c.isdigit())
+    return datetime.strptime(yyyymmdd, '%Y%m%d').date()
+
+
+def row_key(row):
+    # Early snapshots end with an empty row and a note.
+    return row[0] if row else ''
+
+
+def row_to_strings(row):
+    """Formats row values the way csv.writer does.
+    """
+    return ['' if value is None else str(value) for value in row]
+
+
+#
+# Classes
+#
+class OcDeltaArchive:
+    #
+    # Properties
+    #
+    @property
+    def dates(self):
+        if not path_exists(self.path):
+            return []
+
+        return sorted(date_from_file_name(f) for f in listdir(self.path)
+                      if f.startswith('oc-hca-') and f.endswith('.json'))
+
+    @property
+    def stats(self):
+        records = [self.load_record(dated) for dated in self.dates]
+        return {
+            'snapshots': len(records),
+            'keyframes': len([r for r in records if r['keyframe']]),
+            'bytes': sum(getsize(self.record_path(dated)) for dated in self.dates)
+        }
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, path=DELTA_ARCHIVE_PATH, **opts):
+        self.path = path
+        self.keyframe_interval = opts.get('keyframe_interval',
+                                          DELTA_ARCHIVE_CONFIG['keyframe_interval'])
+
+        # Last rebuilt snapshot. Walking the archive in date order only applies one delta
+        # per snapshot.
+        self.last_read = (None, None)
+
+    def has(self, dated):
+        return path_exists(self.record_path(dated))
+
+    def read(self, dated):
+        """Returns rows (header first) of snapshot for date, rebuilt from its keyframe.
+        Returns None if date is not in archive.
+        """
+        if not self.has(dated):
+            return None
+
+        last_date, last_rows = self.last_read
+        if last_date == dated:
+            return last_rows
+
+        # Walk back to keyframe (or last snapshot read), then apply deltas going forward.
+        chain = []
+        record = self.load_record(dated)
+        while not record['keyframe'] and record['date'] != str(last_date):
+            chain.append(record)
+            record = self.load_record(date.fromisoformat(record['base']))
+
+        if record['keyframe']:
+            rows = [record['header']] + record['rows']
+        else:
+            rows = last_rows
+
+        for record in reversed(chain):
+            rows = self.apply_delta(rows, record)
+
+        self.last_read = (dated, rows)
+        return rows
+
+    def write(self, dated, rows, source_hash=None):
+        """Stores snapshot rows (header first) for date as a delta against the previous
+        snapshot in archive, or as a keyframe. Snapshots must be written in date order since
+        later deltas are based on earlier snapshots. Source_hash is sha256 of the csv file
+        (see OcArchiveManifest), used to tell if the file has been rewritten since.
+        """
+        dates = self.dates
+        if dates and dated < dates[-1]:
+            raise ValueError('Archive already has snapshots after {}'.format(dated))
+
+        rows = [row_to_strings(row) for row in rows]
+        self.save_record(dated, self.encode_record(dated, rows, source_hash))
+        self.last_read = (dated, rows)
+        return self.record_path(dated)
+
+    def replace(self, dated, rows, source_hash=None):
+        """Replaces snapshot already in archive (e.g. its csv file was rewritten). Later
+        snapshots up to the next keyframe are deltas based on it, so they are encoded again
+        against the new rows.
+        """
+        dependents = []
+        for later_date in [d for d in self.dates if d > dated]:
+            record = self.load_record(later_date)
+            if record['keyframe']:
+                break
+            dependents.append((later_date, self.read(later_date), record.get('source_hash')))
+
+        self.last_read = (None, None)
+        dependents.insert(0, (dated, [row_to_strings(row) for row in rows], source_hash))
+
+        for snapshot_date, snapshot_rows, snapshot_hash in dependents:
+            record = self.encode_record(snapshot_date, snapshot_rows, snapshot_hash)
+            self.save_record(snapshot_date, record)
+            self.last_read = (snapshot_date, snapshot_rows)
+
+        return self.record_path(dated)
+
+    def write_csv(self, dated, csv_path):
+        with open(csv_path, newline='') as f:
+            rows = list(csv.reader(f))
+        return self.write(dated, rows, file_hash(csv_path))
+
+    def source_hash(self, dated):
+        """Returns sha256 of csv file snapshot was recorded from (None if not known).
+        """
+        if not self.has(dated):
+            return None
+        return self.load_record(dated).get('source_hash')
+
+    def import_csv_archive(self, csv_archive_path):
+        """Adds every csv snapshot in archive path newer than the latest date in this
+        archive. Returns dates added.
+        """
+        dates = self.dates
+        latest_date = dates[-1] if dates else date.min
+        added = []
+
+        for file_name in sorted(listdir(csv_archive_path)):
+            if not (file_name.startswith('oc-hca-') and file_name.endswith('.csv')):
+                continue
+
+            dated = date_from_file_name(file_name)
+            if dated > latest_date:
+                self.write_csv(dated, path_join(csv_archive_path, file_name))
+                added.append(dated)
+
+        return added
+
+    def changes(self, dated):
+        """Returns what changed in snapshot for date: dict mapping row keys (data dates) to
+        (previous row, new row). Previous row is None for added rows. New row is None for
+        removed rows.
+        """
+        record = self.load_record(dated)
+
+        if record['keyframe']:
+            base_date = self.previous_date(dated)
+            base_rows = self.read(base_date) if base_date else [record['header']]
+            record = self.encode_delta(dated, base_date, base_rows, self.read(dated))
+
+            # Header changed: every row counts as changed.
+            if not record:
+                return {row_key(row): (None, row) for row in self.read(dated)[1:]}
+        else:
+            base_rows = self.read(date.fromisoformat(record['base']))
+
+        base_rows_by_key = {row_key(row): row for row in base_rows[1:]}
+        changes = {}
+
+        for row in record['rows']:
+            changes[row_key(row)] = (base_rows_by_key.get(row_key(row)), row)
+
+        for key in record['removed']:
+            changes[key] = (base_rows_by_key[key], None)
+
+        return changes
+
+    #
+    # Private Methods
+    #
+    def encode_record(self, dated, rows, source_hash=None):
+        base_date = self.previous_date(dated)
+        record = None
+
+        if base_date:
+            base_record = self.load_record(base_date)
+            depth = 0 if base_record['keyframe'] else base_record['depth']
+
+            if depth + 1 < self.keyframe_interval:
+                record = self.encode_delta(dated, base_date, self.read(base_date), rows)
+
+        if record:
+            record['depth'] = depth + 1
+        else:
+            record = self.encode_keyframe(dated, rows)
+
+        record['source_hash'] = source_hash
+        return record
+
+    def encode_keyframe(self, dated, rows):
+        return {
+            'date': dated.isoformat(),
+            'keyframe': True,
+            'header': rows[0],
+            'rows': rows[1:]
+        }
+
+    def encode_delta(self, dated, base_date, base_rows, rows):
+        """Returns delta record or None if snapshot can't be encoded as a delta against base
+        (e.g. header changed or rows don't have unique keys).
+        """
+        if rows[0] != base_rows[0]:
+            return None
+
+        base_rows_by_key = {row_key(row): row for row in base_rows[1:]}
+        keys = set(row_key(row) for row in rows[1:])
+
+        record = {
+            'date': dated.isoformat(),
+            'keyframe': False,
+            'base': base_date.isoformat() if base_date else None,
+            'header': rows[0],
+            'rows': [row for row in rows[1:] if base_rows_by_key.get(row_key(row)) != row],
+            'removed': [key for key in base_rows_by_key if key not in keys]
+        }
+
+        if self.apply_delta(base_rows, record) != rows:
+            return None
+
+        return record
+
+    def apply_delta(self, base_rows, record):
+        """Added rows come first (i.e. newest first). Other rows keep their place in base.
+        """
+        changed_rows = {row_key(row): row for row in record['rows']}
+        removed = set(record['removed'])
+        base_keys = set(row_key(row) for row in base_rows[1:])
+
+        added_rows = [row for row in record['rows'] if row_key(row) not in base_keys]
+        kept_rows = [changed_rows.get(row_key(row), row) for row in base_rows[1:]
+                     if row_key(row) not in removed]
+
+        return [record['header']] + added_rows + kept_rows
+
+    def previous_date(self, dated):
+        dates = [d for d in self.dates if d < dated]
+        return dates[-1] if dates else None
+
+    def record_path(self, dated):
+        file_name = FILE_NAME_F.format(dated.strftime('%Y%m%d'))
+        return path_join(self.path, file_name)
+
+    def load_record(self, dated):
+        with open(self.record_path(dated)) as f:
+            return json.load(f)
+
+    def save_record(self, dated, record):
+        makedirs(self.path, exist_ok=True)
+        path = self.record_path(dated)
+        temp_path = '{}.tmp'.format(path)
+
+        with open(temp_path, 'w') as f:
+            json.dump(record, f, separators=(',', ':'))
+        replace(temp_path, path)
+
+    #
+    # Magic Methods
+    #
+    def __repr__(self):
+        return '<OcDeltaArchive path={}>'.format(self.path)
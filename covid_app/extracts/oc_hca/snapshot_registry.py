@@ -0,0 +1,98 @@
+"""
+OC Snapshot Registry
+
+Shared registry of parsed daily archive snapshots (data/oc/daily/oc-hca-YYYYMMDD.csv).
+
+Holds at most one parsed extract per date so extracts that need the previous day's snapshot
+and commands that walk the archive reuse the same instance. Least recently used snapshots are
+evicted once either limit in SNAPSHOT_REGISTRY_CONFIG is reached. Size is measured by the
+size of snapshot files.
+"""
+from collections import OrderedDict
+from os.path import exists as path_exists, getsize
+
+from config.app import SNAPSHOT_REGISTRY_CONFIG
+
+
+class OcSnapshotRegistry:
+    #
+    # Properties
+    #
+    @property
+    def resident(self):
+        return len(self.snapshots)
+
+    @property
+    def stats(self):
+        return {
+            'resident': self.resident,
+            'peak_resident': self.peak_resident,
+            'resident_bytes': self.resident_bytes,
+            'evicted': self.evicted,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, loader, **opts):
+        """Loader is called with a date and this registry to create a new snapshot extract.
+        """
+        self.loader = loader
+
+        c = SNAPSHOT_REGISTRY_CONFIG
+        self.max_snapshots = opts.get('max_snapshots', c['max_snapshots'])
+        self.max_bytes = opts.get('max_bytes', c['max_bytes'])
+
+        self.snapshots = OrderedDict()
+        self.sizes = {}
+        self.resident_bytes = 0
+        self.peak_resident = 0
+        self.evicted = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, dated):
+        if dated in self.snapshots:
+            self.hits += 1
+            self.snapshots.move_to_end(dated)
+            return self.snapshots[dated]
+
+        self.misses += 1
+        snapshot = self.loader(dated, registry=self)
+        self.add(dated, snapshot)
+        return snapshot
+
+    def add(self, dated, snapshot):
+        file_path = snapshot.file_path
+        size = getsize(file_path) if path_exists(file_path) else 0
+
+        self.snapshots[dated] = snapshot
+        self.sizes[dated] = size
+        self.resident_bytes += size
+        self.peak_resident = max(self.peak_resident, self.resident)
+
+        self.evict()
+        return snapshot
+
+    def evict(self):
+        # Always keep most recently added snapshot.
+        while self.resident > 1 and self.over_limit():
+            dated, _ = self.snapshots.popitem(last=False)
+            self.resident_bytes -= self.sizes.pop(dated)
+            self.evicted += 1
+
+    def over_limit(self):
+        too_many = self.max_snapshots is not None and self.resident > self.max_snapshots
+        too_big = self.max_bytes is not None and self.resident_bytes > self.max_bytes
+        return too_many or too_big
+
+    def clear(self):
+        self.snapshots.clear()
+        self.sizes.clear()
+        self.resident_bytes = 0
+
+    def __repr__(self):
+        f = '<OcSnapshotRegistry resident={} evicted={} hits={} misses={}>'
+        return f.format(self.resident, self.evicted, self.hits, self.misses)
@@ -4,26 +4,19 @@ San Diego County COVID-19 Data
 For info on data source, see:
 https://services1.arcgis.com/1vIhDJwtG5eNmiqX/ArcGIS/rest/services
 """
-import requests
 from functools import cached_property
 from datetime import datetime, timedelta
 from collections import deque
 import csv
 
+from covid_app.extracts.arcgis_query import ArcGisQueryClient
+
 
 EXTRACT_URL = 'https://services1.arcgis.com/1vIhDJwtG5eNmiqX/ArcGIS/rest/services'
-EXTRACT_URL_F = ("{}/{}/FeatureServer/1/query?where={}+IS+NOT+NULL"
-                 "&objectIds=&time=&geometry=&geometryType=esriGeometryEnvelope&inSR="
-                 "&spatialRel=esriSpatialRelIntersects&resultType=none&distance=0.0"
-                 "&units=esriSRUnit_Meter&returnGeodetic=false&outFields=*"
-                 "&returnGeometry=true&featureEncoding=esriDefault&multipatchOption=xyFootprint"
-                 "&maxAllowableOffset=&geometryPrecision=&outSR=&datumTransformation="
-                 "&applyVCSProjection=false&returnIdsOnly=false&returnUniqueIdsOnly=false"
-                 "&returnCountOnly=false&returnExtentOnly=false&returnQueryGeometry=false"
-                 "&returnDistinctValues=false&cacheHint=false&orderByFields=Date"
-                 "&groupByFieldsForStatistics=&outStatistics=&having=&resultOffset="
-                 "&resultRecordCount=&returnZ=false&returnM=false&returnExceededLimitFeatures=true"
-                 "&quantizationParameters=&sqlFormat=none&f=pjson&token=")
+EXTRACT_LAYER = 1
+
+# Fields daily log properties use
+DAILY_LOG_FIELDS = ['Date', 'NewCases', 'NewTests', 'Positives', 'Hospitalized', 'ICU', 'Deaths']
 
 # Source: https://www.cdc.gov/coronavirus/2019-ncov/hcp/clinical-guidance-management-patients.html
 MEDIAN_LENGTH_OF_HOSPITALIZATION = 10
@@ -42,14 +35,11 @@ class SanDiegoCountyDailyExtract:
     # Static Methods
     #
     def is_in_order():
-        tell = 'features'
-        url = EXTRACT_URL_F.format(EXTRACT_URL, 'CovidDashUpdate', 'NewCases')
+        client = ArcGisQueryClient(EXTRACT_URL, layer=EXTRACT_LAYER)
 
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            json_data = response.json()
-            return tell in json_data.keys()
+            client.query('CovidDashUpdate', 'NewCases IS NOT NULL', ['Date'])
+            return True
         except Exception:
             return False
 
@@ -59,9 +49,8 @@ class SanDiegoCountyDailyExtract:
     @cached_property
     def daily_logs(self):
         endpoint = 'CovidDashUpdate'
-        where_not_null_field = 'NewCases'
-        json_data = self.fetch_json_data(endpoint, where_not_null_field)
-        return self.extract_from_json_data(json_data)
+        where = 'NewCases IS NOT NULL'
+        return self.arcgis.query(endpoint, where, DAILY_LOG_FIELDS, order_by='Date')
 
     @cached_property
     def new_cases(self):
@@ -174,7 +163,7 @@ class SanDiegoCountyDailyExtract:
     # Instance Methods
     #
     def __init__(self):
-        pass
+        self.arcgis = ArcGisQueryClient(EXTRACT_URL, layer=EXTRACT_LAYER)
 
     def to_csv(self, csv_path):
         with open(csv_path, 'w', newline='') as f:
@@ -201,17 +190,6 @@ class SanDiegoCountyDailyExtract:
     #
     # Private
     #
-    def fetch_json_data(self, endpoint, where_not_null_field):
-        url = EXTRACT_URL_F.format(EXTRACT_URL, endpoint, where_not_null_field)
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-
-    def extract_from_json_data(self, json_data):
-        features = json_data['features']
-        data = [f['attributes'] for f in features if f.get('attributes')]
-        return data
-
     def extract_from_daily_logs(self, daily_logs, key):
         daily_values = {}
         timestamp_key = 'Date'
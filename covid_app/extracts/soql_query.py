@@ -0,0 +1,100 @@
+"""
+SoQL Query
+
+Builds Socrata (SoQL) queries for the HHS and CDC extracts so sums are computed by the
+server. Rows are fetched with $limit/$offset pages. The first page is fetched alone. If it's
+full, later pages are fetched concurrently on a small thread pool until a page comes back
+short.
+
+    query = SoqlQuery(select=['date', SoqlQuery.sum('new_case')],
+                      where="date >= '2020-03-01T00:00:00'",
+                      group=['date'],
+                      order=['date'])
+    rows = query.fetch_all(Socrata(domain, token), dataset_id)
+    rows[0][SoqlQuery.sum_alias('new_case')]
+
+For SoQL clauses, see:
+https://dev.socrata.com/docs/queries/
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Rows per $limit/$offset page and page requests in flight at once
+PAGE_SIZE = 50000
+MAX_PAGE_WORKERS = 4
+
+# Aliases for sums, so they don't collide with dataset column names
+SUM_ALIAS_F = 'sum_{}'
+
+
+class SoqlQuery:
+    #
+    # Static Methods
+    #
+    @staticmethod
+    def sum(column):
+        return 'sum({}) AS {}'.format(column, SoqlQuery.sum_alias(column))
+
+    @staticmethod
+    def sum_alias(column):
+        return SUM_ALIAS_F.format(column)
+
+    #
+    # Instance Methods
+    #
+    def __init__(self, select=None, where=None, group=None, order=None):
+        """Order is needed for stable paging. With group, it should be group columns.
+        """
+        self.select = select or []
+        self.where = where
+        self.group = group or []
+        self.order = order or []
+
+    def params(self, limit=None, offset=None):
+        params = {}
+        clauses = {
+            '$select': ', '.join(self.select),
+            '$where': self.where,
+            '$group': ', '.join(self.group),
+            '$order': ', '.join(self.order),
+            '$limit': limit,
+            '$offset': offset
+        }
+
+        for clause, value in clauses.items():
+            if value not in (None, ''):
+                params[clause] = value
+
+        return params
+
+    def fetch_page(self, client, dataset_id, offset=0, page_size=PAGE_SIZE):
+        params = self.params(limit=page_size, offset=offset)
+        return client.get(dataset_id, **params)
+
+    def fetch_all(self, client, dataset_id, page_size=PAGE_SIZE, max_workers=MAX_PAGE_WORKERS):
+        """Returns list of row dicts for all pages. Client is sodapy Socrata client.
+        """
+        rows = self.fetch_page(client, dataset_id, 0, page_size)
+        if len(rows) < page_size:
+            return rows
+
+        offset = page_size
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                offsets = [offset + n * page_size for n in range(max_workers)]
+                pages = list(executor.map(
+                    lambda o: self.fetch_page(client, dataset_id, o, page_size), offsets))
+
+                for page in pages:
+                    rows.extend(page)
+
+                if any(len(page) < page_size for page in pages):
+                    return rows
+
+                offset += max_workers * page_size
+
+    def __str__(self):
+        return ' '.join('{}={}'.format(k, v) for k, v in self.params().items())
+
+    def __repr__(self):
+        return '<SoqlQuery {}>'.format(self)
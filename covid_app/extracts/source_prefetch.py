@@ -0,0 +1,66 @@
+"""
+Source Prefetch
+
+Fetches and parses remote source documents for an export concurrently on a bounded thread
+pool. Each source is a name and a function that fetches it and returns the parsed result.
+Wall time is about that of the slowest source instead of the sum of all of them.
+
+    prefetch = SourcePrefetch()
+    prefetch.add('nyt-2021', partial(extract.fetch_county_year, 2021))
+    results = prefetch.run()
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.app import SOURCE_PREFETCH_CONFIG
+
+
+class SourcePrefetch:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers if max_workers else SOURCE_PREFETCH_CONFIG['max_workers']
+        self.sources = {}
+        self.timings = {}
+        self.run_time = None
+
+    #
+    # Properties
+    #
+    @property
+    def summary_lines(self):
+        f = 'Fetched {}: {:.2f} s'
+        lines = [f.format(name, secs) for name, secs in self.timings.items()]
+        lines.append('Prefetch wall time: {:.2f} s ({} workers)'.format(self.run_time,
+                                                                        self.max_workers))
+        return lines
+
+    #
+    # Methods
+    #
+    def add(self, name, fetch):
+        self.sources[name] = fetch
+
+    def run(self):
+        """Returns dict mapping source names to results. Errors raised by a source are raised
+        here once all sources are done.
+        """
+        started_at = time.time()
+        names = list(self.sources.keys())
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.fetch_source, names))
+
+        self.run_time = time.time() - started_at
+        self.timings = {name: self.timings[name] for name in names}
+        return dict(zip(names, results))
+
+    def fetch_source(self, name):
+        started_at = time.time()
+
+        try:
+            return self.sources[name]()
+        finally:
+            self.timings[name] = time.time() - started_at
+
+    def __repr__(self):
+        f = '<SourcePrefetch sources={} max_workers={}>'
+        return f.format(len(self.sources), self.max_workers)
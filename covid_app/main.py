@@ -2,6 +2,21 @@ from cement import App
 from .controllers.base_controller import BaseController
 from .controllers.oc_controller import OcController
 from .controllers.github_action_controller import GithubActionController
+from .extracts.http_cache import shared_cache
+
+
+#
+# Hooks
+#
+def use_cached_responses(app):
+    # python app.py --cached <command>: serve remote extracts from HTTP cache only.
+    if getattr(app.pargs, 'cached', False):
+        shared_cache.offline = True
+
+
+def print_cache_summary(app):
+    if shared_cache.request_count:
+        print(shared_cache.summary)
 
 
 class CovidApp(App):
@@ -15,3 +30,8 @@ class CovidApp(App):
         template_dir = './covid_app/views'
 
         handlers = [BaseController, OcController, GithubActionController]
+
+        hooks = [
+            ('post_argument_parsing', use_cached_responses),
+            ('pre_close', print_cache_summary)
+        ]
@@ -8,15 +8,23 @@ See smooth_phases method for hardcoded phases.
 """
 from functools import cached_property
 from datetime import timedelta, date
-from math import floor, inf
+from os import makedirs, replace
+from os.path import dirname, exists as path_exists
+from math import inf
 from pprint import pformat
-from itertools import islice
+from itertools import islice, count
 from collections import deque
+import heapq
+import json
+
+import numpy as np
 
 from config.app import WAVE_ANALYSIS_CONFIG
 from covid_app.models.oc.epidemic_wave import EpidemicWave
 from covid_app.models.oc.wave_phase import WavePhase
-from covid_app.models.oc.phase_window import PhaseWindow
+from covid_app.models.oc.phase_window import PhaseWindows
+from covid_app.models.oc.timeline_slice import TimelineSlice
+from covid_app.models.oc.rolling_stats import RollingStats
 
 
 # There are some phases that don't quite cooperate. So I cheat and hardcode them.
@@ -46,6 +54,23 @@ class PhaseMergingError(Exception):
         super().__init__(message)
 
 
+class EpidemicStateError(Exception):
+    def __init__(self, waves, rebuilt_waves):
+        message = 'Incremental waves do not match full rebuild:\n{}\nrebuild:\n{}'.format(
+            pformat(waves), pformat(rebuilt_waves))
+        super().__init__(message)
+        self.waves = waves
+        self.rebuilt_waves = rebuilt_waves
+
+
+class FrozenPhaseError(Exception):
+    def __init__(self, tail_phases):
+        message = 'Tail phases would merge with frozen phases:\n{}'.format(
+            pformat(tail_phases))
+        super().__init__(message)
+        self.tail_phases = tail_phases
+
+
 class WaveExtractionError(Exception):
     def __init__(self, prev_phase, next_phase):
         message = 'Unexpected phase combination:\n{}\n{}'.format(prev_phase, next_phase)
@@ -65,7 +90,303 @@ def sliding_window(iterable, n):
         yield tuple(window)
 
 
+class PhaseNode:
+    """Phase in HeapPhaseSmoother's linked list.
+    """
+    __slots__ = ('phase', 'prev', 'next', 'alive', 'stamp')
+
+    def __init__(self, phase):
+        self.phase = phase
+        self.prev = None
+        self.next = None
+        self.alive = True
+        self.stamp = 0
+
+
+class HeapPhaseSmoother:
+    """Smooths phases the same way as Epidemic.merge_jagged_phases, merge for merge.
+
+    Phases are kept in a doubly linked list. Micro phases are kept in a priority queue by
+    slope diff with their next phase. A merge only updates its neighbors: their queue
+    entries, trend runs, and the counts used to tell if series is still jagged.
+    """
+    def __init__(self, phases):
+        self.iterations = 0
+        self.head = None
+        self.tail = None
+        self.length = 0
+        self.micro_count = 0
+        self.running_count = 0
+        self.queue = []
+        self.entry_ids = count()
+
+        prev_node = None
+        for phase in phases:
+            node = PhaseNode(phase)
+            self.link(prev_node, node, None)
+            self.add_counts(node)
+            prev_node = node
+
+        for node in self.nodes():
+            self.push(node)
+
+    @property
+    def phases(self):
+        return [node.phase for node in self.nodes()]
+
+    def smooth(self):
+        """Same steps as merge_jagged_phases: merge running trends, then the micro phase
+        with smallest slope diff, until series is not jagged.
+        """
+        merged_node = None
+        series_is_jagged = True
+
+        while series_is_jagged:
+            self.iterations += 1
+            pre_merge_count = self.length
+
+            self.merge_running_trends_after(merged_node)
+            merged_node = self.merge_micro_phase()
+
+            series_is_jagged = self.is_jagged()
+            if series_is_jagged and self.length == pre_merge_count:
+                raise PhaseSmoothingError(self.phases)
+
+        return self.phases
+
+    def merge_running_trends_after(self, merged_node):
+        if merged_node and self.running_count == self.running_around(merged_node):
+            self.merge_running_trends_around(merged_node)
+        else:
+            self.merge_running_trends(self.head)
+
+    def merge_running_trends(self, node):
+        while node and node.next:
+            if node.next.phase.trend == node.phase.trend:
+                node = self.merge(node, node.next)
+            else:
+                node = node.next
+
+    def merge_running_trends_around(self, node):
+        """Only pairs including node can have same trend. See smooth."""
+        if node.prev and node.prev.phase.trend == node.phase.trend:
+            node = self.merge(node.prev, node)
+
+        while node.next and node.next.phase.trend == node.phase.trend:
+            node = self.merge(node, node.next)
+
+    def merge_micro_phase(self):
+        if self.next_merge_key() is None:
+            return None
+
+        _, _, _, _, node = heapq.heappop(self.queue)
+        return self.merge(node, node.next)
+
+    def next_merge_key(self):
+        """Returns (slope diff, start) of micro phase merge_micro_phase would merge next.
+        """
+        while self.queue:
+            diff, start, _, stamp, node = self.queue[0]
+            if node.alive and node.stamp == stamp and node.next:
+                return (diff, start)
+            heapq.heappop(self.queue)
+
+        return None
+
+    def is_jagged(self):
+        """Matches Epidemic.phase_series_is_jagged, which ignores last 2 phases.
+        """
+        if self.length < 3:
+            return False
+
+        last = self.tail
+        penult = last.prev
+        micro_count = self.micro_count - penult.phase.is_micro() - last.phase.is_micro()
+        running_count = (self.running_count - self.is_running(penult.prev, penult)
+                         - self.is_running(penult, last))
+        return micro_count > 0 or running_count > 0
+
+    #
+    # Private Methods
+    #
+    def merge(self, node, next_node):
+        prev_node = node.prev
+        after_node = next_node.next
+        merged_node = PhaseNode(node.phase.merge(next_node.phase))
+
+        # Pair of merged nodes is removed with both of them. Count it once.
+        self.remove_counts(node)
+        self.remove_counts(next_node)
+        self.running_count += self.is_running(node, next_node)
+        node.alive = False
+        next_node.alive = False
+
+        self.length -= 2
+        self.link(prev_node, merged_node, after_node)
+        self.add_counts(merged_node)
+
+        # Prev node's diff is now with merged node.
+        self.push(merged_node)
+        if prev_node:
+            prev_node.stamp += 1
+            self.push(prev_node)
+
+        return merged_node
+
+    def link(self, prev_node, node, next_node):
+        node.prev = prev_node
+        node.next = next_node
+
+        if prev_node:
+            prev_node.next = node
+        else:
+            self.head = node
+
+        if next_node:
+            next_node.prev = node
+        else:
+            self.tail = node
+
+        self.length += 1
+
+    def push(self, node):
+        if node.phase.is_micro() and node.next:
+            diff = abs(node.next.phase.slope - node.phase.slope)
+
+            # Ties go to earliest phase, like sorted in merge_micro_phases.
+            entry = (diff, node.phase.start, next(self.entry_ids), node.stamp, node)
+            heapq.heappush(self.queue, entry)
+
+    def add_counts(self, node):
+        self.micro_count += node.phase.is_micro()
+        self.running_count += self.is_running(node.prev, node) + self.is_running(node, node.next)
+
+    def remove_counts(self, node):
+        self.micro_count -= node.phase.is_micro()
+        self.running_count -= self.is_running(node.prev, node) + self.is_running(node, node.next)
+
+    def is_running(self, node, next_node):
+        return bool(node and next_node and node.phase.trend == next_node.phase.trend)
+
+    def running_around(self, node):
+        return self.is_running(node.prev, node) + self.is_running(node, node.next)
+
+    def nodes(self):
+        node = self.head
+        while node:
+            yield node
+            node = node.next
+
+
+class FrozenPhaseSmoother(HeapPhaseSmoother):
+    """Smooths frozen phases on their own and logs what smoothing tail needs to know about
+    them (see TailPhaseSmoother). In a full rebuild, their merges are interleaved with tail
+    merges by slope diff. For each merge, log has its key (slope diff and start). Before
+    first merge and after each one, log has whether they are still jagged and their last
+    phase.
+
+    Unlike HeapPhaseSmoother, last 2 phases are checked too, since tail follows them. But
+    if tail is down to one phase, last frozen phase is one of last 2. So log has both.
+    """
+    def smooth(self):
+        log = {'keys': [], 'jagged': [[True, True]], 'settled': []}
+        merged_node = None
+
+        while True:
+            self.iterations += 1
+            self.merge_running_trends_after(merged_node)
+
+            last = self.tail.phase
+            jagged = self.jagged_flags()
+            log['settled'].append(jagged + [last.trend, last.slope, last.start, last.is_micro()])
+            if not any(jagged):
+                return log
+
+            # Only a micro last phase is left: it would merge with tail.
+            key = self.next_merge_key()
+            if key is None:
+                raise PhaseSmoothingError(self.phases)
+
+            merged_node = self.merge_micro_phase()
+            log['keys'].append(list(key))
+            log['jagged'].append(self.jagged_flags())
+
+    def is_jagged(self):
+        return self.micro_count > 0 or self.running_count > 0
+
+    def jagged_flags(self):
+        # Jagged, and jagged but for last phase.
+        last = self.tail
+        micro_count = self.micro_count - last.phase.is_micro()
+        running_count = self.running_count - self.is_running(last.prev, last)
+        return [self.is_jagged(), micro_count > 0 or running_count > 0]
+
+
+class TailPhaseSmoother(HeapPhaseSmoother):
+    """Smooths tail phases the way HeapPhaseSmoother smooths them after frozen phases in a
+    full rebuild, merge for merge, without frozen phases.
+
+    Frozen phases only change tail by how long they keep smoothing loop going: it stops
+    when they are smooth too. So their merges are replayed from log (see
+    FrozenPhaseSmoother) in turn with tail merges. If a merge or running trend would join
+    last frozen phase and tail, raises FrozenPhaseError.
+    """
+    def __init__(self, phases, frozen_merges):
+        super().__init__(phases)
+        self.frozen_merges = frozen_merges
+
+    def smooth(self):
+        log = self.frozen_merges
+        frozen_count = 0
+        merged_node = None
+        series_is_jagged = True
+
+        while series_is_jagged:
+            self.iterations += 1
+            pre_merge_count = (self.length, frozen_count)
+            *frozen_jagged, trend, slope, start, micro = log['settled'][frozen_count]
+
+            self.check_boundary(trend)
+            self.merge_running_trends_after(merged_node)
+            self.check_boundary(trend)
+
+            frozen_key = (tuple(log['keys'][frozen_count])
+                          if frozen_count < len(log['keys']) else None)
+            tail_key = self.next_merge_key()
+            boundary_key = (abs(self.head.phase.slope - slope), start) if micro else None
+            keys = [key for key in (frozen_key, tail_key, boundary_key) if key]
+
+            merged_node = None
+            if keys and min(keys) == boundary_key:
+                raise FrozenPhaseError(self.phases)
+            elif keys and min(keys) == frozen_key:
+                frozen_count += 1
+                frozen_jagged = log['jagged'][frozen_count]
+            elif keys:
+                merged_node = self.merge_micro_phase()
+
+            # With one tail phase, last frozen phase is one of last 2 phases: not checked.
+            series_is_jagged = frozen_jagged[self.length == 1] or self.is_jagged()
+            if series_is_jagged and (self.length, frozen_count) == pre_merge_count:
+                raise PhaseSmoothingError(self.phases)
+
+        self.check_boundary(log['settled'][frozen_count][2])
+
+        # Short last phase gets merged with penultimate (see smooth_phases).
+        if self.length == 1 and self.tail.phase.days < 7:
+            raise FrozenPhaseError(self.phases)
+
+        return self.phases
+
+    def check_boundary(self, frozen_trend):
+        if self.head.phase.trend == frozen_trend:
+            raise FrozenPhaseError(self.phases)
+
+
 class Epidemic:
+    # See constant at top of file. Fit to positive rates.
+    hardcoded_phases = HARDCODED_PHASES
+
     def __init__(self, time_series, opts=None, datasets=None):
         """Datasets is dict of dicts mapping dates to values. They get added as timelines
         mapping dates (in time_series date range) to values. Example:
@@ -77,6 +398,9 @@ class Epidemic:
             'primary': time_series
         }
 
+        # Sorted dates by timeline (see date_index)
+        self.date_indexes = {}
+
         # Opts
         c = WAVE_ANALYSIS_CONFIG
         opts = opts if opts is not None else {}
@@ -84,8 +408,23 @@ class Epidemic:
         self.window_size = opts.get('window_size', c['window_size'])
         self.flat_slope_threshold = opts.get('flat_slope_threshold', c['flat_slope_threshold'])
         self.min_phase_size = opts.get('min_phase_size', c['min_phase_size'])
+        self.smoothing_engine = opts.get('smoothing_engine', c['smoothing_engine'])
+        self.revision_days = opts.get('revision_days', c['revision_days'])
+        self.anomaly_z_score = opts.get('anomaly_z_score', c['anomaly_z_score'])
+        self.anomaly_min_count = opts.get('anomaly_min_count', c['anomaly_min_count'])
+        self.opts = opts
+
+        # Iterations of smoothing loop in last smooth_phases run
+        self.smoothing_iterations = 0
+
+        # Frozen phases and waves (as start and end dates) restored from state. See freeze.
+        self.frozen_through = None
+        self.frozen_phase_dates = []
+        self.frozen_wave_dates = []
+        self.frozen_merges = None
 
         # Datasets
+        self.datasets = {}
         datasets = datasets if datasets is not None else {}
         for key, dataset in datasets.items():
             self.add_timeline(key, dataset)
@@ -95,76 +434,141 @@ class Epidemic:
     #
     @cached_property
     def waves(self):
-        return self.generate_waves(self.smoothed_phases)
+        smoothed_phases = self.smoothed_phases
+
+        if not self.frozen_through:
+            return self.generate_waves(smoothed_phases)
+
+        tail_waves = self.generate_waves(self.tail_smoothed_phases, self.frozen_phases[-1])
+        return self.frozen_waves + tail_waves
 
     @cached_property
     def smoothed_phases(self):
-        return self.smooth_phases(self.phases)
+        # A full rebuild would merge last frozen phase with tail: thaw and smooth everything.
+        if self.frozen_through and self.tail_smoothed_phases is None:
+            self.thaw()
+
+        return self.frozen_phases + self.tail_smoothed_phases
+
+    @cached_property
+    def tail_smoothed_phases(self):
+        """Tail gets same phases as in a full rebuild (see TailPhaseSmoother). None if they
+        would merge with frozen phases.
+        """
+        try:
+            return self.smooth_phases(self.tail_phases, self.frozen_merges)
+        except FrozenPhaseError:
+            return None
 
     @cached_property
     def phases(self):
-        phases = []
-        prev_window = self.windows[0]
-        open_phase = WavePhase(prev_window, self)
+        """A phase runs from a window to the next window where trend changes (which starts
+        the next phase). Final phase is dropped if it would only have one window.
+        """
+        return self.build_phases(0)
 
-        for window in self.windows[1:]:
-            trend_change = window.trend != prev_window.trend
+    @cached_property
+    def tail_phases(self):
+        """Phases after frozen phases. These are the phases that get smoothed.
+        """
+        if not self.frozen_through:
+            return self.phases
 
-            if trend_change:
-                open_phase.end(window)
-                phases.append(open_phase)
-                open_phase = WavePhase(window, self)
-            else:
-                open_phase.add_window(window)
+        return self.build_phases(self.window_index(self.frozen_through))
 
-            prev_window = window
+    @cached_property
+    def frozen_phases(self):
+        return [WavePhase(self.windows, self.window_index(start_date),
+                          self.window_index(end_date), self, **self.phase_opts)
+                for start_date, end_date in self.frozen_phase_dates]
 
-        if open_phase.start_window != window:
-            open_phase.end(window)
-            phases.append(open_phase)
+    @cached_property
+    def frozen_waves(self):
+        waves = []
 
-        return phases
+        for start_date, end_date in self.frozen_wave_dates:
+            phases = [p for p in self.frozen_phases
+                      if p.started_on >= start_date and p.ended_on <= end_date]
+            waves.append(EpidemicWave(phases, self))
+
+        return waves
 
     @cached_property
     def windows(self):
-        windows = []
-        half_window_len = floor(self.window_size / 2)
-
-        for dated in self.dates:
-            window_rates = []
+        return PhaseWindows(self.timeline, self.window_size,
+                            flat_slope_threshold=self.flat_slope_threshold)
 
-            for n in range(-half_window_len, half_window_len+1):
-                window_date = dated + timedelta(days=n)
-                rate = self.timeline.get(window_date)
-                if rate:
-                    window_rates.append(rate)
+    @cached_property
+    def rolling_stats(self):
+        """Maps timeline keys to RollingStats over window_size days.
+        """
+        return {key: RollingStats(timeline, self.window_size, self.anomaly_min_count)
+                for key, timeline in self.timelines.items()}
 
-            if len(window_rates) == self.window_size:
-                window = PhaseWindow(dated, window_rates)
-                windows.append(window)
+    @cached_property
+    def std_devs(self):
+        """Maps dates to z-score of primary timeline value vs window ending day before.
+        """
+        zscores = self.rolling_stats['primary'].zscores
+        return {dated: z for dated, z in zscores.items() if z is not None}
 
-        return windows
+    @cached_property
+    def anomalies(self):
+        """Maps timeline keys to dicts of dates with z-scores at least anomaly_z_score.
+        """
+        return {key: stats.anomalies(self.anomaly_z_score)
+                for key, stats in self.rolling_stats.items()}
 
     @cached_property
-    def std_devs(self):
-        dated_values = {}
+    def dates(self):
+        return sorted(self.timeline.keys())
 
-        for dated in self.dates[1:]:
-            yesterday = dated - timedelta(days=1)
-            window = self.windows.get(yesterday)
+    @property
+    def phase_opts(self):
+        return {
+            'flat_slope_threshold': self.flat_slope_threshold,
+            'min_phase_size': self.min_phase_size
+        }
 
-            if not window:
-                continue
+    @property
+    def state_opts(self):
+        # Opts that change phases and waves. State saved with other opts is not used.
+        return {
+            'window_size': self.window_size,
+            'flat_slope_threshold': self.flat_slope_threshold,
+            'min_phase_size': self.min_phase_size,
+            'revision_days': self.revision_days
+        }
 
-            diff = self.avg_positive_rates[dated] - window['mean']
-            dev = diff / window['stdev']
-            dated_values[dated] = dev
+    #
+    # Static Methods
+    #
+    @staticmethod
+    def from_state_file(path, opts=None):
+        """Restores epidemic from state saved by save_state. Returns None if there is no
+        state file or state was saved with different opts or without frozen merges.
+        """
+        if not path_exists(path):
+            return None
 
-        return dated_values
+        with open(path) as f:
+            state = json.load(f)
 
-    @cached_property
-    def dates(self):
-        return sorted(self.timeline.keys())
+        epidemic = Epidemic({}, opts)
+        if state['opts'] != epidemic.state_opts or 'merges' not in state:
+            return None
+
+        for dated, value in state['timeline']:
+            epidemic.timeline[date.fromisoformat(dated)] = value
+
+        if state['frozen_through']:
+            def to_dates(ranges): return [tuple(map(date.fromisoformat, r)) for r in ranges]
+            epidemic.frozen_through = date.fromisoformat(state['frozen_through'])
+            epidemic.frozen_phase_dates = to_dates(state['phases'])
+            epidemic.frozen_wave_dates = to_dates(state['waves'])
+            epidemic.frozen_merges = state['merges']
+
+        return epidemic
 
     #
     # Methods
@@ -174,34 +578,235 @@ class Epidemic:
         for dated in self.dates:
             timeline[dated] = time_series.get(dated)
         self.timelines[key] = timeline
+        self.datasets[key] = time_series
+
+        self.__dict__.pop('rolling_stats', None)
+        self.__dict__.pop('anomalies', None)
         return timeline
 
+    def is_anomaly(self, dated, key='primary'):
+        return dated in self.anomalies[key]
+
+    def append(self, dated, value):
+        return self.extend({dated: value})
+
+    def extend(self, time_series):
+        """Adds new or revised values to timeline. Returns dates that changed.
+
+        Only phases after frozen phases (see freeze) are rebuilt. If a change reaches back
+        into data used by frozen phases, they are thawed and everything is rebuilt.
+        """
+        changed_dates = sorted(d for d, v in time_series.items()
+                               if d not in self.timeline or self.timeline[d] != v)
+
+        if not changed_dates:
+            return changed_dates
+
+        # Windows of last frozen phase include data up to half a window after it ends.
+        if self.frozen_through and changed_dates[0] <= self.frozen_data_through():
+            self.thaw()
+
+        for dated in changed_dates:
+            self.timeline[dated] = time_series[dated]
+
+        self.reset_timelines()
+        return changed_dates
+
+    def update(self, time_series):
+        """Replaces timeline with time_series (e.g. a new snapshot). Returns dates that were
+        added, revised or removed.
+
+        Dates missing from time_series are removed from timeline. Removals thaw epidemic,
+        since frozen phases may be based on them. Otherwise works like extend.
+        """
+        removed_dates = sorted(d for d in self.timeline if d not in time_series)
+
+        if removed_dates:
+            self.thaw()
+            for dated in removed_dates:
+                del self.timeline[dated]
+            self.reset_timelines()
+
+        return sorted(removed_dates + self.extend(time_series))
+
+    def freeze(self):
+        """Freezes phases and waves through the last closed wave whose data ends before the
+        revision horizon (revision_days before last date). Last wave is never frozen since it
+        may still be open. Returns date frozen through.
+
+        Waves whose frozen merges can't be logged apart from tail are skipped (see
+        log_frozen_merges).
+        """
+        horizon = self.dates[-1] - timedelta(days=self.revision_days)
+        closed_waves = [w for w in self.waves[:-1]
+                        if self.frozen_data_through(w.ended_on) < horizon]
+
+        while closed_waves:
+            frozen_through = closed_waves[-1].ended_on
+            frozen_phases = [p for p in self.smoothed_phases if p.ended_on <= frozen_through]
+
+            if frozen_through == self.frozen_through:
+                frozen_merges = self.frozen_merges
+            else:
+                frozen_merges = self.log_frozen_merges(frozen_phases)
+
+            if frozen_merges:
+                break
+            closed_waves.pop()
+        else:
+            self.thaw()
+            return None
+
+        self.frozen_phase_dates = [(p.started_on, p.ended_on) for p in frozen_phases]
+        self.frozen_wave_dates = [(w.started_on, w.ended_on) for w in closed_waves]
+        self.frozen_merges = frozen_merges
+        self.frozen_through = frozen_through
+        return frozen_through
+
+    def log_frozen_merges(self, frozen_phases):
+        """Smooths phases through last frozen phase on their own. Returns log of their merges
+        (see FrozenPhaseSmoother) or None if they don't smooth to frozen phases on their own,
+        e.g. a hardcoded phase runs into tail.
+        """
+        frozen_through = frozen_phases[-1].ended_on
+        phases = [p for p in self.phases if p.ended_on <= frozen_through]
+
+        if phases[-1].ended_on != frozen_through:
+            return None
+
+        if any(s < frozen_through < e for s, e in self.hardcoded_phases):
+            return None
+
+        # A full rebuild smooths its phases unless they were smooth to start with.
+        if not FrozenPhaseSmoother(phases).is_jagged():
+            return None
+
+        smoother = FrozenPhaseSmoother(self.merge_hardcoded_phases(phases))
+        try:
+            frozen_merges = smoother.smooth()
+        except PhaseSmoothingError:
+            return None
+
+        def ranges(phases): return [(p.started_on, p.ended_on) for p in phases]
+        if ranges(smoother.phases) != ranges(frozen_phases):
+            return None
+
+        return frozen_merges
+
+    def thaw(self):
+        self.frozen_through = None
+        self.frozen_phase_dates = []
+        self.frozen_wave_dates = []
+        self.frozen_merges = None
+        self.reset()
+
+    def save_state(self, path):
+        """Freezes epidemic and saves state to path. Restore with from_state_file.
+        """
+        self.freeze()
+
+        def to_isos(ranges): return [[d.isoformat() for d in r] for r in ranges]
+        state = {
+            'opts': self.state_opts,
+            'frozen_through': self.frozen_through.isoformat() if self.frozen_through else None,
+            'phases': to_isos(self.frozen_phase_dates),
+            'waves': to_isos(self.frozen_wave_dates),
+            'merges': self.frozen_merges,
+            'timeline': [[d.isoformat(), self.timeline[d]] for d in self.dates]
+        }
+
+        makedirs(dirname(path), exist_ok=True)
+        temp_path = '{}.tmp'.format(path)
+        with open(temp_path, 'w') as f:
+            json.dump(state, f)
+        replace(temp_path, path)
+
+        return path
+
+    def rebuild(self):
+        """Returns new epidemic with same timelines, built from scratch.
+        """
+        return Epidemic(dict(self.timeline), self.opts, self.datasets)
+
+    def verify_state(self):
+        """Raises EpidemicStateError if waves don't match waves of a full rebuild.
+        """
+        def summary(waves): return [(w.started_on, w.ended_on, w.is_wave()) for w in waves]
+        rebuilt_waves = self.rebuild().waves
+
+        if summary(self.waves) != summary(rebuilt_waves):
+            raise EpidemicStateError(self.waves, rebuilt_waves)
+
+        return True
+
+    def build_phases(self, first):
+        """Builds phases from window at index first to last window.
+        """
+        phases = []
+        trends = self.windows.trends
+        last = len(trends) - 1
+        change_points = (np.flatnonzero(trends[first + 1:] != trends[first:-1])
+                         + first + 1).tolist()
+
+        for start, end in zip([first] + change_points, change_points + [last]):
+            if start != end:
+                phases.append(WavePhase(self.windows, start, end, self, **self.phase_opts))
+
+        return phases
+
+    def window_index(self, dated):
+        day = (dated - self.windows.start_date).days
+        return int(np.searchsorted(self.windows.indexes, day))
+
+    def frozen_data_through(self, dated=None):
+        dated = dated if dated else self.frozen_through
+        return dated + timedelta(days=self.window_size // 2)
+
+    def reset_timelines(self):
+        self.reset()
+        for key, dataset in self.datasets.items():
+            self.add_timeline(key, dataset)
+
+    def reset(self):
+        cached = ('windows', 'phases', 'tail_phases', 'frozen_phases', 'frozen_waves',
+                  'smoothed_phases', 'tail_smoothed_phases', 'waves', 'dates', 'std_devs',
+                  'rolling_stats', 'anomalies')
+        for name in cached:
+            self.__dict__.pop(name, None)
+        self.date_indexes = {}
+
     def extract_timeline_by_start_end_dates(self, time_series, start_date, end_date):
         """Extract timeline for time series datapoints falling within range of the
         start and end date.
 
-        This is useful for nested classes: waves and phases
+        This is useful for nested classes: waves and phases. Returns a read-only view of
+        time series, located by binary search on its date index.
         """
-        timeline = {}
-
         # This will leave any gaps from timeseries in timeline. That's better for graphing.
-        for dated, value in sorted(time_series.items()):
-            if dated > end_date:
-                return timeline
+        return TimelineSlice(time_series, self.date_index(time_series), start_date, end_date)
+
+    def date_index(self, time_series):
+        """Returns sorted dates of time series. Sorted once per timeline.
+        """
+        key = id(time_series)
 
-            if dated >= start_date:
-                timeline[dated] = value
+        # Keep reference to time series so its id can't be reused.
+        if key not in self.date_indexes:
+            self.date_indexes[key] = (time_series, sorted(time_series.keys()))
 
-        return timeline
+        return self.date_indexes[key][1]
 
-    def generate_waves(self, phases):
+    def generate_waves(self, phases, prev_phase=None):
+        """Prev phase is last phase of a closed wave (e.g. last frozen phase).
+        """
         waves = []
-        prev_phase = []
         wave_phases = []
 
         # If first phase is falling, skip
         first_phase = phases[0]
-        if not first_phase.is_falling():
+        if prev_phase:
+            remaining_phases = phases
+        elif not first_phase.is_falling():
             prev_phase = first_phase
             wave_phases = [prev_phase]
             remaining_phases = phases[1:]
@@ -245,18 +850,49 @@ class Epidemic:
 
         return waves
 
-    def smooth_phases(self, phases):
-        def log(msg, n, seq): self.debug and print(msg, n, len(seq), "\n", pformat(seq))
+    def smooth_phases(self, phases, frozen_merges=None):
+        """Frozen merges are logged merges of frozen phases before phases (see freeze). They
+        are always jagged in a full rebuild, so tail is always smoothed.
+        """
         series_is_jagged = self.phase_series_is_jagged(phases)
-        n = 0
+        phases = self.merge_hardcoded_phases(phases)
+
+        self.smoothing_iterations = 0
+        if frozen_merges:
+            phases = self.run_smoother(TailPhaseSmoother(phases, frozen_merges))
+        elif series_is_jagged and len(phases) > 1:
+            if self.smoothing_engine == 'heap':
+                phases = self.run_smoother(HeapPhaseSmoother(phases))
+            else:
+                phases = self.merge_jagged_phases(phases)
 
-        # Hardcoded phases: see constant at top of file
-        for start_date, end_date in HARDCODED_PHASES:
-            phases = self.merge_fixed_phase(phases, start_date, end_date)
-        #breakpoint()
+        # If last phase is less than 7 days, merge it with penultimate
+        last_phase = phases[-1]
+        if last_phase.days < 7 and len(phases) > 1:
+            last_phase = phases.pop()
+            penult_phase = phases.pop()
+            last_phase = penult_phase.merge(last_phase)
+            phases.append(last_phase)
+
+        return phases
+
+    def run_smoother(self, smoother):
+        try:
+            return smoother.smooth()
+        finally:
+            self.smoothing_iterations = smoother.iterations
+
+    def merge_jagged_phases(self, phases):
+        """Merges running trends then the micro phase with smallest slope diff, until series
+        is not jagged. HeapPhaseSmoother does the same merges without rescanning phases.
+        """
+        def log(msg, n, seq): self.debug and print(msg, n, len(seq), "\n", pformat(seq))
+        series_is_jagged = True
+        n = 0
 
         while series_is_jagged:
             n += 1
+            self.smoothing_iterations = n
             pre_merge_count = len(phases)
 
             phases = self.merge_running_trends(phases)
@@ -268,13 +904,17 @@ class Epidemic:
             if series_is_jagged and len(phases) == pre_merge_count:
                 raise PhaseSmoothingError(phases)
 
-        # If last phase is less than 7 days, merge it with penultimate
-        last_phase = phases[-1]
-        if last_phase.days < 7:
-            last_phase = phases.pop()
-            penult_phase = phases.pop()
-            last_phase = penult_phase.merge(last_phase)
-            phases.append(last_phase)
+        return phases
+
+    def merge_hardcoded_phases(self, phases):
+        """Hardcoded phases: see constant at top of file. Those before phases (e.g. frozen
+        phases) or after them are skipped.
+        """
+        phases = list(phases)
+
+        for start_date, end_date in self.hardcoded_phases:
+            if phases[0].started_on <= start_date < phases[-1].ended_on:
+                phases = self.merge_fixed_phase(phases, start_date, end_date)
 
         return phases
 
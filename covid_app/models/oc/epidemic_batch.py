@@ -0,0 +1,138 @@
+"""
+EpidemicBatch
+
+Runs wave analysis on every timeline of an epidemic at once (e.g. cases, hospitalizations
+and deaths as well as positive rates) and compares when each timeline peaked.
+
+Windows for all timelines are computed in one pass over a shared dense 2-D array (see
+BatchPhaseWindows). Each timeline can have its own flat slope threshold, since timelines
+have different scales. Phases and waves are then found for each timeline from its row.
+"""
+from functools import cached_property
+
+import numpy as np
+
+from config.app import WAVE_ANALYSIS_CONFIG
+from covid_app.models.oc.epidemic import (Epidemic, PhaseSmoothingError, PhaseMergingError,
+                                          WaveExtractionError)
+from covid_app.models.oc.phase_window import BatchPhaseWindows
+
+
+class EpidemicSeries(Epidemic):
+    """Epidemic for one timeline of a batch. Windows come from batch rows. Phases use the
+    timeline's flat slope threshold. Hardcoded phases only apply to primary timeline.
+    """
+    def __init__(self, key, time_series, windows, opts=None):
+        # Blank values are left out so wave peaks and floors can be compared.
+        time_series = {dated: value for dated, value in time_series.items()
+                       if value is not None}
+        super().__init__(time_series, opts)
+        self.key = key
+        self.__dict__['windows'] = windows
+
+        if key != 'primary':
+            self.hardcoded_phases = ()
+
+    @property
+    def phase_opts(self):
+        return dict(super().phase_opts, flat_slope_threshold=self.windows.flat_slope_threshold)
+
+    def __repr__(self):
+        return '<EpidemicSeries key={} windows={}>'.format(self.key, len(self.windows))
+
+
+class EpidemicBatch:
+    def __init__(self, epidemic, thresholds=None, keys=None, opts=None):
+        """Thresholds maps timeline keys to flat slope thresholds. Keys limits timelines
+        analyzed (default: all epidemic timelines).
+        """
+        c = WAVE_ANALYSIS_CONFIG
+        opts = opts if opts is not None else {}
+        self.epidemic = epidemic
+        self.keys = list(keys) if keys else list(epidemic.timelines.keys())
+        self.thresholds = thresholds if thresholds else {}
+        self.max_peak_lag = opts.get('max_peak_lag', c['max_peak_lag'])
+
+        # Timelines that could not be smoothed into waves. Maps keys to errors.
+        self.errors = {}
+
+    #
+    # Properties
+    #
+    @cached_property
+    def windows(self):
+        timelines = {key: self.epidemic.timelines[key] for key in self.keys}
+        return BatchPhaseWindows(timelines, self.epidemic.window_size, self.thresholds)
+
+    @cached_property
+    def series(self):
+        return {key: EpidemicSeries(key, self.epidemic.timelines[key], self.windows.series(key),
+                                    self.epidemic.opts)
+                for key in self.keys}
+
+    @cached_property
+    def waves(self):
+        """Maps timeline keys to waves. Timelines with too few windows have no waves. Those
+        that fail to smooth are left out and their errors kept in errors.
+        """
+        waves = {}
+
+        for key, series in self.series.items():
+            if len(series.windows) < 2:
+                waves[key] = []
+                continue
+
+            try:
+                waves[key] = series.waves
+            except (PhaseSmoothingError, PhaseMergingError, WaveExtractionError) as e:
+                self.errors[key] = e
+
+        return waves
+
+    @cached_property
+    def peaks(self):
+        """Maps timeline keys to peak dates of their waves (lulls have no peak).
+        """
+        return {key: [wave.peaked_on for wave in waves if wave.is_wave()]
+                for key, waves in self.waves.items()}
+
+    #
+    # Methods
+    #
+    def peak_offsets(self, key='primary'):
+        """For each wave peak of timeline key, returns dict with peak date and offsets: dict
+        mapping other timeline keys to days from that peak to their nearest peak (positive
+        means timeline lags). Offset is None if no peak is within max_peak_lag days.
+        """
+        offsets = []
+        peaks = np.array([d.toordinal() for d in self.peaks.get(key, [])], dtype=np.int64)
+        other_peaks = {k: np.array([d.toordinal() for d in dates], dtype=np.int64)
+                       for k, dates in self.peaks.items() if k != key}
+
+        # Offsets of nearest peak for all peaks of key at once, one timeline at a time.
+        nearest_offsets = {}
+        for other_key, ordinals in other_peaks.items():
+            if not len(ordinals):
+                nearest_offsets[other_key] = [None] * len(peaks)
+                continue
+
+            right = np.searchsorted(ordinals, peaks).clip(max=len(ordinals) - 1)
+            left = (right - 1).clip(min=0)
+            right_offsets = ordinals[right] - peaks
+            left_offsets = ordinals[left] - peaks
+            nearest = np.where(np.abs(left_offsets) <= np.abs(right_offsets), left_offsets,
+                               right_offsets)
+            nearest_offsets[other_key] = [int(n) if abs(n) <= self.max_peak_lag else None
+                                          for n in nearest]
+
+        for n, peaked_on in enumerate(self.peaks.get(key, [])):
+            offsets.append({
+                'peaked_on': peaked_on,
+                'offsets': {k: nearest_offsets[k][n] for k in other_peaks}
+            })
+
+        return offsets
+
+    def __repr__(self):
+        f = '<EpidemicBatch timelines={} errors={}>'
+        return f.format(len(self.keys), len(self.errors))
@@ -4,6 +4,7 @@ OC Immune Cohort
 Estimates population immunity based on vaccines and recoveries for a given data.
 """
 from datetime import datetime
+from collections import deque
 
 
 #
@@ -15,8 +16,10 @@ PARTIAL_VAX_EFF = .75  # i.e. 75% effective
 FULL_VAX_EFF = .9
 RAMP_UP_WINDOW = 30  # days (to reach full efficacy)
 FULL_EFF_WINDOW = 90  # days (before fade rate kicks in)
-VAX_FADE_RATE = 1.0 / 270  # assume immunity fades to 0 over 9 months
-INF_FADE_RATE = 1.0 / 180  # assume immunity fades to 0 over 6 months
+VAX_FADE_DAYS = 270  # assume immunity fades to 0 over 9 months
+INF_FADE_DAYS = 180  # assume immunity fades to 0 over 6 months
+VAX_FADE_RATE = 1.0 / VAX_FADE_DAYS
+INF_FADE_RATE = 1.0 / INF_FADE_DAYS
 
 # How long a reported positive case is assumed to be infectious.
 INFECTION_WINDOW = 14  # days
@@ -49,6 +52,82 @@ class ImmuneCohort:
                 break
         return sum(counts)
 
+    # Efficacy curves: immunity factor for a cohort given days since its date. Factors
+    # go negative once faded. Estimates above are floored at 0.
+    @staticmethod
+    def partial_vax_factor(days_out):
+        # Ramp Up
+        if days_out < RAMP_UP_WINDOW:
+            vax_ramp_rate = PARTIAL_VAX_EFF / RAMP_UP_WINDOW
+            vax_factor = vax_ramp_rate * days_out
+        # Full Efficacy Window
+        elif days_out >= RAMP_UP_WINDOW and days_out < FULL_EFF_WINDOW:
+            vax_factor = PARTIAL_VAX_EFF
+        # Ramp Down
+        else:
+            days_out -= FULL_EFF_WINDOW
+            vax_factor = PARTIAL_VAX_EFF - (VAX_FADE_RATE * days_out)
+
+        return vax_factor
+
+    @staticmethod
+    def full_vax_factor(days_out):
+        # Assumes this will be second shot and first shot was 4 weeks ago. Adjusts
+        # days_out and efficacy windows accordingly.
+        days_since_first_shot = 28
+        adj_ramp_up_window = RAMP_UP_WINDOW + days_since_first_shot
+        adj_full_eff_window = FULL_EFF_WINDOW + days_since_first_shot
+        days_out += days_since_first_shot
+
+        # Ramp Up
+        if days_out < adj_ramp_up_window:
+            vax_ramp_rate = FULL_VAX_EFF / RAMP_UP_WINDOW
+            vax_factor = vax_ramp_rate * days_out
+        # Full Efficacy Window
+        elif days_out >= adj_ramp_up_window and days_out < adj_full_eff_window:
+            vax_factor = FULL_VAX_EFF
+        # Ramp Down
+        else:
+            days_out -= adj_full_eff_window
+            vax_factor = FULL_VAX_EFF - (VAX_FADE_RATE * days_out)
+
+        return vax_factor
+
+    @staticmethod
+    def booster_factor(days_out):
+        # Ramp Up
+        if days_out < RAMP_UP_WINDOW:
+            vax_ramp_rate = FULL_VAX_EFF / RAMP_UP_WINDOW
+            vax_factor = vax_ramp_rate * days_out
+        # Full Efficacy Window
+        elif days_out >= RAMP_UP_WINDOW and days_out < FULL_EFF_WINDOW:
+            vax_factor = FULL_VAX_EFF
+        # Ramp Down
+        else:
+            days_out -= FULL_EFF_WINDOW
+            vax_factor = FULL_VAX_EFF - (VAX_FADE_RATE * days_out)
+
+        return vax_factor
+
+    @staticmethod
+    def recovered_factor(days_out):
+        if days_out < INFECTION_WINDOW:
+            return 0
+
+        # Ramp Up
+        if days_out < RAMP_UP_WINDOW:
+            vax_ramp_rate = FULL_VAX_EFF / RAMP_UP_WINDOW
+            vax_factor = vax_ramp_rate * days_out
+        # Full Efficacy Window
+        elif days_out >= RAMP_UP_WINDOW and days_out < FULL_EFF_WINDOW:
+            vax_factor = FULL_VAX_EFF
+        # Ramp Down
+        else:
+            days_out -= FULL_EFF_WINDOW
+            vax_factor = FULL_VAX_EFF - (INF_FADE_RATE * days_out)
+
+        return vax_factor
+
     #
     # Properties
     #
@@ -143,80 +222,107 @@ class ImmuneCohort:
         return self.compute_recovered_immunity(days_out)
 
     def compute_partial_immunity(self, days_out):
-        # Ramp Up
-        if days_out < RAMP_UP_WINDOW:
-            vax_ramp_rate = PARTIAL_VAX_EFF / RAMP_UP_WINDOW
-            vax_factor = vax_ramp_rate * days_out
-        # Full Efficacy Window
-        elif days_out >= RAMP_UP_WINDOW and days_out < FULL_EFF_WINDOW:
-            vax_factor = PARTIAL_VAX_EFF
-        # Ramp Down
-        else:
-            days_out -= FULL_EFF_WINDOW
-            vax_factor = PARTIAL_VAX_EFF - (VAX_FADE_RATE * days_out)
-
-        estimate = self.unfully_vaxxed_partials * vax_factor
+        estimate = self.unfully_vaxxed_partials * ImmuneCohort.partial_vax_factor(days_out)
         return max(estimate, 0)
 
     def compute_full_immunity(self, days_out):
-        # Assumes this will be second shot and first shot was 4 weeks ago. Adjusts
-        # days_out and efficacy windows accordingly.
-        days_since_first_shot = 28
-        adj_ramp_up_window = RAMP_UP_WINDOW + days_since_first_shot
-        adj_full_eff_window = FULL_EFF_WINDOW + days_since_first_shot
-        days_out += days_since_first_shot
-
-        # Ramp Up
-        if days_out < adj_ramp_up_window:
-            vax_ramp_rate = FULL_VAX_EFF / RAMP_UP_WINDOW
-            vax_factor = vax_ramp_rate * days_out
-        # Full Efficacy Window
-        elif days_out >= adj_ramp_up_window and days_out < adj_full_eff_window:
-            vax_factor = FULL_VAX_EFF
-        # Ramp Down
-        else:
-            days_out -= adj_full_eff_window
-            vax_factor = FULL_VAX_EFF - (VAX_FADE_RATE * days_out)
-
-        estimate = self.unboosted_full_vaxxed * vax_factor
+        estimate = self.unboosted_full_vaxxed * ImmuneCohort.full_vax_factor(days_out)
         return max(estimate, 0)
 
     def compute_booster_immunity(self, days_out):
-        # Ramp Up
-        if days_out < RAMP_UP_WINDOW:
-            vax_ramp_rate = FULL_VAX_EFF / RAMP_UP_WINDOW
-            vax_factor = vax_ramp_rate * days_out
-        # Full Efficacy Window
-        elif days_out >= RAMP_UP_WINDOW and days_out < FULL_EFF_WINDOW:
-            vax_factor = FULL_VAX_EFF
-        # Ramp Down
-        else:
-            days_out -= FULL_EFF_WINDOW
-            vax_factor = FULL_VAX_EFF - (VAX_FADE_RATE * days_out)
-
-        estimate = self.boost_vax_count * vax_factor
+        estimate = self.boost_vax_count * ImmuneCohort.booster_factor(days_out)
         return max(estimate, 0)
 
     def compute_recovered_immunity(self, days_out):
         if days_out < INFECTION_WINDOW:
             return 0
 
-        # Ramp Up
-        if days_out < RAMP_UP_WINDOW:
-            vax_ramp_rate = FULL_VAX_EFF / RAMP_UP_WINDOW
-            vax_factor = vax_ramp_rate * days_out
-        # Full Efficacy Window
-        elif days_out >= RAMP_UP_WINDOW and days_out < FULL_EFF_WINDOW:
-            vax_factor = FULL_VAX_EFF
-        # Ramp Down
-        else:
-            days_out -= FULL_EFF_WINDOW
-            vax_factor = FULL_VAX_EFF - (INF_FADE_RATE * days_out)
-
-        estimate = self.infections * vax_factor
+        estimate = self.infections * ImmuneCohort.recovered_factor(days_out)
         return max(estimate, 0)
 
     def __repr__(self):
         f = '<ImmuneCohort date={} partial={} full={} boosted={} infected={}>'
         return f.format(self.date, self.partial_vax_count, self.full_vax_count,
                         self.boost_vax_count, self.infected_count)
+
+
+class CohortLedger:
+    """Matches each day's second shots (kind 'partial') or boosters (kind 'boosted') to
+    earlier cohorts, the same as ImmuneCohort.update_partially_vaxxed_cohorts and
+    update_boosted_cohorts, without walking cohorts that are used up.
+
+    A used-up cohort (none left to match) passes positive shots on to the next cohort
+    unchanged. So the walk jumps from cohort to cohort in a queue of those with some left.
+    Negative shots (data corrections) stop at the first cohort. If that reopens a used-up
+    cohort, it's older than any in the queue, so it goes back at the front.
+    """
+    def __init__(self, kind):
+        if kind not in ('partial', 'boosted'):
+            raise ValueError('Invalid ledger kind: {}'.format(kind))
+
+        self.kind = kind
+        self.cohorts = []
+
+        # Indexes of cohorts with some left to match, oldest first
+        self.open = deque()
+
+    #
+    # Methods
+    #
+    def append(self, cohort):
+        self.cohorts.append(cohort)
+        if self.remaining(cohort) != 0:
+            self.open.append(len(self.cohorts) - 1)
+
+    def allocate(self, shots):
+        """Matches shots to cohorts in ledger. Returns (index, remaining) tuples for each
+        cohort whose remaining count changed.
+        """
+        changes = []
+        index = 0
+
+        while index < len(self.cohorts):
+            if shots > 0 and (not self.open or self.open[0] > index):
+                if not self.open:
+                    break
+                index = self.open[0]
+
+            cohort = self.cohorts[index]
+            old_remaining = self.remaining(cohort)
+            surplus = self.update(cohort, shots)
+            remaining = self.remaining(cohort)
+
+            if remaining != old_remaining:
+                changes.append((index, remaining))
+
+            if self.open and self.open[0] == index:
+                if remaining == 0:
+                    self.open.popleft()
+            elif remaining != 0:
+                self.open.appendleft(index)
+
+            if surplus <= 0:
+                break
+
+            # Partials pass all shots on to next cohort. Boosters pass the surplus.
+            shots = surplus if self.kind == 'boosted' else shots
+            index += 1
+
+        return changes
+
+    def remaining(self, cohort):
+        if self.kind == 'partial':
+            return cohort.unfully_vaxxed_partials
+        return cohort.unboosted_full_vaxxed
+
+    def update(self, cohort, shots):
+        if self.kind == 'partial':
+            return cohort.update_partially_vaxxed(shots)
+        return cohort.update_boosted(shots)
+
+    def __len__(self):
+        return len(self.cohorts)
+
+    def __repr__(self):
+        f = '<CohortLedger kind={} cohorts={} open={}>'
+        return f.format(self.kind, len(self.cohorts), len(self.open))
@@ -0,0 +1,128 @@
+"""
+OC Immunity Convolution
+
+Estimates immunity for every date at once. Gives the same estimates as summing
+ImmuneCohort.compute_*_immunity_for_date over all earlier cohorts for each date.
+
+Efficacy curves in ImmuneCohort only depend on days since a cohort's date. So each curve is
+computed once as a kernel array. Estimates are the convolution of the kernels with daily
+cohort counts (each cohort estimate floored at 0), computed in direct form: each cohort's
+counts times the kernel are added to all later dates at once. Adding cohorts in date order
+keeps the float sums the same as the loop's, so rounded estimates match.
+
+Second shots and boosters are matched to earlier cohorts by CohortLedger. A cohort's count
+changes from the day shots are matched to it.
+
+Daily counts are lists or arrays for consecutive dates.
+"""
+from functools import cached_property
+
+import numpy as np
+
+from covid_app.models.oc.immune_cohort import (ImmuneCohort, CohortLedger, INFECTION_WINDOW,
+                                               UNDERTEST_FACTOR)
+
+
+class ImmunityConvolution:
+    def __init__(self, partial_vax, full_vax, boosted, infected):
+        self.partial_vax = list(partial_vax)
+        self.full_vax = list(full_vax)
+        self.boosted = list(boosted)
+        self.infected = list(infected)
+        self.num_days = len(self.partial_vax)
+
+    #
+    # Properties
+    #
+    @cached_property
+    def kernels(self):
+        """Maps efficacy curve names to factor arrays indexed by days since cohort date.
+        """
+        curves = {
+            'partial': ImmuneCohort.partial_vax_factor,
+            'full': ImmuneCohort.full_vax_factor,
+            'booster': ImmuneCohort.booster_factor,
+            'recovered': ImmuneCohort.recovered_factor
+        }
+        return {name: np.array([curve(n) for n in range(self.num_days)], dtype=np.float64)
+                for name, curve in curves.items()}
+
+    @cached_property
+    def allocations(self):
+        """Returns changes to cohort counts left after second shots and boosters, as dicts
+        mapping cohorts to lists of (day, new_count) tuples. Cohort and day are day indexes.
+        """
+        partial_changes = {}
+        full_changes = {}
+        partial_ledger = CohortLedger('partial')
+        boosted_ledger = CohortLedger('boosted')
+
+        for day in range(self.num_days):
+            cohort = ImmuneCohort(None, self.partial_vax[day], self.full_vax[day],
+                                  self.boosted[day], None)
+
+            for index, remaining in partial_ledger.allocate(cohort.full_vax_count):
+                partial_changes.setdefault(index, []).append((day, remaining))
+            for index, remaining in boosted_ledger.allocate(cohort.boost_vax_count):
+                full_changes.setdefault(index, []).append((day, remaining))
+
+            partial_ledger.append(cohort)
+            boosted_ledger.append(cohort)
+
+        return partial_changes, full_changes
+
+    @cached_property
+    def infections(self):
+        return np.array(self.infected, dtype=np.float64) * UNDERTEST_FACTOR
+
+    @cached_property
+    def infectious(self):
+        # Infections of last INFECTION_WINDOW cohorts, newest first (see
+        # ImmuneCohort.count_active_infections)
+        infectious = np.zeros(self.num_days)
+        for days_back in range(min(INFECTION_WINDOW, self.num_days)):
+            infectious[days_back:] += self.infections[:self.num_days - days_back]
+        return infectious
+
+    @cached_property
+    def recovered(self):
+        recovered = np.zeros(self.num_days)
+        for cohort in range(self.num_days):
+            recovered[cohort:] += self.cohort_estimates(self.infections, 'recovered', cohort)
+        return recovered
+
+    @cached_property
+    def vaccinated(self):
+        partial_changes, full_changes = self.allocations
+        vaccinated = np.zeros(self.num_days)
+
+        for cohort in range(self.num_days):
+            partial = self.cohort_estimates(self.partial_vax, 'partial', cohort,
+                                            partial_changes.get(cohort))
+            full = self.cohort_estimates(self.full_vax, 'full', cohort,
+                                         full_changes.get(cohort))
+            booster = self.cohort_estimates(self.boosted, 'booster', cohort)
+            vaccinated[cohort:] += partial + full + booster
+
+        return vaccinated
+
+    #
+    # Methods
+    #
+    def cohort_estimates(self, counts, curve, cohort, changes=None):
+        """Returns array of cohort's estimates for its date through last date. Changes is
+        list of (day, new_count) tuples for cohort.
+        """
+        kernel = self.kernels[curve][:self.num_days - cohort]
+
+        if changes:
+            cohort_counts = np.full(len(kernel), counts[cohort], dtype=np.float64)
+            for day, new_count in changes:
+                cohort_counts[day - cohort:] = new_count
+        else:
+            cohort_counts = counts[cohort]
+
+        return np.maximum(cohort_counts * kernel, 0)
+
+    def __repr__(self):
+        return '<ImmunityConvolution days={}>'.format(self.num_days)
@@ -0,0 +1,167 @@
+"""
+OC Immunity Scenarios
+
+Estimates immunity under many sets of model assumptions at once. Each scenario is a dict
+with SCENARIO_KEYS, which stand in for the immune_cohort constants of the same name.
+
+Cohort counts left after second shots and boosters don't depend on the assumptions. So
+they're laid out once as matrices of counts by days since cohort date (rows) and date
+(columns). Efficacy curves for all scenarios are kernel matrices with a row per scenario.
+Estimates for every scenario and date are then one matrix product per curve:
+
+    estimates = pos(kernels) @ pos(counts) + neg(kernels) @ neg(counts)
+
+which is the sum over cohorts of max(count * factor, 0), as in ImmuneCohort.
+"""
+from functools import cached_property
+
+import numpy as np
+
+from covid_app.models.oc.immune_cohort import (PARTIAL_VAX_EFF, FULL_VAX_EFF, VAX_FADE_DAYS,
+                                               INF_FADE_DAYS, UNDERTEST_FACTOR,
+                                               INFECTION_WINDOW, RAMP_UP_WINDOW,
+                                               FULL_EFF_WINDOW)
+
+
+#
+# Constants
+#
+SCENARIO_KEYS = ('partial_vax_eff', 'full_vax_eff', 'vax_fade_days', 'inf_fade_days',
+                 'undertest_factor', 'infection_window')
+
+# Assumptions ImmuneCohort uses
+BASELINE_SCENARIO = {
+    'partial_vax_eff': PARTIAL_VAX_EFF,
+    'full_vax_eff': FULL_VAX_EFF,
+    'vax_fade_days': VAX_FADE_DAYS,
+    'inf_fade_days': INF_FADE_DAYS,
+    'undertest_factor': UNDERTEST_FACTOR,
+    'infection_window': INFECTION_WINDOW
+}
+
+# Full shot is assumed to be second shot, 4 weeks after first (see ImmuneCohort).
+DAYS_SINCE_FIRST_SHOT = 28
+
+
+class ImmunityScenarios:
+    def __init__(self, convolution, scenarios):
+        """Convolution is ImmunityConvolution for daily counts. Scenarios is list of dicts.
+        Missing keys use BASELINE_SCENARIO value.
+        """
+        self.convolution = convolution
+        self.num_days = convolution.num_days
+        self.scenarios = [dict(BASELINE_SCENARIO, **scenario) for scenario in scenarios]
+
+    #
+    # Properties
+    #
+    @cached_property
+    def params(self):
+        """Maps SCENARIO_KEYS to column arrays with a row per scenario.
+        """
+        return {key: np.array([[s[key]] for s in self.scenarios], dtype=np.float64)
+                for key in SCENARIO_KEYS}
+
+    @cached_property
+    def kernels(self):
+        """Maps efficacy curve names to factor matrices: a row per scenario, a column per
+        day since cohort date. Same curves as ImmuneCohort factor methods.
+        """
+        p = self.params
+        days_out = np.arange(self.num_days, dtype=np.float64)
+        vax_fade_rate = 1.0 / p['vax_fade_days']
+        inf_fade_rate = 1.0 / p['inf_fade_days']
+
+        full_days_out = days_out + DAYS_SINCE_FIRST_SHOT
+        full = self.efficacy_curve(full_days_out, p['full_vax_eff'], vax_fade_rate,
+                                   RAMP_UP_WINDOW + DAYS_SINCE_FIRST_SHOT,
+                                   FULL_EFF_WINDOW + DAYS_SINCE_FIRST_SHOT)
+
+        recovered = self.efficacy_curve(days_out, p['full_vax_eff'], inf_fade_rate)
+        recovered = np.where(days_out < p['infection_window'], 0, recovered)
+
+        return {
+            'partial': self.efficacy_curve(days_out, p['partial_vax_eff'], vax_fade_rate),
+            'full': full,
+            'booster': self.efficacy_curve(days_out, p['full_vax_eff'], vax_fade_rate),
+            'recovered': recovered
+        }
+
+    @cached_property
+    def count_matrices(self):
+        """Maps curve names to matrices of cohort counts by days since cohort date (rows)
+        and date (columns). Counts change from the day shots are matched to a cohort.
+        """
+        c = self.convolution
+        partial_changes, full_changes = c.allocations
+
+        return {
+            'partial': self.count_matrix(c.partial_vax, partial_changes),
+            'full': self.count_matrix(c.full_vax, full_changes),
+            'booster': self.count_matrix(c.boosted),
+            'recovered': self.count_matrix(c.infected)
+        }
+
+    @cached_property
+    def infectious(self):
+        # Infections of last infection_window cohorts
+        p = self.params
+        totals = np.concatenate(([0], np.cumsum(np.array(self.convolution.infected,
+                                                         dtype=np.float64))))
+        ends = np.arange(1, self.num_days + 1)
+        starts = np.maximum(ends - p['infection_window'].astype(np.int64), 0)
+        return (totals[ends] - totals[starts]) * p['undertest_factor']
+
+    @cached_property
+    def recovered(self):
+        return self.estimate('recovered') * self.params['undertest_factor']
+
+    @cached_property
+    def vaccinated(self):
+        return self.estimate('partial') + self.estimate('full') + self.estimate('booster')
+
+    #
+    # Methods
+    #
+    def efficacy_curve(self, days_out, efficacy, fade_rate, ramp_up_window=RAMP_UP_WINDOW,
+                       full_eff_window=FULL_EFF_WINDOW):
+        ramp_up = (efficacy / RAMP_UP_WINDOW) * days_out
+        fade = efficacy - (fade_rate * (days_out - full_eff_window))
+        return np.where(days_out < ramp_up_window, ramp_up,
+                        np.where(days_out < full_eff_window, efficacy, fade))
+
+    def count_matrix(self, counts, changes=None):
+        days = np.arange(self.num_days)
+        cohorts = days[None, :] - days[:, None]
+        counts = np.array(counts, dtype=np.float64)
+        matrix = np.where(cohorts >= 0, counts[np.maximum(cohorts, 0)], 0)
+
+        for cohort, cohort_changes in (changes or {}).items():
+            for day, new_count in cohort_changes:
+                matrix[days[day:] - cohort, days[day:]] = new_count
+
+        return matrix
+
+    def estimate(self, curve):
+        """Returns matrix of estimates for curve with a row per scenario, a column per date.
+        """
+        kernels = self.kernels[curve]
+        counts = self.count_matrices[curve]
+        estimates = np.maximum(kernels, 0) @ np.maximum(counts, 0)
+
+        # Negative counts (data corrections) only count where factors are negative too.
+        if (counts < 0).any():
+            estimates += np.minimum(kernels, 0) @ np.minimum(counts, 0)
+
+        return estimates
+
+    def vulnerable(self, population):
+        """Returns matrix of population not infectious or immune, a row per scenario.
+        """
+        return population - self.infectious - self.recovered - self.vaccinated
+
+    def __len__(self):
+        return len(self.scenarios)
+
+    def __repr__(self):
+        return '<ImmunityScenarios scenarios={} days={}>'.format(len(self), self.num_days)
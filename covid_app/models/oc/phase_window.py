@@ -1,9 +1,20 @@
 import statistics
 from math import floor
+from functools import cached_property
+from datetime import timedelta
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from config.app import WAVE_ANALYSIS_CONFIG
 
 
+def check_window_size(window_size):
+    # Windows are centered on a date, so they need an odd number of days.
+    if window_size < 1 or window_size % 2 == 0:
+        raise ValueError('Window size must be odd: {}'.format(window_size))
+
+
 class PhaseWindow:
     def __init__(self, dated, values, **opts):
         self.date = dated
@@ -49,3 +60,210 @@ class PhaseWindow:
     def __repr__(self):
         f = '<PhaseWindow middate={} days={} slope={:.3f} stdev={:.3f} trend={}>'
         return f.format(self.date, len(self.values), self.slope, self.stdev, self.trend)
+
+
+class PhaseWindows:
+    """Sequence of PhaseWindows for a timeline, computed in one vectorized pass.
+
+    Timeline is aligned to a dense date-indexed array. A window is centered on each date with
+    a value for every day in it (blank and 0 values don't count). Slopes, means, stdevs and
+    trends are arrays over all windows. PhaseWindow objects are only created when accessed.
+    """
+    def __init__(self, timeline, window_size, **opts):
+        c = WAVE_ANALYSIS_CONFIG
+        check_window_size(window_size)
+        self.opts = opts
+        self.flat_slope_threshold = opts.get('flat_slope_threshold', c['flat_slope_threshold'])
+        self.window_size = window_size
+        self.half_window_len = floor(window_size / 2)
+
+        dates = sorted(timeline.keys())
+        start_date = dates[0] if dates else None
+        num_days = (dates[-1] - dates[0]).days + 1 if dates else 0
+
+        values = np.full(num_days, np.nan)
+        for dated in dates:
+            value = timeline[dated]
+            if value:
+                values[(dated - start_date).days] = value
+
+        self.load_values(start_date, values)
+
+    #
+    # Static Methods
+    #
+    @staticmethod
+    def from_values(start_date, values, window_size, views=None, complete=None, **opts):
+        """Builds windows from dense values array (NaN for blank days) starting on start_date.
+        Views and complete mask can be passed in if already computed (see BatchPhaseWindows).
+        """
+        windows = PhaseWindows({}, window_size, **opts)
+        windows.load_values(start_date, values, views, complete)
+        return windows
+
+    #
+    # Properties
+    #
+    @cached_property
+    def slopes(self):
+        return (self.views[:, -1] - self.views[:, 0]) / self.window_size
+
+    @cached_property
+    def means(self):
+        return self.views.mean(axis=1)
+
+    @cached_property
+    def stdevs(self):
+        return self.views.std(axis=1, ddof=1)
+
+    @cached_property
+    def trends(self):
+        threshold = self.flat_slope_threshold
+        return np.where(self.slopes > threshold, 1, np.where(self.slopes < -threshold, -1, 0))
+
+    @cached_property
+    def center_values(self):
+        return self.values[self.indexes]
+
+    @property
+    def dates(self):
+        return [self.date_at(n) for n in range(len(self))]
+
+    #
+    # Methods
+    #
+    def load_values(self, start_date, values, views=None, complete=None):
+        self.start_date = start_date
+        self.values = values
+
+        # Index of each window's center date in values.
+        width = 2 * self.half_window_len + 1
+        if len(values) >= width:
+            if views is None:
+                views = sliding_window_view(values, width)
+            if complete is None:
+                complete = ~np.isnan(views).any(axis=1)
+            self.views = views[complete]
+            self.indexes = np.flatnonzero(complete) + self.half_window_len
+        else:
+            self.views = np.empty((0, width))
+            self.indexes = np.empty(0, dtype=np.int64)
+
+        self.materialized = {}
+
+    def date_at(self, n):
+        return self.start_date + timedelta(days=int(self.indexes[n]))
+
+    def window(self, n):
+        if n not in self.materialized:
+            values = self.views[n].tolist()
+            self.materialized[n] = PhaseWindow(self.date_at(n), values, **self.opts)
+        return self.materialized[n]
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.window(n) for n in range(len(self))[key]]
+
+        n = key + len(self) if key < 0 else key
+        if not 0 <= n < len(self):
+            raise IndexError('PhaseWindows index out of range')
+        return self.window(n)
+
+    def __iter__(self):
+        return (self.window(n) for n in range(len(self)))
+
+    def __repr__(self):
+        return '<PhaseWindows start={} windows={}>'.format(self.start_date, len(self))
+
+
+class BatchPhaseWindows:
+    """PhaseWindows for several timelines, computed in one vectorized pass.
+
+    Timelines are aligned to a dense 2-D array: a row per timeline, a column per day from
+    first to last date of any timeline. Window views, complete masks, slopes and trends are
+    computed for all rows at once. Each timeline can have its own flat slope threshold.
+
+    Only None values are blank, so zero-count days (common in deaths, ICU and wastewater
+    series) stay in windows. Timelines in blank_zero_keys keep PhaseWindows' rule that 0 is
+    blank too, so primary windows match Epidemic.windows.
+    """
+    def __init__(self, timelines, window_size, thresholds=None, blank_zero_keys=('primary',)):
+        """Thresholds maps timeline keys to flat slope thresholds. Missing keys use
+        WAVE_ANALYSIS_CONFIG value.
+        """
+        c = WAVE_ANALYSIS_CONFIG
+        check_window_size(window_size)
+        thresholds = thresholds if thresholds else {}
+        self.keys = list(timelines.keys())
+        self.thresholds = {key: thresholds.get(key, c['flat_slope_threshold'])
+                           for key in self.keys}
+        self.window_size = window_size
+        self.half_window_len = floor(window_size / 2)
+
+        dates = sorted(set().union(*(timeline.keys() for timeline in timelines.values())))
+        self.start_date = dates[0] if dates else None
+        num_days = (dates[-1] - dates[0]).days + 1 if dates else 0
+
+        self.values = np.full((len(self.keys), num_days), np.nan)
+        for row, key in enumerate(self.keys):
+            blank_zero = key in blank_zero_keys
+            for dated, value in timelines[key].items():
+                if value is None or (blank_zero and not value):
+                    continue
+                self.values[row, (dated - self.start_date).days] = value
+
+        width = 2 * self.half_window_len + 1
+        if num_days >= width:
+            self.views = sliding_window_view(self.values, width, axis=1)
+        else:
+            self.views = np.empty((len(self.keys), 0, width))
+
+        self.series_windows = {}
+
+    #
+    # Properties
+    #
+    @cached_property
+    def complete(self):
+        return ~np.isnan(self.views).any(axis=2)
+
+    @cached_property
+    def slopes(self):
+        # NaN for incomplete windows.
+        return (self.views[:, :, -1] - self.views[:, :, 0]) / self.window_size
+
+    @cached_property
+    def trends(self):
+        thresholds = np.array([[self.thresholds[key]] for key in self.keys])
+        return np.where(self.slopes > thresholds, 1, np.where(self.slopes < -thresholds, -1, 0))
+
+    #
+    # Methods
+    #
+    def series(self, key):
+        """Returns PhaseWindows for timeline key, with slopes and trends from batch arrays.
+        """
+        if key not in self.series_windows:
+            row = self.keys.index(key)
+            complete = self.complete[row]
+            windows = PhaseWindows.from_values(self.start_date, self.values[row],
+                                               self.window_size, self.views[row], complete,
+                                               flat_slope_threshold=self.thresholds[key])
+
+            if len(windows):
+                windows.__dict__['slopes'] = self.slopes[row][complete]
+                windows.__dict__['trends'] = self.trends[row][complete]
+
+            self.series_windows[key] = windows
+
+        return self.series_windows[key]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        f = '<BatchPhaseWindows start={} timelines={} days={}>'
+        return f.format(self.start_date, len(self.keys), self.values.shape[1])
@@ -0,0 +1,111 @@
+"""
+RollingStats
+
+Rolling mean, variance and z-score for a timeline (dict mapping dates to values), computed in
+one pass over its dates.
+
+Stats for a date cover values for the window_size days ending on it. Blank values are left
+out. Window stats are updated as each day enters and leaves the window (Welford's method,
+with the inverse update for removal), so each value is visited twice at most. Windows are
+calendar days, so values leave on time even if the timeline skips days.
+
+Z-score for a date compares its value to the window ending the day before. It's only
+computed once that window has min_count values (default: a full window), so the first days
+of a timeline aren't scored against a handful of values.
+"""
+from collections import deque
+from math import sqrt
+from datetime import timedelta
+
+
+class RollingWindow:
+    """Values (with their dates) in a window, with running count, mean and variance.
+    """
+    def __init__(self):
+        self.values = deque()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def variance(self):
+        return max(self.m2, 0.0) / (self.count - 1) if self.count > 1 else None
+
+    def add(self, dated, value):
+        self.values.append((dated, value))
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove_through(self, dated):
+        """Removes values dated on or before dated. Timelines can skip days, so this may be
+        any number of values.
+        """
+        while self.values and self.values[0][0] <= dated:
+            _, value = self.values.popleft()
+            self.count -= 1
+
+            if self.count:
+                delta = value - self.mean
+                self.mean -= delta / self.count
+                self.m2 -= delta * (value - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+
+
+class RollingStats:
+    def __init__(self, timeline, window_size, min_count=None):
+        self.window_size = window_size
+        self.min_count = max(min_count if min_count else window_size, 2)
+        self.dates = sorted(timeline.keys())
+        self.counts = {}
+        self.means = {}
+        self.variances = {}
+        self.zscores = {}
+        self.compute(timeline)
+
+    #
+    # Properties
+    #
+    @property
+    def stdevs(self):
+        return {dated: sqrt(v) if v is not None else None for dated, v in self.variances.items()}
+
+    #
+    # Methods
+    #
+    def compute(self, timeline):
+        window = RollingWindow()
+        window_days = timedelta(days=self.window_size)
+
+        for dated in self.dates:
+            # z-score vs window through yesterday
+            value = timeline[dated]
+            window.remove_through(dated - timedelta(days=1) - window_days)
+            variance = window.variance
+            if value is not None and window.count >= self.min_count and variance:
+                self.zscores[dated] = (value - window.mean) / sqrt(variance)
+            else:
+                self.zscores[dated] = None
+
+            # Add today and remove days leaving window
+            if value is not None:
+                window.add(dated, value)
+            window.remove_through(dated - window_days)
+
+            self.counts[dated] = window.count
+            self.means[dated] = window.mean if window.count else None
+            self.variances[dated] = window.variance
+
+        return self.zscores
+
+    def anomalies(self, z_score):
+        """Returns dict mapping dates to z-scores at least z_score from window mean.
+        """
+        return {dated: z for dated, z in self.zscores.items()
+                if z is not None and abs(z) >= z_score}
+
+    def __repr__(self):
+        f = '<RollingStats window_size={} dates={}>'
+        return f.format(self.window_size, len(self.dates))
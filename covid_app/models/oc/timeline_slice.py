@@ -0,0 +1,37 @@
+"""
+TimelineSlice
+
+Read-only view of a timeline (dict mapping dates to values) between two dates. Range in
+timeline's sorted dates is found by binary search. Dates and values are not copied.
+
+Used by Epidemic.extract_timeline_by_start_end_dates for wave and phase timelines.
+"""
+from collections.abc import Mapping
+from bisect import bisect_left, bisect_right
+
+
+class TimelineSlice(Mapping):
+    __slots__ = ('time_series', 'dates', 'start', 'stop')
+
+    def __init__(self, time_series, dates, start_date, end_date):
+        """Dates is sorted list of time_series dates. Slice includes start and end dates.
+        """
+        self.time_series = time_series
+        self.dates = dates
+        self.start = bisect_left(dates, start_date)
+        self.stop = max(bisect_right(dates, end_date), self.start)
+
+    def __getitem__(self, dated):
+        if self.start < self.stop and self.dates[self.start] <= dated <= self.dates[self.stop - 1]:
+            return self.time_series[dated]
+        raise KeyError(dated)
+
+    def __iter__(self):
+        for n in range(self.start, self.stop):
+            yield self.dates[n]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __repr__(self):
+        return repr(dict(self.items()))
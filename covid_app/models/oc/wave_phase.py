@@ -1,81 +1,67 @@
 """
 See Epidemic model (epidemic.py) for hardcoded phases.
+
+A phase is a range of windows in the epidemic's shared PhaseWindows array: from its start
+window through its end window (inclusive). Values derived from the range are computed once
+when a phase is created. So merging phases just creates a new range.
 """
 from config.app import WAVE_ANALYSIS_CONFIG
 
 
 class WavePhase:
-    def __init__(self, start_window, epidemic, **opts):
-        self.windows = [start_window]
+    __slots__ = ('window_array', 'start', 'stop', 'epidemic', 'flat_slope_threshold',
+                 'min_phase_size', 'started_on', 'ended_on', 'start_value', 'end_value',
+                 'days', 'slope', 'trend')
+
+    def __init__(self, window_array, start, stop, epidemic, **opts):
+        """Start and stop are indexes of start and end windows in window_array.
+        """
+        self.window_array = window_array
+        self.start = start
+        self.stop = stop
         self.epidemic = epidemic
 
         c = WAVE_ANALYSIS_CONFIG
         self.flat_slope_threshold = opts.get('flat_slope_threshold', c['flat_slope_threshold'])
         self.min_phase_size = opts.get('min_phase_size', c['min_phase_size'])
 
-        self.end_window = None
-
-    @property
-    def started_on(self):
-        return self.start_window.date
+        self.started_on = window_array.date_at(start)
+        self.ended_on = window_array.date_at(stop)
+        self.start_value = float(window_array.center_values[start])
+        self.end_value = float(window_array.center_values[stop])
+        self.days = (self.ended_on - self.started_on).days
+        self.slope = self.value_diff / self.days
+        self.trend = self.compute_trend()
 
     @property
-    def ended_on(self):
-        if self.is_ended():
-            return self.end_window.date
+    def windows(self):
+        return self.window_array[self.start:self.stop + 1]
 
     @property
     def start_window(self):
-        return self.windows[0]
+        return self.window_array[self.start]
 
     @property
     def last_window(self):
-        return self.windows[-1]
-
-    @property
-    def start_value(self):
-        return self.start_window.value
+        return self.window_array[self.stop]
 
     @property
-    def end_value(self):
-        if self.is_ended():
-            return self.end_window.value
+    def end_window(self):
+        return self.window_array[self.stop]
 
     @property
     def last_value(self):
-        return self.last_window.value
-
-    @property
-    def days(self):
-        if not self.is_ended():
-            return None
-        return (self.ended_on - self.started_on).days
+        return self.end_value
 
     @property
     def value_diff(self):
         return self.last_value - self.start_value
 
-    @property
-    def slope(self):
-        return self.value_diff / self.days
-
     @property
     def kslope(self):
         # kilo-slope
         return self.slope * 1000
 
-    @property
-    def trend(self):
-        if self.slope is None:
-            return None
-
-        if self.slope > self.flat_slope_threshold:
-            return 1
-        elif self.slope < -self.flat_slope_threshold:
-            return -1
-        else:
-            return 0
-
     @property
     def trending(self):
         labels = {
@@ -91,28 +77,25 @@ class WavePhase:
         return self.extract_timeline(self.epidemic.timeline)
 
     # Methods
-    def add_window(self, window):
-        self.windows.append(window)
-
     def merge(self, other_phase):
         start_phase = self if self.started_on < other_phase.started_on else other_phase
         end_phase = self if start_phase != self else other_phase
-        merged_phase = WavePhase(start_phase.start_window, self.epidemic)
-        merged_phase.windows = start_phase.windows + end_phase.windows[:-1]
-        merged_phase.end(end_phase.end_window)
-        return merged_phase
+        return WavePhase(self.window_array, start_phase.start, end_phase.stop, self.epidemic,
+                         flat_slope_threshold=self.flat_slope_threshold,
+                         min_phase_size=self.min_phase_size)
 
-    def end(self, window):
-        self.windows.append(window)
-        self.end_window = window
+    def compute_trend(self):
+        if self.slope > self.flat_slope_threshold:
+            return 1
+        elif self.slope < -self.flat_slope_threshold:
+            return -1
+        else:
+            return 0
 
     def is_ended(self):
-        return self.end_window is not None
+        return True
 
     def is_micro(self):
-        if not self.is_ended():
-            return None
-
         if self.days <= self.min_phase_size:
             return True
 
@@ -134,16 +117,8 @@ class WavePhase:
         """Extract timeline for time series datapoints falling within range of this
         wave.
         """
-        wave_timeline = {}
-
-        for dated, value in sorted(time_series.items()):
-            if dated > self.ended_on:
-                return wave_timeline
-
-            if dated >= self.started_on:
-                wave_timeline[dated] = value
-
-        return wave_timeline
+        return self.epidemic.extract_timeline_by_start_end_dates(time_series, self.started_on,
+                                                                 self.ended_on)
 
     def __repr__(self):
         f = '<Phase start={} end={} days={} kslope={} trending={} micro?={}>'
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+from random import Random
+
+from tests.helper import AppTestCase
+from covid_app.exports.oc.lag_distribution import LagDistributionIndex, parse_buckets
+
+
+class LagDistributionIndexTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        random = Random(20200803)
+        self.start_date = date(2020, 8, 3)
+        self.time_series = {}
+
+        # Like the export: older dates have longer series. Newest has none yet.
+        for n in range(40):
+            dated = self.start_date + timedelta(days=n)
+            self.time_series[dated] = [random.randint(-5, 100) for _ in range(39 - n)]
+
+    def test_expects_counts_to_match_series_slices(self):
+        # Arrange
+        index = LagDistributionIndex(self.time_series)
+        buckets = parse_buckets('1,2-3,4-10,11+')
+
+        # Act / Assert
+        for dated, series in self.time_series.items():
+            for start, end in buckets:
+                expected = sum(series[start-1:end]) if len(series) >= start else None
+                self.assertEqual(index.count(dated, start, end), expected)
+
+    def test_expects_rolling_average_delay_to_match_weekly_walk(self):
+        # Arrange
+        index = LagDistributionIndex(self.time_series)
+
+        # Act / Assert
+        for n in range(40):
+            dated = self.start_date + timedelta(days=n)
+            week = [self.time_series.get(dated - timedelta(days=d)) for d in range(7)]
+
+            if not all(week):
+                self.assertIsNone(index.rolling_average_delay(dated))
+                continue
+
+            counts = [(v, lag + 1) for series in week for lag, v in enumerate(series) if v > 0]
+            expected = sum(v * lag for v, lag in counts) / sum(v for v, _ in counts)
+            self.assertEqual(index.rolling_average_delay(dated), expected)
+
+    def test_expects_bucket_layout_to_be_parsed(self):
+        self.assertEqual(parse_buckets('1-2,3-4,5-6,8-14,15+'),
+                         ((1, 2), (3, 4), (5, 6), (8, 14), (15, -1)))
+        with self.assertRaises(ValueError):
+            parse_buckets('4-2')
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+from random import Random
+
+from tests.helper import AppTestCase
+from covid_app.exports.oc.daily_tests_checkpoint import DelaySummary, DELAY_BUCKETS
+from covid_app.exports.oc.lag_distribution import LagDistributionIndex
+
+
+class DelaySummaryTest(AppTestCase):
+    def test_expects_summary_to_match_lag_distribution_index(self):
+        # Arrange
+        random = Random(20200803)
+        start_date = date(2020, 8, 3)
+        time_series = {}
+
+        for length in range(30):
+            dated = start_date + timedelta(days=length)
+            time_series[dated] = [random.randint(-20, 200) for _ in range(length)]
+
+        # Act
+        index = LagDistributionIndex(time_series)
+
+        # Assert
+        for dated, series in time_series.items():
+            summary = DelaySummary.from_series(series)
+            self.assertEqual(summary.bucket_values, index.counts_by_bucket(dated, DELAY_BUCKETS))
+            self.assertEqual(summary.average_delay, index.average_delay(dated))
+            self.assertEqual(DelaySummary.from_lag_index(index, dated).to_dict(),
+                             summary.to_dict())
+
+    def test_expects_summary_to_survive_serialization(self):
+        # Arrange
+        summary = DelaySummary.from_series([5, 0, 3, -1] + [1] * 20)
+
+        # Act
+        restored = DelaySummary.from_dict(summary.to_dict())
+        restored.append(4)
+        summary.append(4)
+
+        # Assert
+        self.assertEqual(restored.bucket_values, summary.bucket_values)
+        self.assertEqual(restored.average_delay, summary.average_delay)
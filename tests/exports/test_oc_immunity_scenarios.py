@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+from random import Random
+from types import SimpleNamespace
+
+from tests.helper import AppTestCase
+from covid_app.exports.oc_immunity import OCImmunityExport
+from covid_app.exports.oc.immunity_scenarios import OcImmunityScenariosExport
+from covid_app.models.oc.immunity_convolution import ImmunityConvolution
+
+
+class OcImmunityScenariosExportTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        random = Random(20210101)
+        num_days = 1300
+        start_date = date(2020, 3, 1)
+
+        # Stand in for extracts so no data is fetched.
+        self.immunity_export = OCImmunityExport()
+        self.immunity_export.case_extract = SimpleNamespace(
+            dates=[start_date + timedelta(days=n) for n in range(num_days)])
+        self.immunity_export.convolution = ImmunityConvolution(
+            [random.randint(-50, 3000) for _ in range(num_days)],
+            [random.randint(-50, 2500) for _ in range(num_days)],
+            [random.randint(-50, 1500) for _ in range(num_days)],
+            [random.randint(-20, 900) for _ in range(num_days)]
+        )
+
+    def test_expects_baseline_band_to_match_immunity_csv_rows(self):
+        # Arrange
+        export = OcImmunityScenariosExport(grid={'undertest_factor': [2.0, 3.0]})
+        export.immunity_export = self.immunity_export
+
+        # Act
+        baseline = export.bands['baseline'].round().astype(int).tolist()
+
+        # Assert
+        expected = [self.immunity_export.extract_data_to_csv_row(e)[4]
+                    for e in self.immunity_export.estimates]
+        self.assertEqual(baseline, expected)
@@ -0,0 +1,96 @@
+import json
+
+from tests.helper import AppTestCase
+from covid_app.extracts.arcgis_query import ArcGisQueryClient, ArcGisQueryError
+
+
+class FakeResponse:
+    def __init__(self, json_data):
+        self.json_data = json_data
+        self.size = len(json.dumps(json_data))
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.json_data
+
+
+class FakeLayerCache:
+    """Serves layer with record_count features, max_record_count per page.
+    """
+    def __init__(self, record_count, max_record_count, page_cap=None):
+        self.record_count = record_count
+        self.max_record_count = max_record_count
+        self.page_cap = page_cap if page_cap else max_record_count
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+
+        if not url.endswith('/query'):
+            return FakeResponse({'maxRecordCount': self.max_record_count})
+
+        if params.get('returnCountOnly') == 'true':
+            return FakeResponse({'count': self.record_count})
+
+        offset = params.get('resultOffset', 0)
+        limit = min(params.get('resultRecordCount', self.max_record_count),
+                    self.max_record_count, self.page_cap)
+        stop = min(offset + limit, self.record_count)
+        features = [{'attributes': {'date': n}} for n in range(offset, stop)]
+        return FakeResponse({'features': features,
+                             'exceededTransferLimit': stop < self.record_count})
+
+
+class ArcGisQueryClientTest(AppTestCase):
+    def test_expects_large_layer_to_be_paged_with_projected_fields(self):
+        # Arrange
+        cache = FakeLayerCache(record_count=2500, max_record_count=1000)
+        client = ArcGisQueryClient('https://example.com/rest/services', cache=cache)
+
+        # Act
+        rows = client.query('cases', 'cases IS NOT NULL', ['date', 'cases'], order_by='date')
+
+        # Assert
+        self.assertEqual([row['date'] for row in rows], list(range(2500)))
+        self.assertEqual(client.page_count, 3)
+
+        _, params = cache.requests[0]
+        self.assertEqual(params['outFields'], 'date,cases')
+        self.assertEqual(params['returnGeometry'], 'false')
+        self.assertEqual(params['f'], 'json')
+
+    def test_expects_pages_capped_below_max_record_count_to_be_filled(self):
+        # Arrange
+        cache = FakeLayerCache(record_count=2500, max_record_count=1000, page_cap=700)
+        client = ArcGisQueryClient('https://example.com/rest/services', cache=cache)
+
+        # Act
+        rows = client.query('cases', 'cases IS NOT NULL', ['date'], order_by='date')
+
+        # Assert
+        self.assertEqual([row['date'] for row in rows], list(range(2500)))
+
+    def test_expects_error_if_records_run_out(self):
+        # Arrange
+        cache = FakeLayerCache(record_count=2500, max_record_count=1000)
+        client = ArcGisQueryClient('https://example.com/rest/services', cache=cache)
+        fetch_record_count = client.fetch_record_count
+        client.fetch_record_count = lambda *args: fetch_record_count(*args) + 10
+
+        # Act / Assert
+        with self.assertRaises(ArcGisQueryError):
+            client.query('cases', 'cases IS NOT NULL', ['date'], order_by='date')
+
+    def test_expects_small_layer_to_take_one_request(self):
+        # Arrange
+        cache = FakeLayerCache(record_count=800, max_record_count=1000)
+        client = ArcGisQueryClient('https://example.com/rest/services', cache=cache)
+
+        # Act
+        rows = client.query('cases', 'cases IS NOT NULL', ['date'])
+
+        # Assert
+        self.assertEqual(len(rows), 800)
+        self.assertEqual(len(cache.requests), 1)
@@ -0,0 +1,120 @@
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import hashlib
+
+import requests
+
+from tests.helper import AppTestCase
+from covid_app.extracts.http_cache import HttpCache, HttpCacheMissError
+
+
+class FakeResponse:
+    """Stands in for streamed requests.Response.
+    """
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers if headers else {}
+
+    def iter_content(self, chunk_size):
+        for n in range(0, len(self.body), chunk_size):
+            yield self.body[n:n + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(self.status_code)
+
+    def close(self):
+        pass
+
+
+class HttpCacheTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = TemporaryDirectory()
+        self.url = 'https://example.com/data.csv?county=Orange'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_expects_offline_cache_to_serve_saved_body_without_network(self):
+        # Arrange
+        cache = HttpCache(self.temp_dir.name, offline=True)
+        key = hashlib.sha256(self.url.encode('utf-8')).hexdigest()
+        with open(cache.body_path(key), 'wb') as f:
+            f.write(b'Date,Cases\r\n2022-01-01,10\r\n')
+        cache.save_meta(key, {'url': self.url, 'etag': '"abc"', 'last_modified': None,
+                              'size': 28})
+
+        # Act
+        response = cache.get('https://example.com/data.csv', params={'county': 'Orange'})
+
+        # Assert
+        self.assertTrue(response.from_cache)
+        self.assertEqual(list(response.iter_lines()), [b'Date,Cases', b'2022-01-01,10'])
+        self.assertEqual((cache.hits, cache.misses, cache.bytes_saved), (1, 0, 28))
+
+    def test_expects_offline_cache_to_raise_error_for_uncached_url(self):
+        # Arrange
+        cache = HttpCache(self.temp_dir.name, offline=True)
+
+        # Act / Assert
+        with self.assertRaises(HttpCacheMissError):
+            cache.get(self.url)
+        self.assertEqual(cache.request_count, 0)
+
+    def test_expects_revalidation_to_serve_body_from_disk_on_304(self):
+        # Arrange
+        cache = HttpCache(self.temp_dir.name, offline=False)
+        headers = {'ETag': '"v1"', 'Last-Modified': 'Sat, 01 Jan 2022 00:00:00 GMT'}
+        responses = [FakeResponse(200, b'Date,Cases\r\n2022-01-01,10\r\n', headers),
+                     FakeResponse(304)]
+
+        # Act
+        with patch.object(cache.session, 'get', side_effect=responses) as session_get:
+            fetched = cache.get(self.url)
+            revalidated = cache.get(self.url)
+
+        # Assert
+        first_headers = session_get.call_args_list[0].kwargs['headers']
+        second_headers = session_get.call_args_list[1].kwargs['headers']
+        self.assertEqual(first_headers, {})
+        self.assertEqual(second_headers, {'If-None-Match': '"v1"',
+                                          'If-Modified-Since': headers['Last-Modified']})
+        self.assertFalse(fetched.from_cache)
+        self.assertTrue(revalidated.from_cache)
+        self.assertEqual(revalidated.content, b'Date,Cases\r\n2022-01-01,10\r\n')
+        self.assertEqual((cache.hits, cache.misses, cache.bytes_saved, cache.bytes_fetched),
+                         (1, 1, 27, 27))
+
+    def test_expects_modified_response_to_overwrite_cached_body(self):
+        # Arrange
+        cache = HttpCache(self.temp_dir.name, offline=False)
+        responses = [FakeResponse(200, b'old', {'ETag': '"v1"'}),
+                     FakeResponse(200, b'new body', {'ETag': '"v2"'}),
+                     FakeResponse(304)]
+
+        # Act
+        with patch.object(cache.session, 'get', side_effect=responses) as session_get:
+            cache.get(self.url)
+            updated = cache.get(self.url)
+            revalidated = cache.get(self.url)
+
+        # Assert
+        third_headers = session_get.call_args_list[2].kwargs['headers']
+        self.assertEqual(third_headers, {'If-None-Match': '"v2"'})
+        self.assertFalse(updated.from_cache)
+        self.assertEqual(updated.content, b'new body')
+        self.assertEqual(revalidated.content, b'new body')
+        self.assertEqual((cache.hits, cache.misses, cache.bytes_saved, cache.bytes_fetched),
+                         (1, 2, 8, 11))
+
+    def test_expects_error_response_to_raise_without_caching(self):
+        # Arrange
+        cache = HttpCache(self.temp_dir.name, offline=False)
+
+        # Act / Assert
+        with patch.object(cache.session, 'get', return_value=FakeResponse(500)):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                cache.get(self.url)
+        self.assertEqual(cache.request_count, 0)
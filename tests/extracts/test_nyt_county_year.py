@@ -0,0 +1,51 @@
+from datetime import date
+from tempfile import TemporaryDirectory
+
+from tests.helper import AppTestCase, path_join
+from covid_app.extracts.nyt.county_year import NyTimesCountyYear
+
+
+class NyTimesCountyYearTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = TemporaryDirectory()
+        self.lines = [
+            'date,county,state,fips,cases,deaths',
+            '2021-01-01,Kent,Michigan,26081,100,2',
+            '2021-01-01,Orange,California,06059,500,',
+            '2021-01-01,Unknown,Michigan,,7,0',
+            '2021-01-02,Kent,Michigan,26081,110,3',
+            '2021-01-02,Orange,California,06059,540,9',
+            '2021-01-03,Kent,Michigan,26081,125,3'
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_expects_counties_to_be_extracted_in_one_pass(self):
+        # Act
+        county_year = NyTimesCountyYear.from_lines(2021, self.lines, ['26081', '06059'])
+
+        # Assert
+        self.assertEqual(county_year.fips, ['06059', '26081'])
+        self.assertEqual(len(county_year), 5)
+
+        kent_logs = county_year.daily_logs('26081')
+        self.assertEqual([log['new_cases'] for log in kent_logs.values()], [100, 10, 15])
+        self.assertEqual(kent_logs[date(2021, 1, 2)]['new_deaths'], 1)
+        self.assertEqual(county_year.daily_logs('06059')[date(2021, 1, 2)]['new_deaths'], 9)
+        self.assertEqual(county_year.daily_logs('36061'), {})
+
+    def test_expects_saved_year_to_load_same_logs(self):
+        # Arrange
+        path = path_join(self.temp_dir.name, 'us-counties-2021.npz')
+        county_year = NyTimesCountyYear.from_lines(2021, self.lines)
+
+        # Act
+        county_year.save(path)
+        loaded = NyTimesCountyYear.load(path).select(['26081'])
+
+        # Assert
+        self.assertEqual(loaded.year, 2021)
+        self.assertEqual(loaded.fips, ['26081'])
+        self.assertEqual(loaded.daily_logs('26081'), county_year.daily_logs('26081'))
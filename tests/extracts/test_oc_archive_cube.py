@@ -0,0 +1,88 @@
+from os import makedirs
+from datetime import date
+from shutil import copy
+from tempfile import TemporaryDirectory
+
+from tests.helper import AppTestCase, path_join
+from covid_app.extracts.oc_hca.archive_cube import OcArchiveCube
+from covid_app.extracts.oc_hca.archive_loader import (OcArchiveLoader, ARCHIVE_PATH, ADMIN_TESTS,
+                                                      POSITIVE_TESTS)
+from covid_app.extracts.oc_hca.daily_archive_extract import OcDailyArchiveExtract
+
+
+class OcArchiveCubeTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = TemporaryDirectory()
+        self.archive_path = path_join(self.temp_dir.name, 'daily')
+        self.cube_path = path_join(self.temp_dir.name, 'cube')
+        makedirs(self.archive_path)
+
+        # Snapshot for Sep 14 is left out of archive on purpose.
+        for file_name in ['oc-hca-20200912.csv', 'oc-hca-20200913.csv', 'oc-hca-20200915.csv']:
+            copy(path_join(ARCHIVE_PATH, file_name), self.archive_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_expects_snapshot_changes_to_match_archive_extract(self):
+        # Arrange
+        report_date = date(2020, 9, 13)
+        extract = OcDailyArchiveExtract(report_date)
+
+        # Act
+        cube = OcArchiveCube(self.archive_path, self.cube_path).load()
+
+        # Assert
+        self.assertEqual(cube.snapshot_changes(report_date, ADMIN_TESTS),
+                         extract.updated_admin_tests)
+        self.assertEqual(cube.snapshot_changes(report_date, POSITIVE_TESTS),
+                         extract.updated_positive_tests)
+        self.assertEqual(cube.snapshot_data_dates(report_date), list(extract.dates))
+
+    def test_expects_missing_snapshot_to_repeat_previous_one(self):
+        # Arrange
+        sep_13 = date(2020, 9, 13)
+        sep_14 = date(2020, 9, 14)
+        aug_1 = date(2020, 8, 1)
+
+        # Act
+        cube = OcArchiveCube(self.archive_path, self.cube_path).load()
+
+        # Assert
+        self.assertEqual(cube.last_report_date, date(2020, 9, 15))
+        self.assertEqual(cube.snapshot_changes(sep_14, ADMIN_TESTS), {})
+        self.assertEqual(cube.snapshot_value(sep_14, aug_1, ADMIN_TESTS),
+                         cube.snapshot_value(sep_13, aug_1, ADMIN_TESTS))
+
+    def test_expects_cube_to_rebuild_when_archive_changes(self):
+        # Arrange
+        cube = OcArchiveCube(self.archive_path, self.cube_path).load()
+        self.assertTrue(cube.is_current())
+
+        # Act
+        copy(path_join(ARCHIVE_PATH, 'oc-hca-20200916.csv'), self.archive_path)
+
+        # Assert
+        self.assertFalse(cube.is_current())
+        cube.load()
+        self.assertEqual(cube.last_report_date, date(2020, 9, 16))
+
+    def test_expects_pool_loaded_extracts_to_match_file_extracts(self):
+        # Arrange
+        dates = [date(2020, 9, 12), date(2020, 9, 13), date(2020, 9, 14), date(2020, 9, 15)]
+        loader = OcArchiveLoader(workers=2, archive_path=self.archive_path)
+
+        # Act
+        extracts = loader.load_extracts(dates)
+
+        # Assert
+        self.assertEqual(list(extracts.keys()), [dates[0], dates[1], dates[3]])
+        for dated, extract in extracts.items():
+            file_extract = OcDailyArchiveExtract(dated)
+            self.assertEqual(extract.admin_tests, file_extract.admin_tests)
+            self.assertEqual(extract.positive_tests, file_extract.positive_tests)
+            self.assertEqual(extract.dated_reported_new_tests,
+                             file_extract.dated_reported_new_tests)
+            self.assertEqual(extract.reported_new_cases_for_yesterday,
+                             file_extract.reported_new_cases_for_yesterday)
@@ -0,0 +1,55 @@
+from datetime import date
+from os import makedirs, stat, utime
+from tempfile import TemporaryDirectory
+import shutil
+
+from tests.helper import AppTestCase, path_join
+from covid_app.extracts.oc_hca.archive_loader import ARCHIVE_PATH
+from covid_app.extracts.oc_hca.archive_manifest import OcArchiveManifest
+
+
+class OcArchiveManifestTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = TemporaryDirectory()
+        self.archive_path = path_join(self.temp_dir.name, 'daily')
+        self.manifest_path = path_join(self.temp_dir.name, 'manifest.json')
+        self.dates = [date(2020, 9, 12), date(2020, 9, 13)]
+
+        makedirs(self.archive_path)
+        for dated in self.dates:
+            file_name = 'oc-hca-{}.csv'.format(dated.strftime('%Y%m%d'))
+            shutil.copy(path_join(ARCHIVE_PATH, file_name), self.archive_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_expects_snapshot_rewritten_in_place_to_be_hashed_again(self):
+        # Arrange
+        manifest = OcArchiveManifest(self.archive_path, self.manifest_path)
+        old_hash = manifest.hashes[self.dates[0]]
+        archive_mtime = stat(self.archive_path).st_mtime_ns
+        file_path = manifest.file_path(self.dates[0])
+
+        # Act: writing to existing file leaves folder mtime unchanged.
+        with open(file_path, 'a') as f:
+            f.write('2020-09-12,1,1,1,1\n')
+        utime(self.archive_path, ns=(archive_mtime, archive_mtime))
+        fresh_manifest = OcArchiveManifest(self.archive_path, self.manifest_path)
+
+        # Assert
+        self.assertEqual(stat(self.archive_path).st_mtime_ns, archive_mtime)
+        self.assertNotEqual(fresh_manifest.hashes[self.dates[0]], old_hash)
+        self.assertEqual(fresh_manifest.changed_dates(manifest.hashes), [self.dates[0]])
+
+    def test_expects_test_counts_to_need_blank_free_integers(self):
+        # Arrange
+        manifest = OcArchiveManifest(self.archive_path, self.manifest_path)
+        filled = {'New Tests Administered': '120', 'Pos Tests Administered': '7'}
+
+        # Act / Assert
+        self.assertTrue(manifest.has_test_counts(filled))
+        self.assertFalse(manifest.has_test_counts(dict(filled, **{'New Tests Administered': ''})))
+        self.assertFalse(manifest.has_test_counts(dict(filled, **{'Pos Tests Administered': ' '})))
+        self.assertFalse(manifest.has_test_counts(dict(filled, **{'Pos Tests Administered': 'x'})))
+        self.assertFalse(manifest.has_test_counts({'New Tests Administered': '120'}))
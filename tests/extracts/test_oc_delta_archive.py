@@ -0,0 +1,102 @@
+from datetime import date
+from os import makedirs
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import csv
+import shutil
+
+from tests.helper import AppTestCase, path_join
+from covid_app.extracts.oc_hca import daily_archive_extract
+from covid_app.extracts.oc_hca.archive_loader import ARCHIVE_PATH
+from covid_app.extracts.oc_hca.archive_manifest import OcArchiveManifest
+from covid_app.extracts.oc_hca.daily_archive_extract import OcDailyArchiveExtract
+from covid_app.extracts.oc_hca.delta_archive import OcDeltaArchive
+
+
+class OcDeltaArchiveTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = TemporaryDirectory()
+        self.dates = [date(2020, 9, 12), date(2020, 9, 13), date(2020, 9, 15)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_csv_rows(self, dated):
+        file_name = 'oc-hca-{}.csv'.format(dated.strftime('%Y%m%d'))
+        with open(path_join(ARCHIVE_PATH, file_name), newline='') as f:
+            return list(csv.reader(f))
+
+    def test_expects_snapshots_to_be_rebuilt_from_deltas(self):
+        # Arrange
+        archive = OcDeltaArchive(self.temp_dir.name, keyframe_interval=2)
+
+        # Act
+        for dated in self.dates:
+            archive.write(dated, self.read_csv_rows(dated))
+
+        # Assert
+        records = [archive.load_record(dated) for dated in self.dates]
+        self.assertEqual([r['keyframe'] for r in records], [True, False, True])
+        self.assertEqual(records[1]['base'], '2020-09-12')
+
+        fresh_archive = OcDeltaArchive(self.temp_dir.name)
+        for dated in reversed(self.dates):
+            self.assertEqual(fresh_archive.read(dated), self.read_csv_rows(dated))
+        self.assertIsNone(fresh_archive.read(date(2020, 9, 14)))
+
+    def test_expects_changes_to_list_rows_updated_since_previous_snapshot(self):
+        # Arrange
+        archive = OcDeltaArchive(self.temp_dir.name)
+        for dated in self.dates:
+            archive.write(dated, self.read_csv_rows(dated))
+
+        # Act
+        changes = archive.changes(date(2020, 9, 13))
+
+        # Assert
+        before, after = changes['2020-09-12']
+        self.assertEqual(before[1], '')
+        self.assertEqual(after[1], '188')
+        self.assertEqual(changes['2020-09-13'][0], None)
+        for before, after in changes.values():
+            self.assertNotEqual(before, after)
+
+    def test_expects_extract_to_read_rewritten_snapshot_file_over_stale_delta(self):
+        # Arrange
+        daily_path = path_join(self.temp_dir.name, 'daily')
+        makedirs(daily_path)
+        for dated in self.dates:
+            file_name = 'oc-hca-{}.csv'.format(dated.strftime('%Y%m%d'))
+            shutil.copy(path_join(ARCHIVE_PATH, file_name), daily_path)
+
+        archive = OcDeltaArchive(path_join(self.temp_dir.name, 'delta'))
+        archive.import_csv_archive(daily_path)
+
+        # Rewrite middle snapshot in place.
+        rewritten_date = self.dates[1]
+        rows = self.read_csv_rows(rewritten_date)
+        rows[1][1] = str(int(rows[1][1] or 0) + 1000)
+        file_path = path_join(daily_path, 'oc-hca-{}.csv'.format(rewritten_date.strftime('%Y%m%d')))
+        with open(file_path, 'w', newline='') as f:
+            csv.writer(f).writerows(rows)
+
+        manifest = OcArchiveManifest(daily_path, path_join(self.temp_dir.name, 'manifest.json'))
+        module = daily_archive_extract
+
+        # Act
+        with patch.object(module, 'OC_DATA_PATH', self.temp_dir.name), \
+                patch.object(module, 'delta_archive', archive), \
+                patch.object(module, 'archive_manifest', manifest):
+            extract = OcDailyArchiveExtract(rewritten_date, registry={})
+            csv_rows = extract.csv_rows
+            unchanged_rows = OcDailyArchiveExtract(self.dates[0], registry={}).csv_rows
+
+        # Assert
+        self.assertEqual(csv_rows, rows)
+        self.assertEqual(unchanged_rows, self.read_csv_rows(self.dates[0]))
+        self.assertEqual(archive.source_hash(rewritten_date), manifest.hashes[rewritten_date])
+
+        fresh_archive = OcDeltaArchive(archive.path)
+        self.assertEqual(fresh_archive.read(rewritten_date), rows)
+        self.assertEqual(fresh_archive.read(self.dates[2]), self.read_csv_rows(self.dates[2]))
@@ -0,0 +1,52 @@
+from tempfile import TemporaryDirectory
+import csv
+
+from tests.helper import AppTestCase, path_join
+from covid_app.extracts.cdph.oc_detailed_wastewater_extract import (OcWastewaterExtract,
+                                                                    OC_COLUMNS)
+
+
+class OcWastewaterExtractTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = TemporaryDirectory()
+        self.csv_path = path_join(self.temp_dir.name, 'master-covid-public.csv')
+
+        header = ['pcr_target', 'pcr_target_avg_conc', 'sample_collect_date', 'county_names',
+                  'site_id', 'zipcode', 'epaid', 'wwtp_name', 'other_field']
+        rows = []
+        for n in range(1, 13):
+            county = '06059' if n % 2 else '06037'
+            target = 'sars-cov-2' if n % 3 else 'rsv'
+            rows.append([target, '{},000'.format(n), '1/{}/2022 12:00:00 AM'.format(n), county,
+                         'site{}'.format(n), '92626', 'CA0001', 'Plant "A", OC', 'x'])
+
+        with open(self.csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_expects_stream_mode_to_match_loaded_oc_rows(self):
+        # Arrange
+        extract = OcWastewaterExtract(mock=True, csv_path=self.csv_path)
+        stream_extract = OcWastewaterExtract(mock=True, csv_path=self.csv_path, stream=True)
+
+        # Act
+        oc_rows = stream_extract.oc_rows
+
+        # Assert
+        self.assertEqual([r['site_id'] for r in oc_rows], ['site1', 'site5', 'site7', 'site11'])
+        self.assertEqual(oc_rows[1]['virus'], 5000)
+        self.assertEqual(oc_rows[1]['wwtp_name'], 'Plant "A", OC')
+        self.assertNotIn('other_field', oc_rows[0])
+        derived_keys = {'date', 'virus', 'virus_ml', 'log_virus'}
+        self.assertTrue(set(oc_rows[0].keys()) <= set(OC_COLUMNS) | derived_keys)
+        self.assertEqual(stream_extract.source_row_count, 12)
+
+        self.assertEqual(len(oc_rows), len(extract.oc_rows))
+        for row, loaded_row in zip(oc_rows, extract.oc_rows):
+            for key in row:
+                self.assertEqual(row[key], loaded_row[key])
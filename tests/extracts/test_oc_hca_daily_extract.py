@@ -0,0 +1,20 @@
+from tests.helper import AppTestCase
+from covid_app.extracts.oc_hca.daily_extract import OcHcaDailyExtract, TIME_SERIES_ENDPOINTS
+
+
+class OcHcaDailyExtractTest(AppTestCase):
+    def test_expects_prefetch_to_populate_time_series_properties(self):
+        # Arrange
+        extract = OcHcaDailyExtract(mock=True)
+        serial_extract = OcHcaDailyExtract(mock=True)
+
+        # Act
+        latencies = extract.prefetch()
+
+        # Assert
+        endpoints = [endpoint for endpoint, _, _ in TIME_SERIES_ENDPOINTS.values()]
+        self.assertEqual(sorted(latencies.keys()), sorted(endpoints))
+        for name in TIME_SERIES_ENDPOINTS:
+            self.assertIn(name, extract.__dict__)
+            self.assertEqual(getattr(extract, name), getattr(serial_extract, name))
+        self.assertEqual(extract.new_cases, serial_extract.new_cases)
@@ -0,0 +1,64 @@
+from threading import Lock
+
+from tests.helper import AppTestCase
+from covid_app.extracts.soql_query import SoqlQuery
+
+
+class FakeSocrata:
+    def __init__(self, row_count):
+        self.row_count = row_count
+        self.requests = []
+        self.lock = Lock()
+
+    def get(self, dataset_id, **params):
+        with self.lock:
+            self.requests.append(params)
+
+        offset = params['$offset']
+        stop = min(offset + params['$limit'], self.row_count)
+        return [{'n': n} for n in range(offset, stop)]
+
+
+class SoqlQueryTest(AppTestCase):
+    def test_expects_params_to_push_sums_to_server(self):
+        # Arrange
+        query = SoqlQuery(select=['date', SoqlQuery.sum('new_case')],
+                          where="date >= '2020-03-01T00:00:00'",
+                          group=['date'],
+                          order=['date'])
+
+        # Act
+        params = query.params(limit=100, offset=200)
+
+        # Assert
+        self.assertEqual(params, {
+            '$select': 'date, sum(new_case) AS sum_new_case',
+            '$where': "date >= '2020-03-01T00:00:00'",
+            '$group': 'date',
+            '$order': 'date',
+            '$limit': 100,
+            '$offset': 200
+        })
+
+    def test_expects_rows_to_be_paged_in_order(self):
+        # Arrange
+        client = FakeSocrata(row_count=1050)
+        query = SoqlQuery(order=['date'])
+
+        # Act
+        rows = query.fetch_all(client, 'abcd-1234', page_size=100, max_workers=3)
+
+        # Assert
+        self.assertEqual([row['n'] for row in rows], list(range(1050)))
+        self.assertEqual(len(client.requests), 13)
+
+    def test_expects_short_first_page_to_take_one_request(self):
+        # Arrange
+        client = FakeSocrata(row_count=40)
+
+        # Act
+        rows = SoqlQuery().fetch_all(client, 'abcd-1234', page_size=100)
+
+        # Assert
+        self.assertEqual(len(rows), 40)
+        self.assertEqual(len(client.requests), 1)
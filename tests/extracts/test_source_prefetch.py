@@ -0,0 +1,34 @@
+import time
+from threading import Lock
+
+from tests.helper import AppTestCase
+from covid_app.extracts.source_prefetch import SourcePrefetch
+
+
+class SourcePrefetchTest(AppTestCase):
+    def test_expects_sources_to_run_with_bounded_concurrency(self):
+        # Arrange
+        lock = Lock()
+        running = {'now': 0, 'max': 0}
+
+        def fetch(value):
+            with lock:
+                running['now'] += 1
+                running['max'] = max(running['max'], running['now'])
+            time.sleep(0.05)
+            with lock:
+                running['now'] -= 1
+            return value * 10
+
+        prefetch = SourcePrefetch(max_workers=2)
+        for n in range(5):
+            prefetch.add('source-{}'.format(n), lambda n=n: fetch(n))
+
+        # Act
+        results = prefetch.run()
+
+        # Assert
+        self.assertEqual(results, {'source-{}'.format(n): n * 10 for n in range(5)})
+        self.assertEqual(list(prefetch.timings.keys()), list(results.keys()))
+        self.assertEqual(running['max'], 2)
+        self.assertEqual(len(prefetch.summary_lines), 6)
@@ -0,0 +1,141 @@
+from os.path import join as path_join
+from datetime import date, datetime
+from tempfile import TemporaryDirectory
+import csv
+
+from tests.helper import AppTestCase, FILES_ROOT
+from config.app import PROJECT_ROOT
+from covid_app.analytics.oc.waves import OcWaveAnalysis
+from covid_app.models.oc.epidemic import Epidemic, HeapPhaseSmoother
+
+
+class EpidemicSmoothingEngineTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rates = {}
+        csv_path = path_join(PROJECT_ROOT, 'data', 'samples', 'oc-rates.csv')
+
+        with open(csv_path) as f:
+            for row in csv.reader(f):
+                self.rates[datetime.strptime(row[0], '%Y-%m-%d').date()] = float(row[1])
+
+    def test_expects_heap_engine_to_merge_phases_like_scan_engine(self):
+        # Sample data doesn't cover the hardcoded phases, so compare the engines directly.
+        for window_size in (3, 5, 7, 9):
+            # Arrange
+            epidemic = Epidemic(self.rates, {'window_size': window_size})
+
+            # Act
+            scanned_phases = epidemic.merge_jagged_phases(list(epidemic.phases))
+            heaped_phases = HeapPhaseSmoother(list(epidemic.phases)).smooth()
+
+            # Assert
+            self.assertGreater(len(epidemic.phases), len(scanned_phases))
+            self.assertEqual([(p.started_on, p.ended_on, p.trend) for p in heaped_phases],
+                             [(p.started_on, p.ended_on, p.trend) for p in scanned_phases])
+
+    def test_expects_timeline_slices_to_match_date_range_of_timeline(self):
+        # Arrange
+        epidemic = Epidemic(self.rates)
+        dates = sorted(self.rates.keys())
+
+        # Act / Assert
+        for start_date, end_date in ((dates[0], dates[-1]), (dates[10], dates[40]),
+                                     (dates[-1], dates[-1]), (dates[40], dates[10])):
+            timeline = epidemic.extract_timeline_by_start_end_dates(self.rates, start_date,
+                                                                    end_date)
+            expected = {d: v for d, v in self.rates.items() if start_date <= d <= end_date}
+
+            self.assertEqual(list(timeline.items()), list(expected.items()))
+            self.assertNotIn(dates[0] - (dates[1] - dates[0]), timeline)
+
+    def test_expects_extended_epidemic_to_match_full_rebuild(self):
+        # Arrange
+        dates = sorted(self.rates.keys())
+        epidemic = Epidemic({d: self.rates[d] for d in dates[:300]})
+
+        with TemporaryDirectory() as temp_dir:
+            state_path = path_join(temp_dir, 'epidemic-state.json')
+            epidemic.save_state(state_path)
+
+            # Act
+            restored_epidemic = Epidemic.from_state_file(state_path)
+            changed_dates = restored_epidemic.extend(self.rates)
+
+        # Assert
+        self.assertEqual(changed_dates, dates[300:])
+        self.assertIsNotNone(restored_epidemic.frozen_through)
+        self.assertTrue(restored_epidemic.verify_state())
+
+    def test_expects_revision_of_frozen_data_to_thaw_epidemic(self):
+        # Arrange
+        dates = sorted(self.rates.keys())
+        epidemic = Epidemic(dict(self.rates))
+        frozen_through = epidemic.freeze()
+
+        # Act
+        epidemic.append(frozen_through, self.rates[frozen_through] + 1)
+
+        # Assert
+        self.assertIsNotNone(frozen_through)
+        self.assertIsNone(epidemic.frozen_through)
+        self.assertEqual(epidemic.smoothed_phases[-1].ended_on, dates[-3])
+
+    def test_expects_removed_dates_to_thaw_epidemic(self):
+        # Arrange
+        dates = sorted(self.rates.keys())
+        epidemic = Epidemic(dict(self.rates))
+        frozen_through = epidemic.freeze()
+        snapshot = {d: v for d, v in self.rates.items() if d != dates[-1]}
+
+        # Act
+        changed_dates = epidemic.update(snapshot)
+
+        # Assert
+        self.assertIsNotNone(frozen_through)
+        self.assertEqual(changed_dates, [dates[-1]])
+        self.assertIsNone(epidemic.frozen_through)
+        self.assertEqual(epidemic.dates, dates[:-1])
+        self.assertTrue(epidemic.verify_state())
+
+    def test_expects_incremental_update_to_match_rebuild_on_2021_01_02(self):
+        # Arrange: OC rates through 2021-01-02 (from 2024-10-19 snapshot). Tail smoothed on
+        # its own used to end up with one wave fewer than a full rebuild on this night.
+        rates = {}
+        with open(path_join(FILES_ROOT, 'oc-rates-20210102.csv')) as f:
+            for row in csv.reader(f):
+                rates[date.fromisoformat(row[0])] = float(row[1])
+
+        night = date(2021, 1, 2)
+        opts = {'window_size': 5}
+        epidemic = Epidemic({d: v for d, v in rates.items() if d < night}, opts)
+
+        with TemporaryDirectory() as temp_dir:
+            state_path = path_join(temp_dir, 'epidemic-state.json')
+            epidemic.save_state(state_path)
+
+            # Act
+            restored_epidemic = Epidemic.from_state_file(state_path, opts)
+            restored_epidemic.update(rates)
+            waves = restored_epidemic.waves
+
+        # Assert
+        self.assertEqual(restored_epidemic.frozen_through, date(2020, 11, 1))
+        self.assertTrue(restored_epidemic.verify_state())
+        self.assertEqual(len(waves), len(restored_epidemic.rebuild().waves))
+        self.assertEqual(OcWaveAnalysis().epidemic_mode, 'incremental')
+
+    def test_expects_phase_thresholds_from_opts(self):
+        # Arrange
+        opts = {'flat_slope_threshold': .5, 'min_phase_size': 20}
+
+        # Act
+        epidemic = Epidemic(self.rates, opts)
+        default_epidemic = Epidemic(self.rates)
+
+        # Assert
+        self.assertEqual(epidemic.windows.flat_slope_threshold, .5)
+        self.assertTrue(all(p.flat_slope_threshold == .5 and p.min_phase_size == 20
+                            for p in epidemic.phases))
+        self.assertGreater(sum(1 for w in default_epidemic.windows if w.trend != 0),
+                           sum(1 for w in epidemic.windows if w.trend != 0))
@@ -0,0 +1,80 @@
+from os.path import join as path_join
+from datetime import datetime, timedelta
+import csv
+
+from tests.helper import AppTestCase
+from config.app import PROJECT_ROOT
+from covid_app.models.oc.epidemic import Epidemic
+from covid_app.models.oc.epidemic_batch import EpidemicBatch
+from covid_app.models.oc.phase_window import BatchPhaseWindows, PhaseWindows
+
+
+class EpidemicBatchTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rates = {}
+        csv_path = path_join(PROJECT_ROOT, 'data', 'samples', 'oc-rates.csv')
+
+        with open(csv_path) as f:
+            for row in csv.reader(f):
+                self.rates[datetime.strptime(row[0], '%Y-%m-%d').date()] = float(row[1])
+
+    def test_expects_batch_primary_waves_to_match_epidemic_waves(self):
+        # Arrange
+        epidemic = Epidemic(self.rates, {'window_size': 5}, {'rates': self.rates})
+
+        # Act
+        batch = EpidemicBatch(epidemic)
+
+        # Assert
+        self.assertEqual(batch.errors, {})
+        for key in ('primary', 'rates'):
+            self.assertEqual([(w.started_on, w.ended_on, w.peaked_on) for w in batch.waves[key]],
+                             [(w.started_on, w.ended_on, w.peaked_on) for w in epidemic.waves])
+
+    def test_expects_peak_offsets_to_find_lag_of_scaled_timeline(self):
+        # Arrange
+        lag = timedelta(days=10)
+        lagged_cases = {dated + lag: rate * 100 for dated, rate in self.rates.items()}
+        epidemic = Epidemic(self.rates, {'window_size': 5}, {'cases': lagged_cases})
+
+        # Act
+        batch = EpidemicBatch(epidemic, {'cases': 5.0})
+        peak_offsets = batch.peak_offsets()
+
+        # Assert: last primary peak is at end of sample, past end of lagged timeline.
+        self.assertEqual(batch.errors, {})
+        self.assertEqual(len(peak_offsets), 2)
+        self.assertEqual(peak_offsets[0]['offsets'], {'cases': 10})
+        self.assertEqual(batch.peaks['cases'], [peak_offsets[0]['peaked_on'] + lag])
+
+    def test_expects_zero_values_to_stay_in_series_windows(self):
+        # Arrange: low rates round down to days with 0 deaths.
+        deaths = {dated: max(int(rate) - 1, 0) for dated, rate in self.rates.items()}
+        epidemic = Epidemic(self.rates, {'window_size': 5}, {'deaths': deaths})
+
+        # Assume
+        self.assertGreater(list(deaths.values()).count(0), 5)
+
+        # Act
+        batch = EpidemicBatch(epidemic, {'deaths': 0.1})
+
+        # Assert
+        self.assertEqual(batch.errors, {})
+        self.assertEqual(len(batch.windows.series('deaths')), len(deaths) - 4)
+        legacy_windows = BatchPhaseWindows({'deaths': deaths}, 5, blank_zero_keys=('deaths',))
+        self.assertLess(len(legacy_windows.series('deaths')), len(deaths) - 4)
+        self.assertTrue(batch.waves['deaths'])
+
+    def test_expects_even_window_size_to_raise_error(self):
+        # Arrange
+        timelines = {'primary': self.rates}
+
+        # Act / Assert
+        for window_size in (4, 6):
+            with self.assertRaises(ValueError):
+                BatchPhaseWindows(timelines, window_size)
+            with self.assertRaises(ValueError):
+                PhaseWindows(self.rates, window_size)
+        self.assertEqual(len(BatchPhaseWindows(timelines, 5).series('primary')),
+                         len(PhaseWindows(self.rates, 5)))
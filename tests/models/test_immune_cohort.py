@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+from random import Random
+
+from tests.helper import AppTestCase
+from covid_app.models.oc.immune_cohort import ImmuneCohort, CohortLedger
+
+
+class CohortLedgerTest(AppTestCase):
+    def build_cohorts(self, random, num_days):
+        start_date = date(2020, 12, 15)
+        cohorts = []
+
+        for n in range(num_days):
+            # Mostly small partial counts so cohorts get used up. Some negative corrections.
+            counts = [random.choice([0, random.randint(-40, 60), random.randint(0, 400)])
+                      for _ in range(3)]
+            cohorts.append(ImmuneCohort(start_date + timedelta(days=n), *counts, 0))
+
+        return cohorts
+
+    def test_expects_ledger_to_match_cohort_list_allocation(self):
+        for seed in range(5):
+            # Arrange
+            listed_cohorts = self.build_cohorts(Random(seed), 300)
+            ledger_cohorts = self.build_cohorts(Random(seed), 300)
+            partial_ledger = CohortLedger('partial')
+            boosted_ledger = CohortLedger('boosted')
+
+            # Act
+            for n, cohort in enumerate(listed_cohorts):
+                cohort.update_partially_vaxxed_cohorts(listed_cohorts[:n])
+                cohort.update_boosted_cohorts(listed_cohorts[:n])
+
+            for cohort in ledger_cohorts:
+                partial_ledger.allocate(cohort.full_vax_count)
+                boosted_ledger.allocate(cohort.boost_vax_count)
+                partial_ledger.append(cohort)
+                boosted_ledger.append(cohort)
+
+            # Assert
+            self.assertEqual(
+                [(c.fully_vaxxed_partial_count, c.boosted_full_vaxxed_count)
+                 for c in ledger_cohorts],
+                [(c.fully_vaxxed_partial_count, c.boosted_full_vaxxed_count)
+                 for c in listed_cohorts])
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+from random import Random
+
+from tests.helper import AppTestCase
+from covid_app.models.oc.immune_cohort import ImmuneCohort
+from covid_app.models.oc.immunity_convolution import ImmunityConvolution
+
+
+class ImmunityConvolutionTest(AppTestCase):
+    def test_expects_convolution_to_match_cohort_loop(self):
+        # Arrange: counts include some negative corrections, like source data.
+        random = Random(20201215)
+        start_date = date(2020, 12, 15)
+        num_days = 400
+        partial_vax = [random.randint(-50, 3000) for _ in range(num_days)]
+        full_vax = [random.randint(-50, 2500) for _ in range(num_days)]
+        boosted = [random.randint(-50, 1500) for _ in range(num_days)]
+        infected = [random.randint(-20, 900) for _ in range(num_days)]
+
+        cohorts = []
+        expected = []
+        for n in range(num_days):
+            dated = start_date + timedelta(days=n)
+            cohort = ImmuneCohort(dated, partial_vax[n], full_vax[n], boosted[n], infected[n])
+            cohort.update_partially_vaxxed_cohorts(cohorts)
+            cohort.update_boosted_cohorts(cohorts)
+            cohorts.append(cohort)
+            expected.append((
+                ImmuneCohort.count_active_infections(cohorts),
+                sum([c.compute_recovered_immunity_for_date(dated) for c in cohorts]),
+                sum([c.compute_vax_immunity_for_date(dated) for c in cohorts])
+            ))
+
+        # Act
+        convolution = ImmunityConvolution(partial_vax, full_vax, boosted, infected)
+        estimates = list(zip(convolution.infectious.tolist(), convolution.recovered.tolist(),
+                             convolution.vaccinated.tolist()))
+
+        # Assert
+        self.assertEqual(estimates, expected)
@@ -0,0 +1,36 @@
+from random import Random
+
+import numpy as np
+
+from tests.helper import AppTestCase
+from covid_app.models.oc.immunity_convolution import ImmunityConvolution
+from covid_app.models.oc.immunity_scenarios import ImmunityScenarios, BASELINE_SCENARIO
+
+
+class ImmunityScenariosTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        random = Random(20210101)
+        num_days = 500
+        self.convolution = ImmunityConvolution(
+            [random.randint(-50, 3000) for _ in range(num_days)],
+            [random.randint(-50, 2500) for _ in range(num_days)],
+            [random.randint(-50, 1500) for _ in range(num_days)],
+            [random.randint(-20, 900) for _ in range(num_days)]
+        )
+
+    def test_expects_baseline_scenario_to_match_convolution(self):
+        # Arrange
+        undertested = dict(BASELINE_SCENARIO, undertest_factor=6.0)
+        faster_fade = dict(BASELINE_SCENARIO, vax_fade_days=120, infection_window=10)
+
+        # Act
+        scenarios = ImmunityScenarios(self.convolution, [{}, undertested, faster_fade])
+
+        # Assert
+        self.assertTrue(np.allclose(scenarios.infectious[0], self.convolution.infectious))
+        self.assertTrue(np.allclose(scenarios.recovered[0], self.convolution.recovered))
+        self.assertTrue(np.allclose(scenarios.vaccinated[0], self.convolution.vaccinated))
+        self.assertTrue(np.allclose(scenarios.recovered[1], scenarios.recovered[0] * 2))
+        self.assertTrue((scenarios.vaccinated[2] <= scenarios.vaccinated[0] + 1e-6).all())
+        self.assertEqual(scenarios.vulnerable(1000000).shape, (3, 500))
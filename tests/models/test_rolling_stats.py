@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+from random import Random
+import statistics
+
+from tests.helper import AppTestCase
+from covid_app.models.oc.rolling_stats import RollingStats
+
+
+class RollingStatsTest(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        random = Random(20200305)
+        self.start_date = date(2020, 3, 5)
+        self.timeline = {}
+
+        # Random walk with some blank values.
+        value = 50.0
+        for n in range(200):
+            value += random.gauss(0, 0.5)
+            dated = self.start_date + timedelta(days=n)
+            self.timeline[dated] = None if random.random() < .1 else value
+
+    def test_expects_rolling_stats_to_match_window_stats(self):
+        # Arrange
+        window_size = 7
+
+        # Act
+        stats = RollingStats(self.timeline, window_size)
+
+        # Assert
+        for dated in sorted(self.timeline.keys()):
+            window = [self.timeline.get(dated - timedelta(days=n)) for n in range(window_size)]
+            values = [v for v in window if v is not None]
+
+            self.assertEqual(stats.counts[dated], len(values))
+            self.assertAlmostEqual(stats.means[dated], statistics.mean(values))
+            if len(values) > 1:
+                self.assertAlmostEqual(stats.variances[dated], statistics.variance(values))
+
+    def test_expects_zscores_to_compare_value_to_window_ending_day_before(self):
+        # Arrange
+        window_size = 5
+
+        # Act
+        stats = RollingStats(self.timeline, window_size)
+
+        # Assert
+        for dated in sorted(self.timeline.keys())[1:]:
+            yesterday = dated - timedelta(days=1)
+            window = [self.timeline.get(yesterday - timedelta(days=n)) for n in range(window_size)]
+            values = [v for v in window if v is not None]
+            value = self.timeline[dated]
+
+            if value is None or len(values) < window_size:
+                self.assertIsNone(stats.zscores[dated])
+                continue
+
+            expected = (value - statistics.mean(values)) / statistics.stdev(values)
+            self.assertAlmostEqual(stats.zscores[dated], expected)
+
+    def test_expects_no_zscores_until_window_is_full(self):
+        # Arrange
+        timeline = {self.start_date + timedelta(days=n): v
+                    for n, v in enumerate([10, 11, 30, 12, 11, 10, 12, 60])}
+
+        # Act
+        stats = RollingStats(timeline, 5)
+        partial_stats = RollingStats(timeline, 5, min_count=2)
+
+        # Assert
+        dates = sorted(timeline.keys())
+        self.assertEqual([d for d in dates if stats.zscores[d] is not None], dates[5:])
+        self.assertIsNotNone(partial_stats.zscores[dates[2]])
+        self.assertEqual(list(stats.anomalies(3.0).keys()), [dates[7]])
+
+    def test_expects_gapped_timeline_stats_to_match_window_stats(self):
+        # Arrange: drop some days entirely, including runs of missing days.
+        random = Random(20200306)
+        timeline = {d: v for d, v in self.timeline.items() if random.random() > .2}
+        window_size = 3
+
+        # Act
+        stats = RollingStats(timeline, window_size, min_count=2)
+
+        # Assert
+        for dated in sorted(timeline.keys()):
+            window = [timeline.get(dated - timedelta(days=n)) for n in range(window_size)]
+            values = [v for v in window if v is not None]
+
+            self.assertEqual(stats.counts[dated], len(values))
+            if values:
+                self.assertAlmostEqual(stats.means[dated], statistics.mean(values))
+            if len(values) > 1:
+                self.assertAlmostEqual(stats.variances[dated], statistics.variance(values))
+
+            yesterday = dated - timedelta(days=1)
+            window = [timeline.get(yesterday - timedelta(days=n)) for n in range(window_size)]
+            values = [v for v in window if v is not None]
+            value = timeline[dated]
+
+            if value is not None and len(values) >= 2 and statistics.stdev(values):
+                # Two-value windows can have tiny variances: compare relative to expected.
+                expected = (value - statistics.mean(values)) / statistics.stdev(values)
+                self.assertAlmostEqual(stats.zscores[dated] / expected, 1.0)
+            else:
+                self.assertIsNone(stats.zscores[dated])